@@ -1,13 +1,21 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import json
+import time
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 
 try:
-    from src.config import COMMODITY_CONFIG
+    from src.config import COMMODITY_CONFIG, REGION_CONFIG, DEFAULT_REGION
     from src.data_handler import fetch_bi_data, reshape_and_clean_data
     from src.feature_engineering import full_preparation_pipeline
-    from src.predictions import load_all_models_and_scalers, forecast_iteratively
+    from src.downsampling import downsample_frame, history_frame
+    from src.predictions import get_model_registry, get_forecast_cache, load_feature_schema, resolve_model_path, iter_forecast, forecast_intervals, INTERVAL_QUANTILES
+    from src.forecast_cache import file_hash
+    from src.forecast_artifacts import load_latest_artifact, load_residuals
+    from src.inference_service import get_inference_service, InferenceQueueFull, InferenceWorkerError
+    from src.instrumentation import INSTRUMENTATION_DEFAULT, create_trace
 except ImportError as e:
     st.error(f"Gagal mengimpor modul dari 'src'. Pastikan struktur folder benar. Detail: {e}")
     st.stop()
@@ -29,17 +37,129 @@ def load_custom_css(file_name):
     except FileNotFoundError:
         st.warning(f"File CSS '{file_name}' tidak ditemukan. Styling kustom mungkin tidak teraplikasikan.")
 
-@st.cache_resource
-def load_models_and_dependencies():
+def load_models_and_dependencies(commodity):
+    """Memuat model & scaler untuk satu komoditas (lazy, dibagi antar sesi lewat registry)."""
     try:
-        models, scalers = load_all_models_and_scalers(COMMODITY_CONFIG)
-        return models, scalers
+        return model_registry.get(commodity)
     except Exception as e:
         st.error(f"Gagal memuat file model/scaler. Pastikan path di 'src/config.py' benar. Detail: {e}")
         st.stop()
 
+def run_inference(submit_to_service, run_locally):
+    """
+    Menjalankan inferensi lewat worker pool bila aktif (`INFERENCE_WORKERS` > 0),
+    atau langsung di proses ini jika tidak.
+    """
+    if inference_service is None:
+        return run_locally()
+    try:
+        return submit_to_service(inference_service)
+    except InferenceQueueFull:
+        st.warning("Server sedang melayani banyak permintaan. Silakan coba beberapa saat lagi."); st.stop()
+    except InferenceWorkerError as e:
+        st.error(f"Gagal menjalankan model. Pastikan path di 'src/config.py' benar. Detail: {e}"); st.stop()
+
+def load_precomputed_results(commodity, details, start_date, end_date):
+    """
+    Mengambil hasil dari job batch (`python -m src.batch_forecast`) jika dibuat untuk
+    rentang histori (tanggal awal dan akhir) yang sama dan dengan file model yang sama.
+    Jika tidak cocok, None dikembalikan dan proyeksi dihitung langsung.
+    """
+    artifact = load_latest_artifact(commodity)
+    if artifact is None or (artifact.get('start_date'), artifact.get('end_date')) != (start_date.isoformat(), end_date.isoformat()):
+        return None
+    try:
+        if artifact.get('model_hash') != file_hash(resolve_model_path(details)):
+            return None
+    except FileNotFoundError:
+        return None
+    return {
+        "df_forecast": artifact['forecast'], "sequence_history": artifact['sequence_history'],
+        "price_history": artifact['price_history'], "details": details,
+    }
+
+def hex_to_rgba(hex_color, alpha):
+    hex_color = hex_color.lstrip('#')
+    r, g, b = (int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+    return f"rgba({r}, {g}, {b}, {alpha})"
+
 load_custom_css("style.css")
-models, scalers = load_models_and_dependencies()
+model_registry = get_model_registry(COMMODITY_CONFIG)
+forecast_cache = get_forecast_cache()
+inference_service = get_inference_service(COMMODITY_CONFIG)
+
+TREND_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
+# Grafik proyeksi sementara digambar ulang paling sering sekali per interval ini (detik);
+# progres dan metrik tetap diperbarui setiap langkah
+STREAM_CHART_INTERVAL_SECONDS = 1.0
+# Judul statistik sumber daya bersama (`Trace.record_resource`) di panel instrumentasi
+RESOURCE_LABELS = {
+    "model_registry": "Model yang dimuat di proses ini",
+    "forecast_cache": "Cache forecast bersama",
+}
+
+def build_trend_figure(history_to_plot, df_forecast, targets, forecast_bands=None, forecast_start=None):
+    """
+    Grafik harga historis vs. proyeksi (dengan interval prediksi jika ada).
+    `history_to_plot` berupa DataFrame atau dict {sub-komoditas: Series} hasil `downsample_frame`.
+    """
+    fig = go.Figure()
+    if forecast_start is None:
+        forecast_start = history_to_plot.index[-1]
+
+    for i, col in enumerate(targets):
+        color = TREND_COLORS[i % len(TREND_COLORS)]
+        if forecast_bands:
+            fig.add_trace(go.Scatter(x=forecast_bands['lower'].index, y=forecast_bands['lower'][col], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+            fig.add_trace(go.Scatter(x=forecast_bands['upper'].index, y=forecast_bands['upper'][col], mode='lines', line=dict(width=0), fill='tonexty', fillcolor=hex_to_rgba(color, 0.15), name=f"Interval {forecast_bands['level']}% - {col}", hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=history_to_plot[col].index, y=history_to_plot[col], mode='lines', name=f'Historis - {col}', line=dict(color=color)))
+        fig.add_trace(go.Scatter(x=df_forecast.index, y=df_forecast[col], mode='lines', name=f'Proyeksi - {col}', line=dict(dash='dash', color=color)))
+
+    fig.add_vline(x=forecast_start.value, line_width=2, line_dash="dot", line_color="grey", annotation_text="Mulai Proyeksi", annotation_position="top right")
+
+    fig.update_layout(
+        margin=dict(t=120, b=80),
+        xaxis_title='Tanggal',
+        yaxis_title='Harga (Rp)',
+        hovermode='x unified',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+def stream_forecast(steps, price_history, details, forecast_dates):
+    """
+    Menampilkan proyeksi secara progresif: progres dan metrik hari pertama diperbarui setiap kali
+    satu hari selesai dihitung, sedangkan grafik tren (yang membawa seluruh titik histori) hanya
+    digambar ulang setiap STREAM_CHART_INTERVAL_SECONDS. Jika user mengubah parameter, Streamlit
+    menghentikan script di sini dan generator `steps` ditutup sehingga langkah sisanya dibatalkan.
+    """
+    placeholder = st.empty()
+    with placeholder.container():
+        status_area = st.empty()
+        chart_area = st.empty()
+    targets = details['targets']
+    history_to_plot = downsample_frame(price_history[targets], extra_days=len(forecast_dates))
+    forecast_start = price_history.index[-1]
+    predictions = []
+    last_chart_time = None
+    try:
+        for prices in steps:
+            predictions.append(prices)
+            with status_area.container():
+                st.progress(len(predictions) / len(forecast_dates), text=f"Hari ke-{len(predictions)} dari {len(forecast_dates)} selesai dihitung...")
+                metric_cols = st.columns(len(targets))
+                for metric_col, target_name, price in zip(metric_cols, targets, predictions[0]):
+                    metric_col.metric(label=target_name, value=f"Rp {price:,.0f}")
+
+            now = time.perf_counter()
+            if last_chart_time is None or now - last_chart_time >= STREAM_CHART_INTERVAL_SECONDS:
+                df_partial = pd.DataFrame(predictions, index=forecast_dates[:len(predictions)], columns=targets)
+                chart_area.plotly_chart(build_trend_figure(history_to_plot, df_partial, targets, forecast_start=forecast_start), use_container_width=True)
+                last_chart_time = now
+    finally:
+        steps.close()
+    placeholder.empty()
+    return np.array(predictions)
 
 def display_prediction_results(results: dict):
     st.success("✅ Proyeksi berhasil dibuat!")
@@ -48,6 +168,7 @@ def display_prediction_results(results: dict):
     df_forecast = results['df_forecast']
     sequence_history = results['sequence_history']
     details = results['details']
+    forecast_bands = results.get('forecast_bands')
 
     tab1, tab2, tab3, tab4 = st.tabs([
         "📊 Ringkasan Proyeksi", 
@@ -99,25 +220,28 @@ def display_prediction_results(results: dict):
     with tab2:
         st.subheader("Grafik Tren Harga Historis vs. Harga Proyeksi 30 Hari")
         
-        history_to_plot = sequence_history[details['targets']]
-        fig = go.Figure()
-        colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
-        
-        for i, col in enumerate(details['targets']):
-            color = colors[i % len(colors)]
-            fig.add_trace(go.Scatter(x=history_to_plot.index, y=history_to_plot[col], mode='lines', name=f'Historis - {col}', line=dict(color=color)))
-            fig.add_trace(go.Scatter(x=df_forecast.index, y=df_forecast[col], mode='lines', name=f'Proyeksi - {col}', line=dict(dash='dash', color=color)))
-        
-        fig.add_vline(x=history_to_plot.index[-1].value, line_width=2, line_dash="dot", line_color="grey", annotation_text="Mulai Proyeksi", annotation_position="top right")
-        
-        fig.update_layout(
-            margin=dict(t=120, b=80),
-            xaxis_title='Tanggal', 
-            yaxis_title='Harga (Rp)', 
-            hovermode='x unified',
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        # Histori panjang di-downsample di server sesuai lebar grafik dan rentang yang ditampilkan;
+        # memperkecil rentang lewat slider menambah titik per hari, sampai resolusi penuh.
+        price_history = results.get('price_history')
+        if price_history is None:
+            price_history = sequence_history[details['targets']]
+        history_start, history_end = price_history.index[0].date(), price_history.index[-1].date()
+        if history_start < history_end:
+            zoom_start, zoom_end = st.slider(
+                "Rentang histori yang ditampilkan", min_value=history_start, max_value=history_end,
+                value=(history_start, history_end), format="DD MMM YYYY", key="trend_zoom"
+            )
+            price_history = price_history.loc[pd.Timestamp(zoom_start):pd.Timestamp(zoom_end)]
+
+        fig = build_trend_figure(
+            downsample_frame(price_history[details['targets']], extra_days=len(df_forecast)), df_forecast, details['targets'], forecast_bands,
+            forecast_start=sequence_history.index[-1]
         )
         st.plotly_chart(fig, use_container_width=True)
+        if forecast_bands and forecast_bands.get('residuals'):
+            st.caption(f"Area berwarna menunjukkan interval prediksi {forecast_bands['level']}% dari simulasi Monte Carlo (residual bootstrap error forecast 1 hari dari backtest, {forecast_bands['residuals']} titik).")
+        elif forecast_bands:
+            st.caption(f"Area berwarna menunjukkan rentang simulasi {forecast_bands['level']}% dari sampel perubahan harga harian pada data input. Rentang ini mencerminkan volatilitas harga, bukan error model; jalankan `python -m src.backtest` untuk interval berbasis residual backtest.")
 
     # --- Tab 3: Data Detail ---
     with tab3:
@@ -163,6 +287,46 @@ def display_prediction_results(results: dict):
         st.markdown("---")
         st.info("**Apa itu Tingkat Fluktuasi (StDev)?**\n\nStandar Deviasi (StDev) mengukur seberapa besar harga suatu barang menyebar dari harga rata-ratanya. Semakin tinggi angkanya, semakin tidak stabil atau semakin **sering harga barang tersebut berfluktuasi** selama periode yang dipilih.", icon="💡")
 
+def display_instrumentation_panel(trace: dict):
+    """Panel debug: waktu, baris, dan memori per tahap, serta rincian per langkah forecast."""
+    with st.expander("🔬 Instrumentasi Pipeline", expanded=False):
+        df_stages = pd.DataFrame(trace['stages'])
+        st.dataframe(df_stages, use_container_width=True, hide_index=True)
+        if 'peak_memory_mb' in df_stages and df_stages['peak_memory_mb'].isna().any():
+            st.caption("Memori kosong: tahap tersebut berjalan bersamaan dengan sesi lain, sehingga pemakaian memorinya tidak bisa dipisahkan.")
+
+        forecast_summary = trace['step_summary'].get('forecast')
+        inference_summary = trace['step_summary'].get('inference')
+        if inference_summary:
+            st.caption(
+                f"Inferensi di worker pool ({inference_summary['steps']} job): "
+                f"menunggu {inference_summary['mean_wait_ms']:.2f} ms, "
+                f"komputasi batch {inference_summary['mean_compute_ms']:.2f} ms."
+            )
+        elif forecast_summary:
+            st.caption(
+                f"Per langkah forecast (rata-rata dari {forecast_summary['steps']} langkah): "
+                f"model {forecast_summary['mean_model_ms']:.2f} ms, "
+                f"scaler {forecast_summary['mean_scaler_ms']:.2f} ms, "
+                f"update fitur {forecast_summary['mean_features_ms']:.2f} ms."
+            )
+        else:
+            st.caption("Hasil forecast diambil dari cache, tidak ada langkah model yang dijalankan.")
+
+        for name, values in trace.get('resources', {}).items():
+            st.markdown(f"**{RESOURCE_LABELS.get(name, name)}**")
+            if values and all(isinstance(value, dict) for value in values.values()):
+                st.dataframe(pd.DataFrame.from_dict(values, orient='index'), use_container_width=True)
+            else:
+                st.dataframe(pd.DataFrame([values]), use_container_width=True, hide_index=True)
+
+        st.download_button(
+            label="📥 Download Trace (JSON)",
+            data=json.dumps(trace, default=str, indent=2).encode('utf-8'),
+            file_name=f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json"
+        )
+
 # =============================================================================
 # MAIN APP
 # =============================================================================
@@ -177,6 +341,8 @@ def main():
         st.title("⚙️ Parameter Proyeksi")
         st.markdown("Atur parameter di bawah ini untuk menghasilkan proyeksi.")
         
+        regions = list(REGION_CONFIG.keys())
+        selected_region = st.selectbox("Pilih Wilayah", regions, index=regions.index(DEFAULT_REGION))
         selected_commodity = st.selectbox("Pilih Kelompok Komoditas", list(COMMODITY_CONFIG.keys()))
         details = COMMODITY_CONFIG[selected_commodity]
         
@@ -194,14 +360,16 @@ def main():
         
         st.markdown("---")
         predict_button = st.button("💰 Cek Proyeksi Harga", type="primary", use_container_width=True)
+        show_intervals = st.checkbox("📊 Tampilkan interval prediksi", value=False)
+        debug_mode = st.checkbox("🔬 Tampilkan instrumentasi pipeline", value=INSTRUMENTATION_DEFAULT)
 
-    st.title("📈 Proyeksi Harga Pangan Strategis Jawa Barat")
-    st.markdown("📣 Antisipasi fluktuasi harga! Lihat tren terkini dan dapatkan proyeksi harga pangan di Jawa Barat untuk 30 hari mendatang.")
+    st.title(f"📈 Proyeksi Harga Pangan Strategis {selected_region}")
+    st.markdown(f"📣 Antisipasi fluktuasi harga! Lihat tren terkini dan dapatkan proyeksi harga pangan di {selected_region} untuk 30 hari mendatang.")
 
     with st.expander("ℹ️ Tentang Aplikasi & Data"):
-        st.markdown("""
+        st.markdown(f"""
         - **Sumber Data**: Data harga diakses secara *real-time* dari **Pusat Informasi Harga Pangan Strategis (PIHPS) Nasional**, yang dikelola oleh Bank Indonesia.
-        - **Sumber Pasar**: Semua data harga bersumber dari **pasar tradisional** di wilayah Jawa Barat.
+        - **Sumber Pasar**: Semua data harga bersumber dari **pasar tradisional** di wilayah {selected_region}.
         - **Satuan**: Beras & Telur Ayam (per kg), Minyak Goreng (per Liter).
         
         ***‼️Disclaimer**: Proyeksi ini adalah hasil estimasi model matematis dan bukan merupakan jaminan harga di masa depan.*
@@ -212,33 +380,109 @@ def main():
             st.error("Tanggal mulai tidak boleh melebihi tanggal akhir."); st.stop()
         if (end_date - start_date).days < 30:
             st.warning("Rentang data terlalu pendek. Disarankan minimal 30 hari untuk analisis."); st.stop()
+
+        # Artifact job batch hanya dibuat untuk wilayah default
+        precomputed = None if show_intervals or selected_region != DEFAULT_REGION else load_precomputed_results(selected_commodity, details, start_date, end_date)
+        if precomputed:
+            st.session_state.results = precomputed
+            st.session_state.prediction_generated = True
+            st.rerun()
             
-        with st.spinner("Memproses data... Ini mungkin memakan waktu beberapa saat."):
+        trace = create_trace(f"{selected_commodity} {selected_region} {start_date}..{end_date}", enabled=debug_mode)
+
+        # Pesan progres dan proyeksi sementara dibersihkan setelah hasil akhir siap
+        work_area = st.empty()
+
+        with work_area.container(), st.spinner("Memproses data... Ini mungkin memakan waktu beberapa saat."):
             st.write("1/4 - Menghubungi server Bank Indonesia...")
-            df_raw = fetch_bi_data(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+            with trace.stage("fetch_bi_data") as stage:
+                df_raw = fetch_bi_data(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), selected_region)
+                stage['rows'] = len(df_raw)
             if df_raw.empty: st.error("Tidak ada data ditemukan."); st.stop()
             
             st.write("2/4 - Membersihkan dan menyusun data...")
-            df_long = reshape_and_clean_data(df_raw, details)
+            with trace.stage("reshape_and_clean_data", rows=len(df_raw)) as stage:
+                df_long = reshape_and_clean_data(df_raw, details)
+                stage['rows'] = len(df_long)
             if df_long.empty: st.error(f"Data untuk '{selected_commodity}' tidak tersedia."); st.stop()
+            price_history = history_frame(df_long, details['targets'])
             
             st.write("3/4 - Menganalisis pola data historis...")
-            sequence, feature_cols, error_msg = full_preparation_pipeline(df_long, details)
+            with trace.stage("full_preparation_pipeline", rows=len(df_long)):
+                try:
+                    schema = load_feature_schema(details)
+                except FileNotFoundError as e:
+                    st.error(f"Gagal memuat file model/scaler. Pastikan path di 'src/config.py' benar. Detail: {e}"); st.stop()
+                sequence, feature_cols, error_msg = full_preparation_pipeline(df_long, details, mode='numpy', schema=schema)
             if error_msg: st.error(error_msg); st.stop()
             
             st.write("4/4 - Menghitung proyeksi 30 hari ke depan...")
-            all_predicted_prices = forecast_iteratively(models[selected_commodity], scalers[selected_commodity], sequence, feature_cols, details['targets'], future_steps=30)
-            
+            try:
+                cache_key = forecast_cache.make_key(selected_commodity, resolve_model_path(details), sequence, feature_cols, details['targets'], 30)
+            except FileNotFoundError as e:
+                st.error(f"Gagal memuat file model/scaler. Pastikan path di 'src/config.py' benar. Detail: {e}"); st.stop()
+
             forecast_dates = pd.date_range(start=datetime.now() + timedelta(days=1), periods=30)
+
+            def iter_forecast_locally():
+                model, commodity_scalers = load_models_and_dependencies(selected_commodity)
+                yield from iter_forecast(model, commodity_scalers, sequence, feature_cols, details['targets'], future_steps=30, trace=trace)
+
+            def run_forecast():
+                return run_inference(
+                    lambda service: stream_forecast(service.iter_forecast(selected_commodity, sequence, feature_cols, 30, trace=trace), price_history, details, forecast_dates),
+                    lambda: stream_forecast(iter_forecast_locally(), price_history, details, forecast_dates),
+                )
+
+            with trace.stage("forecast_iteratively", rows=30):
+                all_predicted_prices = forecast_cache.get_or_compute(cache_key, run_forecast)
+
             df_forecast = pd.DataFrame(all_predicted_prices, index=forecast_dates, columns=details['targets'])
             df_forecast.index.name = "Tanggal"
+
+            forecast_bands = None
+            if show_intervals:
+                # Residual out-of-sample dari `python -m src.backtest` untuk model yang sama; jika belum ada,
+                # interval memakai perubahan harga harian di jendela input (volatilitas, bukan error model)
+                backtest_residuals = load_residuals(selected_commodity, file_hash(resolve_model_path(details)), details['targets'])
+                residuals = None if backtest_residuals is None else backtest_residuals['residuals']
+                residual_version = "price_change" if backtest_residuals is None else backtest_residuals['version']
+
+                def run_intervals_locally():
+                    model, commodity_scalers = load_models_and_dependencies(selected_commodity)
+                    return forecast_intervals(model, commodity_scalers, sequence, feature_cols, details['targets'], future_steps=30, residuals=residuals, seed=0, trace=trace)
+
+                def run_intervals():
+                    return run_inference(
+                        lambda service: service.forecast_intervals(selected_commodity, sequence, feature_cols, 30, trace=trace, residuals=residuals, seed=0),
+                        run_intervals_locally,
+                    )
+
+                interval_key = forecast_cache.make_key(selected_commodity, resolve_model_path(details), sequence, feature_cols, details['targets'], 30, variant=f"intervals{INTERVAL_QUANTILES}:{residual_version}")
+                with trace.stage("forecast_intervals", rows=30):
+                    bands = forecast_cache.get_or_compute(interval_key, run_intervals)
+                forecast_bands = {
+                    "lower": pd.DataFrame(bands[0], index=forecast_dates, columns=details['targets']),
+                    "upper": pd.DataFrame(bands[-1], index=forecast_dates, columns=details['targets']),
+                    "level": round((INTERVAL_QUANTILES[-1] - INTERVAL_QUANTILES[0]) * 100),
+                    "residuals": None if backtest_residuals is None else len(residuals),
+                }
             
-            st.session_state.results = {"df_forecast": df_forecast, "sequence_history": sequence, "details": details}
+            trace.record_resource("model_registry", model_registry.stats())
+            trace.record_resource("forecast_cache", forecast_cache.stats())
+
+            st.session_state.results = {
+                "df_forecast": df_forecast, "sequence_history": sequence, "price_history": price_history, "details": details,
+                "forecast_bands": forecast_bands,
+                "trace": trace.to_dict() if trace.enabled else None,
+            }
             st.session_state.prediction_generated = True
-            st.rerun()
+        work_area.empty()
 
     if st.session_state.prediction_generated and st.session_state.results:
         display_prediction_results(st.session_state.results)
+        if st.session_state.results.get('trace'):
+            display_instrumentation_panel(st.session_state.results['trace'])
     else:
         st.markdown("---")
         col1, col2, col3 = st.columns(3)
@@ -253,6 +497,11 @@ def main():
             st.write("Gunakan data, analisis fluktuasi, dan proyeksi untuk membantu strategi Anda.")
         st.info("**Selamat Datang!** Silakan pilih parameter pada panel di sebelah kiri untuk memulai.", icon="👋")
 
+    # UI sudah tampil: muat model komoditas lain di background agar klik berikutnya tidak menunggu
+    # (tidak perlu jika inferensi berjalan di worker pool, yang memuat modelnya sendiri)
+    if inference_service is None:
+        model_registry.prewarm()
+
 
 # =============================================================================
 # ENTRY POINT APP
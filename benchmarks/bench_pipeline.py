@@ -0,0 +1,199 @@
+"""
+Benchmark jalur data, feature engineering, dan forecasting (offline, CPU saja).
+
+Jalankan dari root repository:
+
+    python -m benchmarks.bench_pipeline --days 90 365 1095 --output benchmarks/results/hasil.json
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/sebelumnya.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from src.config import COMMODITY_CONFIG
+from src.data_handler import reshape_and_clean_data
+from src.feature_engineering import add_lag_and_rolling_features, full_preparation_pipeline
+from src.predictions import (MODEL_VARIANTS, CompiledPredictor, forecast_batch, forecast_iteratively, load_predictor,
+                             load_scalers, resolve_model_path, variant_path)
+
+from .synthetic import synthetic_wide_frame
+
+FUTURE_STEPS = 30
+BATCH_SCENARIOS = 8
+
+
+class StubModel:
+    """Model pengganti yang murah dan deterministik, untuk mengukur overhead di luar model."""
+
+    def __init__(self, n_features, n_targets, seed=0):
+        rng = np.random.default_rng(seed)
+        self.weights = rng.normal(0, 0.1, size=(n_features, n_targets)).astype(np.float32)
+
+    def predict(self, model_input, verbose=0):
+        x = np.asarray(model_input, dtype=np.float32).mean(axis=1)
+        return 1.0 / (1.0 + np.exp(-(x @ self.weights)))
+
+
+def time_call(fn, repeat, warmup=1):
+    """Menjalankan `fn` beberapa kali dan mengembalikan statistik waktu (ms)."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+    }
+
+
+def real_backends(details):
+    """
+    Model asli yang tersedia: `.npz` tanpa varian, setiap varian hasil `src.package_models`,
+    dan, jika TensorFlow terpasang, Keras .h5.
+    """
+    backends = {}
+    try:
+        predictor = load_predictor(details, variant="")
+        backends[f"real:{type(predictor).__name__}"] = predictor
+    except FileNotFoundError as e:
+        print(f"[SKIP] model serving tidak tersedia: {e}", file=sys.stderr)
+
+    for variant in MODEL_VARIANTS:
+        if details.get('npz_path') and resolve_model_path(details, variant) == variant_path(details, variant):
+            backends[f"real:NumpyPredictor[{variant}]"] = load_predictor(details, variant=variant)
+
+    if os.path.exists(details['model_path']) and 'real:CompiledPredictor' not in backends:
+        try:
+            from tensorflow.keras.models import load_model
+        except ImportError:
+            print("[SKIP] TensorFlow tidak terpasang, benchmark model .h5 dilewati.", file=sys.stderr)
+        else:
+            backends['real:CompiledPredictor'] = CompiledPredictor(load_model(details['model_path'])).warmup()
+    return backends
+
+
+def run_benchmarks(commodity, days_list, n_subcommodities, noise, missing_rate, repeat, use_real_models=True):
+    details = COMMODITY_CONFIG[commodity]
+    targets = details['targets']
+    scalers = load_scalers(details)
+    backends = real_backends(details) if use_real_models else {}
+
+    results = []
+    for days in days_list:
+        df_raw = synthetic_wide_frame(days, end_date=date(2025, 6, 30), n_subcommodities=n_subcommodities,
+                                      noise=noise, missing_rate=missing_rate)
+        df_long = reshape_and_clean_data(df_raw, details)
+        df_pivot = df_long.pivot_table(index='date', columns='komoditas_sub', values='harga', observed=True).asfreq('D')
+        sequence, feature_cols, error_msg = full_preparation_pipeline(df_long, details)
+        if error_msg:
+            raise RuntimeError(error_msg)
+
+        timings = {
+            'reshape_and_clean_data': time_call(lambda: reshape_and_clean_data(df_raw, details), repeat),
+            'full_preparation_pipeline': time_call(lambda: full_preparation_pipeline(df_long, details), repeat),
+            'full_preparation_pipeline[numpy]': time_call(lambda: full_preparation_pipeline(df_long, details, mode='numpy'), repeat),
+            'add_lag_and_rolling_features': time_call(lambda: add_lag_and_rolling_features(df_pivot, targets), repeat),
+        }
+        models = {'stub': StubModel(len(feature_cols), len(targets)), **backends}
+        for name, model in models.items():
+            timings[f'forecast_iteratively[{name}]'] = time_call(
+                lambda: forecast_iteratively(model, scalers, sequence, feature_cols, targets, future_steps=FUTURE_STEPS), repeat
+            )
+            timings[f'forecast_batch[{name},K={BATCH_SCENARIOS}]'] = time_call(
+                lambda: forecast_batch(model, scalers, [sequence] * BATCH_SCENARIOS, feature_cols, targets, future_steps=FUTURE_STEPS), repeat
+            )
+
+        results.append({
+            'days': days,
+            'raw_shape': list(df_raw.shape),
+            'long_rows': len(df_long),
+            'timings': timings,
+        })
+        print(f"[OK] {days} hari: " + ", ".join(f"{k}={v['median_ms']:.1f}ms" for k, v in timings.items()))
+    return results
+
+
+def environment_info():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare_reports(current, previous):
+    """Mencetak rasio median waktu terhadap laporan sebelumnya (>1 berarti lebih lambat)."""
+    previous_by_days = {entry['days']: entry['timings'] for entry in previous['results']}
+    for entry in current['results']:
+        before = previous_by_days.get(entry['days'])
+        if before is None:
+            continue
+        for name, timing in entry['timings'].items():
+            if name in before:
+                ratio = timing['median_ms'] / before[name]['median_ms']
+                flag = "  <-- REGRESI" if ratio > 1.2 else ""
+                print(f"{entry['days']:>6} hari  {name:<50} {before[name]['median_ms']:>9.1f}ms -> {timing['median_ms']:>9.1f}ms  x{ratio:.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commodity", default="Beras", choices=list(COMMODITY_CONFIG))
+    parser.add_argument("--days", type=int, nargs='+', default=[90, 365, 1095], help="Panjang data sintetis (hari).")
+    parser.add_argument("--subcommodities", type=int, default=None, help="Jumlah sub-komoditas pada frame sintetis.")
+    parser.add_argument("--noise", type=float, default=50.0, help="Standar deviasi random walk harga harian.")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="Proporsi sel harga kosong ('-').")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stub-only", action="store_true", help="Hanya memakai stub model (tanpa model asli).")
+    parser.add_argument("--output", default=None, help="Path file JSON hasil (default: benchmarks/results/bench_<waktu>.json).")
+    parser.add_argument("--compare", default=None, help="Laporan JSON sebelumnya untuk dibandingkan.")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'parameters': {
+            'commodity': args.commodity, 'days': args.days, 'subcommodities': args.subcommodities,
+            'noise': args.noise, 'missing_rate': args.missing_rate, 'repeat': args.repeat,
+            'future_steps': FUTURE_STEPS,
+        },
+        'results': run_benchmarks(args.commodity, args.days, args.subcommodities, args.noise,
+                                  args.missing_rate, args.repeat, use_real_models=not args.stub_only),
+    }
+
+    output = args.output or os.path.join("benchmarks", "results", f"bench_{datetime.now():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan di {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_reports(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Load test offline: banyak pengguna simulasi menjalankan alur `main()` app secara bersamaan terhadap stub API BI.
+
+Driver menjalankan server `streamlit run app.py` sungguhan (diarahkan ke stub API BI lokal), lalu setiap
+pengguna simulasi terhubung lewat protokol websocket yang sama dengan browser: membuka halaman, memilih
+komoditas dan rentang tanggal acak, lalu menekan tombol proyeksi. Waktu setiap tahap server diambil dari
+tabel instrumentasi app. Hasilnya p50/p95/p99 latensi dan throughput per tahap. Jalankan dari root repository:
+
+    python -m benchmarks.load_test --users 40 --concurrency 8 --latency-ms 300 --failure-rate 0.05
+    python -m benchmarks.load_test --app-url http://127.0.0.1:8501 --users 100 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pyarrow as pa
+import requests
+
+from src.config import COMMODITY_CONFIG
+
+from .bench_pipeline import environment_info
+from .stub_bi_server import StubBIServer
+
+APP_PATH = "app.py"
+DEFAULT_HISTORY_DAYS = 90
+DEFAULT_PORT = 8599
+SERVER_START_TIMEOUT_SECONDS = 120
+SESSION_TIMEOUT_SECONDS = 600
+PERCENTILES = (50, 95, 99)
+
+COMMODITY_LABEL = "Pilih Kelompok Komoditas"
+START_DATE_LABEL = "Dari Tanggal"
+END_DATE_LABEL = "Hingga Tanggal"
+PREDICT_LABEL = "💰 Cek Proyeksi Harga"
+INTERVALS_LABEL = "📊 Tampilkan interval prediksi"
+INSTRUMENTATION_LABEL = "🔬 Tampilkan instrumentasi pipeline"
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class StreamlitSession:
+    """
+    Klien websocket minimal untuk satu sesi Streamlit, setara dengan satu tab browser.
+
+    `run` mengirim permintaan rerun beserta state widget dan mengumpulkan elemen yang dikirim server
+    sampai script selesai. Widget dikenali lewat label-nya, seperti pengguna melihatnya di layar.
+    """
+
+    def __init__(self, app_url):
+        self.stream_url = app_url.rstrip('/').replace('http', 'ws', 1) + "/_stcore/stream"
+        self.widgets = {}
+        self.elements = []
+        self._widget_values = {}
+        self._message_cache = {}
+        self._connection = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        self._connection = await websocket_connect(self.stream_url, max_message_size=256 * 1024 ** 2)
+        return self
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+    def set_value(self, label, value):
+        """Mengubah nilai widget (berlaku pada `run` berikutnya), seperti `AppTest`."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        element_type, widget = self.widgets[label]
+        state = WidgetState(id=widget.id)
+        if element_type == 'selectbox':
+            state.int_value = list(widget.options).index(value)
+        elif element_type == 'date_input':
+            state.string_array_value.data.append(value.strftime('%Y/%m/%d'))
+        elif element_type == 'checkbox':
+            state.bool_value = value
+        else:
+            raise ValueError(f"Widget '{label}' ({element_type}) belum didukung oleh driver.")
+        self._widget_values[widget.id] = state
+
+    async def run(self, click=None, timeout=SESSION_TIMEOUT_SECONDS):
+        """Menjalankan ulang script (opsional sambil menekan tombol `click`) dan menunggu sampai selesai."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = ""
+        message.rerun_script.widget_states.widgets.extend(self._widget_values.values())
+        if click is not None:
+            message.rerun_script.widget_states.widgets.append(WidgetState(id=self.widgets[click][1].id, trigger_value=True))
+        self.elements = []
+        self._connection.write_message(message.SerializeToString(), binary=True)
+
+        while True:
+            raw = await asyncio.wait_for(self._connection.read_message(), timeout)
+            if raw is None:
+                raise ConnectionError("Koneksi websocket ditutup oleh server.")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            if forward.ref_hash:
+                forward = self._message_cache[forward.ref_hash]
+            elif forward.metadata.cacheable:
+                self._message_cache[forward.hash] = forward
+
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                self._add_element(forward.delta.new_element)
+            elif kind == 'script_finished' and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return self
+
+    def _add_element(self, element):
+        element_type = element.WhichOneof('type')
+        proto = getattr(element, element_type)
+        self.elements.append((element_type, proto))
+        if getattr(proto, 'id', None) and getattr(proto, 'label', None):
+            self.widgets[proto.label] = (element_type, proto)
+
+    def alerts(self, alert_format):
+        from streamlit.proto.Alert_pb2 import Alert
+
+        code = Alert.Format.Value(alert_format)
+        return [proto.body for element_type, proto in self.elements if element_type == 'alert' and proto.format == code]
+
+    def exceptions(self):
+        return [f"{proto.type}: {proto.message}" for element_type, proto in self.elements if element_type == 'exception']
+
+    def dataframes(self):
+        return [
+            pa.ipc.open_stream(proto.data).read_pandas()
+            for element_type, proto in self.elements if element_type == 'arrow_data_frame'
+        ]
+
+
+async def simulate_user(app_url, user_id, commodity, start_date, end_date, show_intervals=False):
+    """
+    Menjalankan satu sesi: membuka halaman, mengisi parameter di sidebar, dan menekan tombol proyeksi.
+    Mengembalikan hasil sesi: waktu setiap tahap (ms), pesan error/peringatan, dan status sukses.
+    """
+    result = {'user': user_id, 'commodity': commodity, 'start_date': start_date.isoformat(),
+              'end_date': end_date.isoformat(), 'stages': {}, 'errors': [], 'warnings': []}
+    session = StreamlitSession(app_url)
+    started = time.perf_counter()
+    try:
+        await session.connect()
+        await session.run()
+        result['stages']['page_load'] = (time.perf_counter() - started) * 1000
+
+        session.set_value(COMMODITY_LABEL, commodity)
+        session.set_value(START_DATE_LABEL, start_date)
+        session.set_value(END_DATE_LABEL, end_date)
+        session.set_value(INTERVALS_LABEL, show_intervals)
+        session.set_value(INSTRUMENTATION_LABEL, True)
+        click_started = time.perf_counter()
+        await session.run(click=PREDICT_LABEL)
+        result['stages']['forecast_request'] = (time.perf_counter() - click_started) * 1000
+
+        result['errors'] = session.exceptions() + session.alerts('ERROR')
+        result['warnings'] = session.alerts('WARNING')
+        for frame in session.dataframes():
+            if {'stage', 'wall_ms'} <= set(frame.columns):
+                result['stages'].update(zip(frame['stage'], frame['wall_ms'].astype(float)))
+    except Exception as e:
+        result['errors'].append(f"{type(e).__name__}: {e}")
+    finally:
+        session.close()
+
+    result['stages']['end_to_end'] = (time.perf_counter() - started) * 1000
+    result['ok'] = not result['errors'] and 'forecast_iteratively' in result['stages']
+    return result
+
+
+def plan_users(n_users, commodities, history_days, spread_days, today, seed=0):
+    """Parameter setiap pengguna: komoditas acak dan tanggal akhir acak dalam `spread_days` hari terakhir."""
+    rng = random.Random(seed)
+    plans = []
+    for user_id in range(n_users):
+        end_date = today - timedelta(days=rng.randint(0, spread_days))
+        plans.append((user_id, rng.choice(commodities), end_date - timedelta(days=history_days), end_date))
+    return plans
+
+
+async def run_load_test(app_url, plans, concurrency, show_intervals=False, progress=True):
+    """Menjalankan semua pengguna dengan paling banyak `concurrency` sesi bersamaan."""
+    slots = asyncio.Semaphore(concurrency)
+    results = []
+    started = time.perf_counter()
+
+    async def _run(plan):
+        async with slots:
+            result = await simulate_user(app_url, *plan, show_intervals=show_intervals)
+        results.append(result)
+        if progress:
+            status = "OK" if result['ok'] else "GAGAL"
+            print(f"[{status}] pengguna {result['user']:>4} {result['commodity']:<14} "
+                  f"{result['stages']['end_to_end']:>9.0f}ms ({len(results)}/{len(plans)})", flush=True)
+
+    await asyncio.gather(*(_run(plan) for plan in plans))
+    return results, time.perf_counter() - started
+
+
+def start_app_server(port, env):
+    """Menjalankan `streamlit run app.py` di proses terpisah dan menunggu sampai server siap."""
+    command = [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless", "true",
+               "--server.port", str(port), "--browser.gatherUsageStats", "false"]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    app_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server Streamlit berhenti saat start (exit code {server.returncode}).")
+        try:
+            if requests.get(f"{app_url}/_stcore/health", timeout=1).ok:
+                return server, app_url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Server Streamlit tidak siap dalam {SERVER_START_TIMEOUT_SECONDS} detik.")
+
+
+def summarize(results, duration_seconds):
+    """Persentil latensi (ms) dan throughput (per detik, terhadap durasi total) setiap tahap."""
+    stages = {}
+    for result in results:
+        for stage, wall_ms in result['stages'].items():
+            stages.setdefault(stage, []).append(wall_ms)
+
+    summary = {}
+    for stage, timings in stages.items():
+        values = np.asarray(timings)
+        summary[stage] = {
+            'count': len(values),
+            **{f'p{p}_ms': float(np.percentile(values, p)) for p in PERCENTILES},
+            'max_ms': float(values.max()),
+            'throughput_per_s': len(values) / duration_seconds,
+        }
+    return summary
+
+
+def print_summary(summary, results, duration_seconds, stub_stats=None):
+    ok = sum(result['ok'] for result in results)
+    print(f"\n{len(results)} pengguna dalam {duration_seconds:.1f}s: {ok} sukses, {len(results) - ok} gagal, "
+          f"{ok / duration_seconds:.2f} proyeksi sukses/detik")
+    header = f"{'tahap':<28}{'n':>6}" + "".join(f"{f'p{p} (ms)':>12}" for p in PERCENTILES) + f"{'maks (ms)':>12}{'per detik':>11}"
+    print(header)
+    print("-" * len(header))
+    for stage, stats in summary.items():
+        print(f"{stage:<28}{stats['count']:>6}" + "".join(f"{stats[f'p{p}_ms']:>12.1f}" for p in PERCENTILES)
+              + f"{stats['max_ms']:>12.1f}{stats['throughput_per_s']:>11.2f}")
+
+    errors = {}
+    for result in results:
+        for message in result['errors']:
+            first_line = message.splitlines()[0][:120]
+            errors[first_line] = errors.get(first_line, 0) + 1
+    for message, count in sorted(errors.items(), key=lambda item: -item[1]):
+        print(f"[GAGAL x{count}] {message}")
+    if stub_stats:
+        print(f"Stub API BI: {stub_stats}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="Jumlah pengguna simulasi.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jumlah sesi yang berjalan bersamaan.")
+    parser.add_argument("--commodity", action="append", choices=list(COMMODITY_CONFIG), help="Komoditas yang dipilih pengguna (default: semua).")
+    parser.add_argument("--history-days", type=int, default=DEFAULT_HISTORY_DAYS, help="Panjang rentang tanggal setiap pengguna.")
+    parser.add_argument("--spread-days", type=int, default=30,
+                        help="Tanggal akhir diacak dalam N hari terakhir, agar tidak semua pengguna mengenai cache yang sama.")
+    parser.add_argument("--end-date", type=_parse_date, default=date.today(), help="Tanggal akhir terbaru (default: hari ini).")
+    parser.add_argument("--intervals", action="store_true", help="Pengguna juga meminta interval prediksi.")
+    parser.add_argument("--app-url", default=None, help="Pakai server app yang sudah berjalan, alih-alih menjalankan server sendiri.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port server app yang dijalankan driver.")
+    parser.add_argument("--bi-url", default=None, help="Pakai stub/API yang sudah berjalan, alih-alih stub internal.")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Latensi stub internal per request.")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Standar deviasi latensi stub internal.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Proporsi request stub internal yang gagal (HTTP 500).")
+    parser.add_argument("--store", default=None, help="Path price store SQLite (default: file baru di direktori sementara, cold start).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Simpan ringkasan dan hasil per pengguna sebagai JSON.")
+    args = parser.parse_args(argv)
+
+    stub, server = None, None
+    if args.app_url is None and args.bi_url is None:
+        stub = StubBIServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            failure_rate=args.failure_rate, seed=args.seed).start()
+    app_url = args.app_url
+    if app_url is None:
+        workdir = tempfile.mkdtemp(prefix="pangan-load-")
+        env = dict(
+            os.environ,
+            BI_API_URL=args.bi_url or stub.url,
+            PRICE_STORE_PATH=args.store or os.path.join(workdir, "price_store.sqlite"),
+            # Artifact job batch dan cache forecast lama tidak boleh memotong alur yang diukur
+            FORECAST_ARTIFACT_DIR=os.path.join(workdir, "forecasts"),
+            FORECAST_CACHE_DIR="",
+            PANGAN_INSTRUMENTATION_MEMORY="0",
+        )
+        server, app_url = start_app_server(args.port, env)
+
+    plans = plan_users(args.users, args.commodity or list(COMMODITY_CONFIG), args.history_days,
+                       args.spread_days, args.end_date, seed=args.seed)
+    try:
+        results, duration = asyncio.run(run_load_test(app_url, plans, args.concurrency, show_intervals=args.intervals))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    summary = summarize(results, duration)
+    stub_stats = stub.stats() if stub else None
+    print_summary(summary, results, duration, stub_stats)
+    if stub:
+        stub.stop()
+
+    if args.output:
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': environment_info(),
+            'parameters': vars(args) | {'end_date': args.end_date.isoformat()},
+            'duration_seconds': duration,
+            'summary': summary,
+            'stub': stub_stats,
+            'results': sorted(results, key=lambda result: result['user']),
+        }
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan di {args.output}")
+    return 0 if all(result['ok'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
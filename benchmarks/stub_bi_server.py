@@ -0,0 +1,177 @@
+"""
+Server HTTP lokal pengganti endpoint Bank Indonesia `GetGridDataDaerah`, untuk load test offline.
+
+Respons berformat sama dengan API asli ({"data": [baris format lebar]}): data disintesis lewat
+`synthetic_records` (deterministik per wilayah), atau diputar ulang dari respons yang pernah
+disimpan (`--replay`). Latensi dan tingkat kegagalan (HTTP 500) dapat diatur.
+Jalankan dari root repository, lalu arahkan app ke server ini lewat `BI_API_URL`:
+
+    python -m benchmarks.stub_bi_server --port 8765 --latency-ms 300 --jitter-ms 100 --failure-rate 0.05
+    BI_API_URL=http://127.0.0.1:8765/ streamlit run app.py
+"""
+import argparse
+import bisect
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .synthetic import synthetic_records
+
+# Semua wilayah disintesis dari tanggal awal yang sama, sehingga potongan per bulan saling menyambung
+SYNTHETIC_ORIGIN = date(2018, 1, 1)
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def index_records(records):
+    """
+    Memisahkan kolom identitas dan kolom tanggal ('dd/mm/yyyy') dari baris format lebar.
+    Mengembalikan (records, kolom identitas, tanggal terurut, kolom tanggal sesuai urutan tanggal).
+    """
+    identity, dated = [], []
+    for column in (records[0] if records else {}):
+        try:
+            dated.append((datetime.strptime(column, '%d/%m/%Y').date(), column))
+        except (TypeError, ValueError):
+            identity.append(column)
+    dated.sort()
+    return records, identity, [value for value, _ in dated], [column for _, column in dated]
+
+
+def load_replay(path):
+    """Membaca respons API yang disimpan (objek {"data": [...]} atau langsung daftar baris)."""
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    return payload.get('data', []) if isinstance(payload, dict) else payload
+
+
+class StubBIServer:
+    """
+    Server stub yang berjalan di background thread. Setiap request ditunda `latency_ms` ± `jitter_ms`,
+    lalu gagal dengan HTTP 500 dengan peluang `failure_rate`. Jumlah request dan kegagalan dicatat di `stats()`.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, failure_rate=0.0,
+                 missing_rate=0.0, replay=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.missing_rate = missing_rate
+        self.replay = index_records(load_replay(replay)) if replay else None
+        self._random = random.Random(seed)
+        self._seed = seed
+        self._lock = threading.Lock()
+        self._synthetic = {}
+        self._stats = {'requests': 0, 'failures': 0, 'rows': 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                status, body = stub.respond(parse_qs(urlparse(self.path).query))
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def _region_records(self, region, end_date):
+        """Baris sintetis (hasil `index_records`) dari SYNTHETIC_ORIGIN sampai minimal `end_date`, di-cache per wilayah."""
+        with self._lock:
+            cached_end, indexed = self._synthetic.get(region, (None, None))
+            if cached_end is None or cached_end < end_date:
+                cached_end = max(end_date, date.today())
+                seed = zlib.crc32(f"{self._seed}:{region[0]}:{region[1]}".encode('utf-8'))
+                indexed = index_records(synthetic_records(SYNTHETIC_ORIGIN, cached_end, missing_rate=self.missing_rate, seed=seed))
+                self._synthetic[region] = (cached_end, indexed)
+            return indexed
+
+    def respond(self, query):
+        """Mengembalikan (status HTTP, body JSON) untuk parameter query GetGridDataDaerah."""
+        with self._lock:
+            self._stats['requests'] += 1
+            delay = max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+            fail = self._random.random() < self.failure_rate
+        time.sleep(delay / 1000)
+        if fail:
+            with self._lock:
+                self._stats['failures'] += 1
+            return 500, {'error': 'Kegagalan simulasi dari stub server.'}
+
+        try:
+            start_date = _parse_date(query['start_date'][0])
+            end_date = _parse_date(query['end_date'][0])
+        except (KeyError, ValueError):
+            return 400, {'error': 'Parameter start_date/end_date tidak valid.'}
+
+        region = (query.get('province_id', [''])[0], query.get('regency_id', [''])[0])
+        records, identity, dates, date_columns = self.replay or self._region_records(region, end_date)
+        columns = identity + date_columns[bisect.bisect_left(dates, start_date):bisect.bisect_right(dates, end_date)]
+        data = [{column: record[column] for column in columns if column in record} for record in records]
+        with self._lock:
+            self._stats['rows'] += len(data)
+        return 200, {'data': data}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-bi-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Rata-rata latensi setiap request.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Standar deviasi latensi (distribusi normal).")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Proporsi request yang dijawab HTTP 500.")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="Proporsi sel harga kosong ('-') pada data sintetis.")
+    parser.add_argument("--replay", default=None, help="File JSON respons API asli yang diputar ulang (dipotong sesuai rentang tanggal).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = StubBIServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.failure_rate,
+                          args.missing_rate, args.replay, args.seed).start()
+    print(f"Stub API Bank Indonesia berjalan di {server.url} (Ctrl+C untuk berhenti)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\nStatistik: {server.stats()}")
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Generator data sintetis berformat respons API Bank Indonesia (GetGridDataDaerah),
+untuk benchmark dan pengujian offline.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.config import COMMODITY_CONFIG
+
+
+def synthetic_records(start_date, end_date, n_subcommodities=None, noise=50.0, missing_rate=0.0, seed=0):
+    """
+    Membuat baris data mentah format lebar: kolom identitas ('no', 'name', 'level') dan satu kolom
+    per tanggal ('dd/mm/yyyy') berisi harga bertipe string dengan pemisah ribuan (contoh: '14,050').
+
+    Semua sub-komoditas di COMMODITY_CONFIG selalu disertakan; jika `n_subcommodities` lebih besar,
+    ditambahkan sub-komoditas pengisi agar ukuran data bisa diatur.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, end_date, freq='D')
+    date_columns = dates.strftime('%d/%m/%Y')
+
+    names = []
+    for details in COMMODITY_CONFIG.values():
+        names.append((details['main'], 1))
+        names.extend((target, 2) for target in details['targets'])
+    if n_subcommodities is not None:
+        extra = n_subcommodities - sum(level == 2 for _, level in names)
+        names.extend((f"Komoditas Sintetis {i + 1}", 2) for i in range(max(extra, 0)))
+
+    base = rng.uniform(10_000, 40_000, size=len(names))
+    # Random walk harian + pola mingguan ringan
+    walk = np.cumsum(rng.normal(0, noise, size=(len(names), len(dates))), axis=1)
+    weekly = 0.002 * base[:, None] * np.sin(2 * np.pi * dates.dayofweek.values / 7)[None, :]
+    prices = np.round(np.maximum(base[:, None] + walk + weekly, 1_000)).astype(np.int64)
+
+    records = []
+    for i, (name, level) in enumerate(names):
+        record = {'no': str(i + 1), 'name': name, 'level': level}
+        missing = rng.random(len(dates)) < missing_rate
+        for column, price, is_missing in zip(date_columns, prices[i], missing):
+            record[column] = '-' if is_missing else f"{price:,}"
+        records.append(record)
+    return records
+
+
+def synthetic_wide_frame(days=365, end_date=None, n_subcommodities=None, noise=50.0, missing_rate=0.0, seed=0):
+    """Frame lebar seperti hasil `fetch_bi_data` untuk `days` hari yang berakhir di `end_date`."""
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    return pd.DataFrame(synthetic_records(start_date, end_date, n_subcommodities, noise, missing_rate, seed))
@@ -0,0 +1,183 @@
+"""
+Backtesting walk-forward untuk model yang di-deploy: setiap tanggal di histori dipakai sebagai titik awal
+(origin) forecast 1..HORIZON hari, lalu dibandingkan dengan harga aktual (MAE dan MAPE per sub-komoditas dan horizon).
+Residual out-of-sample 1 hari disimpan ke folder artifact komoditas dan dipakai app untuk interval prediksi.
+Jalankan dari root repository:
+
+    python -m src.backtest [--end-date YYYY-MM-DD] [--days 455] [--commodity Beras] [--output hasil.csv]
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import COMMODITY_CONFIG
+from .data_handler import require_bi_data, reshape_and_clean_data
+from .feature_engineering import SEQ_LENGTH, prepare_dense_history
+from .forecast_artifacts import write_residuals
+from .forecast_cache import file_hash
+from .instrumentation import NULL_TRACE
+from .predictions import ModelRegistry, forecast_batch, load_feature_schema, resolve_model_path
+
+HORIZON = 30
+DEFAULT_BATCH_SIZE = 256
+# Satu tahun origin harian + warm-up fitur (lag/rolling), jendela input, dan horizon terakhir
+DEFAULT_HISTORY_DAYS = 365 + 2 * SEQ_LENGTH + HORIZON
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def observed_prices(df_long, target_cols, dates):
+    """Harga aktual yang benar-benar teramati (tanpa interpolasi) pada `dates`; NaN jika tidak ada data."""
+    df_pivot = df_long.pivot_table(index='date', columns='komoditas_sub', values='harga', observed=True)
+    return df_pivot.reindex(index=dates, columns=target_cols).to_numpy(dtype=np.float64)
+
+
+def walk_forward_forecasts(model, scalers, df_long, commodity_details, schema=None, horizon=HORIZON,
+                           batch_size=DEFAULT_BATCH_SIZE, trace=NULL_TRACE):
+    """
+    Menjalankan forecast dari setiap origin yang masih memiliki minimal satu hari aktual sesudahnya.
+
+    Jendela origin disusun dari array histori (`PreparedWindow.windows`) hanya dengan data sampai
+    tanggal origin, sehingga celah data tidak diisi dengan harga sesudahnya (tanpa look-ahead), dan diproses
+    per batch (`batch_size` jendela sekaligus) lewat `forecast_batch`, sehingga setiap langkah horizon
+    hanya satu panggilan model untuk seluruh batch. Mengembalikan (prediksi, aktual), masing-masing
+    berbentuk (origin x horizon x target); aktual bernilai NaN pada hari yang tidak teramati.
+    """
+    target_cols = commodity_details['targets']
+    history, error_msg = prepare_dense_history(df_long, commodity_details, schema)
+    if error_msg:
+        raise ValueError(error_msg)
+
+    feature_cols = history.schema.feature_cols
+    actuals = observed_prices(df_long, target_cols, history.dates)
+    # Origin hanya dipakai jika setiap target sudah teramati sampai tanggal origin (tidak diisi dari data sesudahnya)
+    origins = np.arange(SEQ_LENGTH - 1, len(history.dates) - 1)
+    origins = origins[history.observed_by(origins)]
+    if len(origins) == 0:
+        raise ValueError("Histori terlalu pendek untuk backtesting: tidak ada origin dengan data aktual sesudahnya.")
+
+    # Harga aktual untuk setiap (origin, horizon); di luar histori dianggap tidak teramati
+    padded = np.vstack([actuals, np.full((horizon, len(target_cols)), np.nan)])
+    targets = padded[origins[:, None] + np.arange(1, horizon + 1)[None, :]]
+
+    predictions = np.empty_like(targets)
+    for chunk_start in range(0, len(origins), batch_size):
+        chunk = origins[chunk_start:chunk_start + batch_size]
+        with trace.stage("backtest_batch", rows=len(chunk)):
+            sequences = history.windows(chunk)
+            predictions[chunk_start:chunk_start + len(chunk)] = forecast_batch(
+                model, scalers, sequences, feature_cols, target_cols, future_steps=horizon, trace=trace
+            )
+    return predictions, targets
+
+
+def error_report(predictions, targets, target_cols):
+    """
+    MAE dan MAPE per sub-komoditas dan horizon, hanya pada hari yang harganya benar-benar teramati.
+    Mengembalikan DataFrame tidy: komoditas_sub, horizon, mae, mape, n.
+    """
+    horizon = predictions.shape[1]
+    abs_error = np.abs(predictions - targets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct_error = abs_error / np.abs(targets) * 100
+    counts = (~np.isnan(abs_error)).sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        mae = np.nansum(abs_error, axis=0) / counts
+        mape = np.nansum(pct_error, axis=0) / counts
+
+    horizons = np.arange(1, horizon + 1)
+    return pd.DataFrame({
+        'komoditas_sub': np.repeat(target_cols, horizon),
+        'horizon': np.tile(horizons, len(target_cols)),
+        'mae': mae.T.ravel(),
+        'mape': mape.T.ravel(),
+        'n': counts.T.ravel(),
+    })
+
+
+def walk_forward_backtest(model, scalers, df_long, commodity_details, schema=None, horizon=HORIZON,
+                          batch_size=DEFAULT_BATCH_SIZE, trace=NULL_TRACE):
+    """`walk_forward_forecasts` lalu `error_report`: MAE dan MAPE per sub-komoditas dan horizon."""
+    predictions, targets = walk_forward_forecasts(model, scalers, df_long, commodity_details, schema=schema,
+                                                  horizon=horizon, batch_size=batch_size, trace=trace)
+    return error_report(predictions, targets, commodity_details['targets'])
+
+
+def one_step_residuals(predictions, targets):
+    """
+    Residual relatif forecast 1 hari (aktual / prediksi - 1) dari origin yang semua targetnya teramati,
+    dipusatkan ke nol agar interval tetap mengikuti forecast titik. Setiap baris berisi residual semua
+    target di origin yang sama, sehingga korelasi antar sub-komoditas ikut terbawa ke interval prediksi.
+    """
+    residuals = targets[:, 0] / predictions[:, 0] - 1.0
+    residuals = residuals[np.isfinite(residuals).all(axis=1)]
+    if len(residuals) == 0:
+        return residuals
+    return residuals - residuals.mean(axis=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--end-date", type=_parse_date, default=date.today(), help="Tanggal akhir data historis (default: hari ini).")
+    parser.add_argument("--days", type=int, default=DEFAULT_HISTORY_DAYS, help="Panjang data historis yang dipakai (hari).")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="Horizon forecast terjauh (hari).")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Jumlah origin per batch model.")
+    parser.add_argument("--commodity", action="append", choices=list(COMMODITY_CONFIG), help="Komoditas yang diproses (default: semua).")
+    parser.add_argument("--output", default=None, help="Simpan hasil lengkap (semua komoditas) sebagai CSV.")
+    parser.add_argument("--no-residuals", dest="save_residuals", action="store_false",
+                        help="Jangan simpan residual 1 hari untuk interval prediksi di app.")
+    args = parser.parse_args(argv)
+
+    start_date = args.end_date - timedelta(days=args.days)
+    try:
+        df_raw = require_bi_data(start_date.strftime('%Y-%m-%d'), args.end_date.strftime('%Y-%m-%d'))
+    except RuntimeError as e:
+        print(f"[GAGAL] {e}", file=sys.stderr)
+        return 1
+
+    registry = ModelRegistry(COMMODITY_CONFIG)
+    reports, failed = [], []
+    for commodity in args.commodity or COMMODITY_CONFIG:
+        details = COMMODITY_CONFIG[commodity]
+        try:
+            df_long = reshape_and_clean_data(df_raw, details)
+            model, scalers = registry.get(commodity)
+            predictions, targets = walk_forward_forecasts(model, scalers, df_long, details, schema=load_feature_schema(details),
+                                                          horizon=args.horizon, batch_size=args.batch_size)
+        except Exception as e:
+            failed.append(commodity)
+            print(f"[GAGAL] {commodity}: {e}", file=sys.stderr)
+            continue
+
+        report = error_report(predictions, targets, details['targets'])
+        residuals = one_step_residuals(predictions, targets)
+        if args.save_residuals and len(residuals):
+            model_path = resolve_model_path(details)
+            path = write_residuals(commodity, residuals, {
+                'model_path': model_path,
+                'model_hash': file_hash(model_path),
+                'targets': details['targets'],
+                'start_date': start_date.isoformat(),
+                'end_date': args.end_date.isoformat(),
+            })
+            print(f"[OK] {commodity}: {len(residuals)} residual 1 hari disimpan di {path}")
+
+        report.insert(0, 'komoditas', commodity)
+        reports.append(report)
+        summary = report.pivot(index='horizon', columns='komoditas_sub', values='mape')
+        print(f"[OK] {commodity}: MAPE (%) per horizon")
+        print(summary.loc[summary.index.isin([1, 7, 14, 30])].round(2).to_string())
+
+    if args.output and reports:
+        pd.concat(reports, ignore_index=True).to_csv(args.output, index=False)
+        print(f"Hasil disimpan di {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
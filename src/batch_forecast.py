@@ -0,0 +1,112 @@
+"""
+Menghitung forecast semua komoditas di COMMODITY_CONFIG secara headless (misal: job malam hari).
+
+Hasilnya ditulis sebagai artifact berversi yang langsung disajikan oleh app.
+Jalankan dari root repository:
+
+    python -m src.batch_forecast [--end-date YYYY-MM-DD] [--days 90] [--since YYYY-MM-DD]
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from .config import COMMODITY_CONFIG
+from .data_handler import require_bi_data, reshape_and_clean_data
+from .downsampling import history_frame
+from .feature_engineering import full_preparation_pipeline
+from .forecast_artifacts import load_latest_artifact, write_artifact
+from .forecast_cache import file_hash, window_fingerprint
+from .predictions import ModelRegistry, forecast_iteratively, load_feature_schema, resolve_model_path
+
+# Sama dengan rentang default di app, agar artifact bisa langsung dipakai untuk pilihan default user
+DEFAULT_HISTORY_DAYS = 90
+FUTURE_STEPS = 30
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def is_up_to_date(artifact, since, model_hash, fingerprint):
+    """Artifact dianggap masih berlaku jika dibuat setelah `since` dari model dan input yang sama."""
+    if artifact is None or since is None:
+        return False
+    generated_at = datetime.fromisoformat(artifact['generated_at']).date()
+    return (
+        generated_at >= since
+        and artifact.get('model_hash') == model_hash
+        and artifact.get('window_fingerprint') == fingerprint
+    )
+
+
+def run_commodity(commodity, details, registry, df_raw, start_date, end_date, since=None):
+    """Menjalankan reshape -> preparation -> forecast untuk satu komoditas dari data mentah `df_raw`."""
+    df_long = reshape_and_clean_data(df_raw, details)
+    if df_long.empty:
+        raise RuntimeError("Data sub-komoditas target tidak tersedia.")
+
+    sequence, feature_cols, error_msg = full_preparation_pipeline(df_long, details, mode='numpy', schema=load_feature_schema(details))
+    if error_msg:
+        raise RuntimeError(error_msg)
+
+    targets = details['targets']
+    model_path = resolve_model_path(details)
+    model_hash = file_hash(model_path)
+    fingerprint = window_fingerprint(sequence, targets + feature_cols)
+    if is_up_to_date(load_latest_artifact(commodity), since, model_hash, fingerprint):
+        return None
+
+    model, scalers = registry.get(commodity)
+    predictions = forecast_iteratively(model, scalers, sequence, feature_cols, targets, future_steps=FUTURE_STEPS)
+
+    forecast_dates = pd.date_range(start=end_date + timedelta(days=1), periods=FUTURE_STEPS)
+    df_forecast = pd.DataFrame(predictions, index=forecast_dates, columns=targets)
+    df_forecast.index.name = "Tanggal"
+
+    metadata = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'history_end': sequence.index[-1].date().isoformat(),
+        'model_path': model_path,
+        'model_hash': model_hash,
+        'window_fingerprint': fingerprint,
+    }
+    return write_artifact(commodity, df_forecast, sequence[targets], metadata, history_frame(df_long, targets))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--end-date", type=_parse_date, default=date.today(), help="Tanggal akhir data historis (default: hari ini).")
+    parser.add_argument("--days", type=int, default=DEFAULT_HISTORY_DAYS, help="Panjang data historis yang dipakai (hari).")
+    parser.add_argument("--since", type=_parse_date, default=None,
+                        help="Mode inkremental: lewati komoditas yang artifact-nya dibuat sejak tanggal ini dari input dan model yang sama.")
+    parser.add_argument("--commodity", action="append", choices=list(COMMODITY_CONFIG), help="Komoditas yang diproses (default: semua).")
+    args = parser.parse_args(argv)
+
+    start_date = args.end_date - timedelta(days=args.days)
+    # Semua komoditas memakai data yang sama; jika ada potongan yang gagal diambil, tidak ada yang diforecast
+    try:
+        df_raw = require_bi_data(start_date.strftime('%Y-%m-%d'), args.end_date.strftime('%Y-%m-%d'))
+    except RuntimeError as e:
+        print(f"[GAGAL] {e}", file=sys.stderr)
+        return 1
+
+    registry = ModelRegistry(COMMODITY_CONFIG)
+    failed = []
+
+    for commodity in args.commodity or COMMODITY_CONFIG:
+        try:
+            path = run_commodity(commodity, COMMODITY_CONFIG[commodity], registry, df_raw, start_date, args.end_date, since=args.since)
+        except Exception as e:
+            failed.append(commodity)
+            print(f"[GAGAL] {commodity}: {e}", file=sys.stderr)
+            continue
+        print(f"[OK] {commodity}: {path}" if path else f"[SKIP] {commodity}: artifact masih berlaku.")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,8 @@ COMMODITY_CONFIG = {
         ],
         # Model terbaik untuk Beras adalah 'stacked'
         "model_path": "models/Beras_stacked_model.h5",
+        # Hasil ekspor untuk engine NumPy (dipakai jika tersedia, tanpa TensorFlow)
+        "npz_path": "models/Beras_stacked_model.npz",
         "scaler_x_path": "models/Beras_scaler_X.pkl",
         "scaler_y_path": "models/Beras_scaler_y.pkl"
     },
@@ -16,6 +18,8 @@ COMMODITY_CONFIG = {
         "targets": ["Telur Ayam Ras Segar"],
         # Model terbaik untuk Telur Ayam adalah 'bidirectional'
         "model_path": "models/Telur Ayam_bidirectional_model.h5",
+        # Hasil ekspor untuk engine NumPy (dipakai jika tersedia, tanpa TensorFlow)
+        "npz_path": "models/Telur Ayam_bidirectional_model.npz",
         "scaler_x_path": "models/Telur Ayam_scaler_X.pkl",
         "scaler_y_path": "models/Telur Ayam_scaler_y.pkl"
     },
@@ -28,7 +32,21 @@ COMMODITY_CONFIG = {
         ],
         # Model terbaik untuk Minyak Goreng adalah 'baseline'
         "model_path": "models/Minyak Goreng_baseline_model.h5",
+        # Hasil ekspor untuk engine NumPy (dipakai jika tersedia, tanpa TensorFlow)
+        "npz_path": "models/Minyak Goreng_baseline_model.npz",
         "scaler_x_path": "models/Minyak Goreng_scaler_X.pkl",
         "scaler_y_path": "models/Minyak Goreng_scaler_y.pkl"
     }
-}
\ No newline at end of file
+}
+# Wilayah yang dapat dipilih. `province_id`/`regency_id` mengikuti parameter endpoint
+# PIHPS Bank Indonesia (`regency_id` kosong = agregat tingkat provinsi).
+# Model dilatih dengan data Jawa Barat dan dipakai untuk semua wilayah.
+# Tambahkan wilayah lain dengan ID dari situs PIHPS, misal:
+#   "Nama Kabupaten/Kota": {"province_id": <id provinsi>, "regency_id": <id kab/kota>},
+REGION_CONFIG = {
+    "Jawa Barat": {"province_id": 12, "regency_id": ""},
+    "DKI Jakarta": {"province_id": 13, "regency_id": ""},
+    "Jawa Tengah": {"province_id": 14, "regency_id": ""},
+    "Jawa Timur": {"province_id": 16, "regency_id": ""},
+}
+DEFAULT_REGION = "Jawa Barat"
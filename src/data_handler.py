@@ -1,52 +1,198 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 import streamlit as st
 import pandas as pd
+import numpy as np
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import DEFAULT_REGION, REGION_CONFIG
+from .price_store import REFRESH_RECENT_DAYS, PriceStore, refresh_window_start
 
-PROVINCE_ID = 12  # Jawa Barat
 # cat_1: Beras, cat_4: Telur Ayam Ras, cat_9: Minyak Goreng
 COMCAT_ID = "cat_1,cat_4,cat_9" 
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def fetch_bi_data(start_date: str, end_date: str):
+# Dapat diarahkan ke stub lokal untuk pengujian/offline
+BI_API_URL = os.environ.get(
+    "BI_API_URL", "https://www.bi.go.id/hargapangan/WebSite/TabelHarga/GetGridDataDaerah"
+)
+PRICE_STORE_PATH = os.environ.get("PRICE_STORE_PATH", "data/price_store.sqlite")
+
+# Pengaturan pengambilan data paralel
+MAX_FETCH_WORKERS = 4
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) dalam detik
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 0.5  # jeda retry: 0.5s, 1s, 2s, 4s
+
+_sessions = {}
+_session_lock = threading.Lock()
+
+def price_store_path(region=DEFAULT_REGION):
+    """Setiap wilayah disimpan di file SQLite sendiri; wilayah default memakai PRICE_STORE_PATH."""
+    if region == DEFAULT_REGION:
+        return PRICE_STORE_PATH
+    root, ext = os.path.splitext(PRICE_STORE_PATH)
+    slug = "".join(ch if ch.isalnum() else "_" for ch in region.lower())
+    return f"{root}__{slug}{ext}"
+
+def get_price_store(region=DEFAULT_REGION):
+    return PriceStore(price_store_path(region))
+
+def get_http_session(retries=True):
     """
-    Mengambil data harga komoditas dari API publik Bank Indonesia.
+    Session HTTP bersama dengan connection pool dan retry ber-backoff eksponensial.
+    `retries=False` memberikan session terpisah yang hanya mencoba sekali (tanpa retry).
     """
-    url = "https://www.bi.go.id/hargapangan/WebSite/TabelHarga/GetGridDataDaerah"
+    with _session_lock:
+        if retries not in _sessions:
+            retry = Retry(
+                total=MAX_RETRIES if retries else 0,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"],
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_FETCH_WORKERS, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[retries] = session
+        return _sessions[retries]
+
+def split_into_month_chunks(start_date, end_date):
+    """Memecah rentang tanggal menjadi potongan per bulan kalender."""
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        next_month = (chunk_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(next_month - timedelta(days=1), end_date)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+def request_bi_grid(start_date: str, end_date: str, region=DEFAULT_REGION, retries=True):
+    """
+    Memanggil endpoint GetGridDataDaerah untuk satu rentang tanggal dan satu wilayah,
+    lalu mengembalikan baris data mentahnya.
+    """
+    region_params = REGION_CONFIG[region]
     params = {
         "price_type_id": 1,
         "comcat_id": COMCAT_ID,
-        "province_id": PROVINCE_ID,
-        "regency_id": "",
+        "province_id": region_params["province_id"],
+        "regency_id": region_params.get("regency_id", ""),
         "market_id": "",
         "tipe_laporan": 1,
         "start_date": start_date,
         "end_date": end_date,
-        "_": str(int(datetime.now().timestamp() * 1000))
     }
-    
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        json_data = response.json()
-
-        if 'data' not in json_data or not json_data['data']:
-            st.warning("API Bank Indonesia tidak mengembalikan data untuk rentang tanggal yang dipilih.")
-            return pd.DataFrame()
-        
-        return pd.DataFrame(json_data['data'])
-    
-    except requests.exceptions.RequestException as e:
-        st.error(f"Gagal menghubungi API Bank Indonesia. Cek koneksi internet Anda. Detail: {e}")
-        return pd.DataFrame()
-    except ValueError:
-        st.error("Gagal memproses respons dari API. Mungkin ada perubahan format dari sisi server.")
-        return pd.DataFrame()
+    response = get_http_session(retries).get(BI_API_URL, params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json().get('data') or []
+
+def backfill_regions(stores, start_date, end_date, retries=True):
+    """
+    Mengambil semua celah tanggal yang belum ada di store setiap wilayah ({wilayah: PriceStore}).
+    Celah dipecah per bulan, dan potongan dari semua wilayah diambil secara paralel lewat satu pool
+    koneksi. Setiap potongan disimpan ke store wilayahnya begitu selesai, sehingga kegagalan satu
+    potongan tidak membatalkan yang lain.
+    Mengembalikan {wilayah: [(start, end, error), ...]} untuk potongan yang gagal.
+    """
+    chunks = [
+        (region, chunk)
+        for region, store in stores.items()
+        for gap_start, gap_end in store.missing_ranges(start_date, end_date)
+        for chunk in split_into_month_chunks(gap_start, gap_end)
+    ]
+    failures = {region: [] for region in stores}
+    if not chunks:
+        return failures
+
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(chunks))) as executor:
+        futures = {
+            executor.submit(request_bi_grid, chunk_start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d'), region, retries): (region, chunk_start, chunk_end)
+            for region, (chunk_start, chunk_end) in chunks
+        }
+        for future in as_completed(futures):
+            region, chunk_start, chunk_end = futures[future]
+            try:
+                stores[region].write_records(future.result(), chunk_start, chunk_end)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                failures[region].append((chunk_start, chunk_end, e))
+    return failures
+
+def backfill_store(store, start_date, end_date, region=DEFAULT_REGION, retries=True):
+    """
+    `backfill_regions` untuk satu wilayah. Mengembalikan daftar (start, end, error) untuk potongan yang gagal.
+    """
+    return backfill_regions({region: store}, start_date, end_date, retries)[region]
+
+def only_refresh_missing(store, start_date, end_date):
+    """
+    True jika store sudah berisi data rentang ini dan yang belum tersimpan hanya jendela refresh
+    (REFRESH_RECENT_DAYS hari terakhir), sehingga forecast tetap bisa jalan tanpa API.
+    """
+    gaps = store.missing_ranges(start_date, end_date)
+    refresh_start = refresh_window_start()
+    return bool(gaps) and all(gap_start >= refresh_start for gap_start, _ in gaps) and store.has_prices(start_date, end_date)
+
+def fetch_regions_data(regions, start_date: str, end_date: str):
+    """
+    Versi tanpa UI dari `fetch_bi_data` untuk banyak wilayah sekaligus (misal: job batch).
+    Mengembalikan ({wilayah: df_raw}, {wilayah: daftar potongan yang gagal}).
+    """
+    stores = {region: get_price_store(region) for region in regions}
+    failures = backfill_regions(stores, start_date, end_date)
+    return {region: store.read_wide(start_date, end_date) for region, store in stores.items()}, failures
+
+def format_failures(failures):
+    """Ringkasan potongan yang gagal diambil (`start s/d end, ...`), urut berdasarkan tanggal."""
+    return ", ".join(f"{start:%Y-%m-%d} s/d {end:%Y-%m-%d}" for start, end, _ in sorted(failures, key=lambda f: f[0]))
+
+def require_bi_data(start_date: str, end_date: str, region: str = DEFAULT_REGION):
+    """
+    Versi tanpa UI dari `fetch_bi_data` untuk CLI (batch, backtest): RuntimeError jika ada potongan
+    bulan yang gagal diambil atau rentang ini tidak berisi data, agar job tidak diam-diam berjalan
+    dengan data parsial yang diinterpolasi.
+    """
+    raw_by_region, failures = fetch_regions_data([region], start_date, end_date)
+    if failures[region]:
+        raise RuntimeError(
+            f"Gagal mengambil data {region} dari API Bank Indonesia ({format_failures(failures[region])}): {failures[region][0][2]}"
+        )
+    if raw_by_region[region].empty:
+        raise RuntimeError(f"Tidak ada data {region} dari API Bank Indonesia untuk {start_date} s/d {end_date}.")
+    return raw_by_region[region]
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_bi_data(start_date: str, end_date: str, region: str = DEFAULT_REGION):
+    """
+    Mengambil data harga komoditas satu wilayah dari API publik Bank Indonesia.
+    Data dibaca dari store lokal; hanya rentang tanggal yang belum tersimpan yang diambil dari API.
+    """
+    store = get_price_store(region)
+
+    # Hanya data beberapa hari terakhir yang diperbarui: cukup satu percobaan, tanpa retry ber-backoff
+    refresh_only = only_refresh_missing(store, start_date, end_date)
+    failures = backfill_store(store, start_date, end_date, region, retries=not refresh_only)
+    if failures and refresh_only:
+        st.warning(f"Data {REFRESH_RECENT_DAYS} hari terakhir belum dapat diperbarui dari API Bank Indonesia. Menampilkan data yang sudah tersimpan secara lokal.")
+    elif failures:
+        st.error(f"Gagal mengambil sebagian data dari API Bank Indonesia ({format_failures(failures)}). Detail: {failures[0][2]}")
+        st.info("Menampilkan data yang sudah tersimpan secara lokal (jika ada).")
+
+    df_raw = store.read_wide(start_date, end_date)
+    if df_raw.empty:
+        st.warning("API Bank Indonesia tidak mengembalikan data untuk rentang tanggal yang dipilih.")
+    return df_raw
 
 def reshape_and_clean_data(df_raw, commodity_details):
     """
     Mengubah data mentah (wide) menjadi data bersih (long) dan siap untuk feature engineering.
-    Versi ini lebih robust dalam membedakan kolom tanggal dan memberikan pesan error yang jelas.
+    Baris difilter ke sub-komoditas target sebelum diubah ke format long, sehingga waktu dan memori
+    hanya bergantung pada jumlah target, bukan pada seluruh data yang dikembalikan API.
     """
     if df_raw.empty:
         return pd.DataFrame()
@@ -54,29 +200,17 @@ def reshape_and_clean_data(df_raw, commodity_details):
     # 1. Identifikasi kolom tanggal vs kolom identitas secara dinamis
     # Kolom tanggal adalah kolom yang mengandung karakter '/'
     date_columns = [col for col in df_raw.columns if isinstance(col, str) and '/' in col]
-    # Kolom identitas adalah semua kolom sisanya
-    id_vars = [col for col in df_raw.columns if col not in date_columns]
     
     if not date_columns:
         st.warning("Tidak ada kolom dengan format tanggal (dd/mm/yyyy) yang ditemukan dari data API.")
         return pd.DataFrame()
 
-    # 2. Lakukan proses 'melt' untuk mengubah format tabel dari lebar ke panjang
-    df_long = df_raw.melt(
-        id_vars=id_vars, 
-        value_vars=date_columns,
-        var_name='date_str', 
-        value_name='harga'
-    ).rename(columns={'name': 'komoditas_sub'}) # Ganti nama kolom 'name' agar konsisten
-    
-    # Simpan nama asli dari API sebelum difilter, untuk keperluan debugging
-    original_names_from_api = df_long['komoditas_sub'].unique()
-
-    # 3. Filter data hanya untuk sub-komoditas target yang ada di config
-    df_long_filtered = df_long[df_long['komoditas_sub'].isin(commodity_details['targets'])]
+    # 2. Filter baris hanya untuk sub-komoditas target yang ada di config (sebelum reshape)
+    targets = commodity_details['targets']
+    df_targets = df_raw[df_raw['name'].isin(targets)]
 
-    # 4. Validasi krusial: Cek apakah data kosong setelah difilter
-    if df_long_filtered.empty:
+    # 3. Validasi krusial: Cek apakah data kosong setelah difilter
+    if df_targets.empty:
         st.error(f"Tidak ada data yang cocok setelah filter untuk kelompok '{commodity_details['main']}'.", icon="🚨")
         st.info("Ini kemungkinan besar karena nama sub-komoditas di `src/config.py` tidak cocok persis dengan nama dari API.")
         
@@ -84,22 +218,30 @@ def reshape_and_clean_data(df_raw, commodity_details):
         st.markdown("**Nama di `config.py` (yang dicari):**")
         st.code(f"{commodity_details['targets']}", language='python')
         st.markdown("**Nama yang Tersedia dari API:**")
-        st.code(f"{list(original_names_from_api)}", language='python')
+        st.code(f"{list(df_raw['name'].unique())}", language='python')
         
         return pd.DataFrame() # Kembalikan DataFrame kosong agar proses di app.py berhenti
 
-    # 5. Proses pembersihan data jika data ditemukan
-    df_final = df_long_filtered.copy() 
-    
-    # Bersihkan kolom harga dari koma dan konversi ke numerik
-    df_final['harga'] = df_final['harga'].astype(str).str.replace(',', '', regex=False)
-    df_final['harga'] = pd.to_numeric(df_final['harga'], errors='coerce')
-    
-    # Konversi kolom tanggal string ke format datetime
-    df_final['date'] = pd.to_datetime(df_final['date_str'], format='%d/%m/%Y', errors='coerce')
-    
-    # Buang baris yang gagal dikonversi dan urutkan berdasarkan tanggal
-    df_final = df_final.sort_values('date').dropna(subset=['harga', 'date'])
-    
-    # 6. Kembalikan DataFrame bersih dengan kolom yang relevan
-    return df_final[['date', 'komoditas_sub', 'harga']]
\ No newline at end of file
+    # 4. Parse header tanggal sekali saja (D nilai, bukan N x D), lalu urutkan secara kronologis
+    header_dates = pd.to_datetime(pd.Index(date_columns), format='%d/%m/%Y', errors='coerce')
+    valid_dates = ~header_dates.isna()
+    date_order = np.argsort(header_dates[valid_dates].values, kind='stable')
+    ordered_columns = np.asarray(date_columns, dtype=object)[valid_dates][date_order]
+    dates = header_dates[valid_dates][date_order]
+
+    # 5. Bersihkan harga dalam satu pass vektor: (tanggal x sub-komoditas) -> satu kolom
+    values = df_targets[list(ordered_columns)].to_numpy(dtype=object).T
+    prices = pd.Series(values.ravel()).astype(str).str.replace(',', '', regex=False)
+    prices = pd.to_numeric(prices, errors='coerce').to_numpy()
+
+    # 6. Bangun frame long langsung dari array, dengan nama sub-komoditas kategorikal
+    n_rows = len(df_targets)
+    name_codes = pd.Categorical(df_targets['name'], categories=targets).codes
+    df_final = pd.DataFrame({
+        'date': np.repeat(dates.values, n_rows),
+        'komoditas_sub': pd.Categorical.from_codes(np.tile(name_codes, len(dates)), categories=targets),
+        'harga': prices,
+    })
+
+    # Buang baris dengan harga yang gagal dikonversi (data sudah urut berdasarkan tanggal)
+    return df_final.dropna(subset=['harga']).reset_index(drop=True)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Lebar area plot grafik tren (piksel) yang diasumsikan; Streamlit tidak mengirim lebar kontainer ke server.
+TREND_CHART_WIDTH_PX = 1200
+# Titik per piksel horizontal per series: 2 cukup untuk minimum dan maksimum di setiap kolom piksel,
+# sehingga ukuran payload mengikuti lebar grafik, bukan panjang histori.
+POINTS_PER_PIXEL = 2
+MIN_POINTS_PER_SERIES = 50
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indeks titik terpilih menurut Largest-Triangle-Three-Buckets: titik pertama dan terakhir selalu
+    dipertahankan, dan dari setiap bucket dipilih titik yang membentuk segitiga terbesar dengan
+    titik terpilih sebelumnya dan rata-rata bucket berikutnya, sehingga puncak dan lembah tetap terlihat.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    # Rata-rata setiap bucket dihitung sekaligus di depan; "bucket" terakhir hanya berisi titik terakhir
+    lengths = np.diff(np.append(edges, n))
+    mean_x = np.add.reduceat(x, edges) / lengths
+    mean_y = np.add.reduceat(y, edges) / lengths
+
+    previous = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+        px, py = x[previous], y[previous]
+        area = np.abs((px - mean_x[b + 1]) * (y[start:end] - py) - (px - x[start:end]) * (mean_y[b + 1] - py))
+        previous = start + int(area.argmax())
+        selected[b + 1] = previous
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """Indeks titik minimum dan maksimum setiap bucket (n_out/2 bucket), berurutan menurut waktu."""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(int)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            bucket = y[start:end]
+            selected.extend((start + int(np.argmin(bucket)), start + int(np.argmax(bucket))))
+    return np.unique(selected)
+
+
+def downsample_series(series, max_points, method='lttb'):
+    """Mengurangi titik sebuah Series ber-index tanggal menjadi paling banyak `max_points` (NaN dibuang)."""
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+
+    y = series.to_numpy(dtype=np.float64)
+    if method == 'minmax':
+        indices = minmax_indices(y, max_points)
+    else:
+        x = series.index.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64)
+        indices = lttb_indices(x, y, max_points)
+    return series.iloc[indices]
+
+
+def points_for_range(start, end, chart_width_px=TREND_CHART_WIDTH_PX, extra_days=0):
+    """
+    Budget titik per series untuk histori [start, end] di grafik selebar `chart_width_px` piksel.
+    Sumbu x juga memuat `extra_days` hari sesudahnya (proyeksi), sehingga histori hanya mendapat lebar
+    sebanding dengan panjangnya. Rentang yang lebih sempit (zoom) mendapat lebih banyak piksel per hari,
+    sehingga lebih banyak titik per hari.
+    """
+    history_days = max((pd.Timestamp(end) - pd.Timestamp(start)).days, 1)
+    history_px = chart_width_px * history_days / (history_days + extra_days)
+    return max(MIN_POINTS_PER_SERIES, int(history_px * POINTS_PER_PIXEL))
+
+
+def downsample_frame(df, max_points_per_series=None, method='lttb', chart_width_px=TREND_CHART_WIDTH_PX, extra_days=0):
+    """
+    Downsampling setiap kolom secara terpisah. Mengembalikan dict {kolom: Series}, karena setiap
+    kolom bisa memiliki tanggal terpilih yang berbeda. Tanpa `max_points_per_series`, budget dihitung
+    dari rentang tanggal `df` dan lebar grafik (`points_for_range`); rentang yang lebih pendek dari
+    budget (misal: setelah zoom) dikembalikan dengan resolusi penuh.
+    """
+    max_points = max_points_per_series
+    if max_points is None:
+        if df.empty:
+            return {col: df[col] for col in df.columns}
+        max_points = points_for_range(df.index[0], df.index[-1], chart_width_px, extra_days)
+    return {col: downsample_series(df[col], max_points, method=method) for col in df.columns}
+
+
+def history_frame(df_long, target_cols):
+    """Harga harian hasil `reshape_and_clean_data` dalam format lebar (tanggal x sub-komoditas) untuk grafik."""
+    df_pivot = df_long.pivot_table(index='date', columns='komoditas_sub', values='harga', observed=True)
+    return df_pivot.reindex(columns=target_cols).sort_index()
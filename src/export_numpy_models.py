@@ -0,0 +1,117 @@
+"""
+Mengekspor bobot model Keras (.h5) ke format `.npz` untuk engine inferensi NumPy.
+
+Ekspor hanya ditulis jika output engine NumPy cocok dengan output Keras (uji paritas).
+Jalankan dari root repository:
+
+    python -m src.export_numpy_models
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from .config import COMMODITY_CONFIG
+from .numpy_inference import SUPPORTED_LAYERS, NumpyLSTMModel
+
+PARITY_ATOL = 1e-5
+PARITY_SAMPLES = 16
+
+
+def _lstm_spec(layer):
+    config = layer.get_config()
+    return {
+        "activation": config["activation"],
+        "recurrent_activation": config["recurrent_activation"],
+        "return_sequences": config["return_sequences"],
+        "go_backwards": config.get("go_backwards", False),
+    }
+
+
+def _lstm_weights(layer, prefix):
+    kernel, recurrent_kernel, bias = layer.get_weights()
+    return {
+        f"{prefix}_kernel": kernel.astype(np.float32),
+        f"{prefix}_recurrent_kernel": recurrent_kernel.astype(np.float32),
+        f"{prefix}_bias": bias.astype(np.float32),
+    }
+
+
+def keras_to_numpy_model(keras_model):
+    """Membaca arsitektur dan bobot model Keras Sequential menjadi `NumpyLSTMModel`."""
+    layers, weights = [], {}
+    for i, layer in enumerate(keras_model.layers):
+        kind = type(layer).__name__
+        prefix = f"layer{i}"
+        if kind not in SUPPORTED_LAYERS:
+            raise ValueError(f"Layer '{kind}' ({layer.name}) belum didukung oleh engine NumPy.")
+
+        if kind == "LSTM":
+            layers.append({"class_name": kind, **_lstm_spec(layer)})
+            weights.update(_lstm_weights(layer, prefix))
+        elif kind == "Bidirectional":
+            if layer.merge_mode != "concat":
+                raise ValueError(f"merge_mode '{layer.merge_mode}' pada {layer.name} belum didukung.")
+            layers.append({"class_name": kind, **_lstm_spec(layer.forward_layer)})
+            weights.update(_lstm_weights(layer.forward_layer, f"{prefix}_forward"))
+            weights.update(_lstm_weights(layer.backward_layer, f"{prefix}_backward"))
+        elif kind == "Dense":
+            kernel, bias = layer.get_weights()
+            layers.append({"class_name": kind, "activation": layer.get_config()["activation"]})
+            weights[f"{prefix}_kernel"] = kernel.astype(np.float32)
+            weights[f"{prefix}_bias"] = bias.astype(np.float32)
+        else:
+            layers.append({"class_name": kind})
+
+    return NumpyLSTMModel(layers, weights, keras_model.input_shape[1:])
+
+
+def check_parity(keras_model, numpy_model, samples=PARITY_SAMPLES, seed=0):
+    """
+    Membandingkan output Keras dan NumPy pada input acak di rentang [0, 1] (rentang MinMaxScaler).
+    Mengembalikan selisih absolut maksimum.
+    """
+    rng = np.random.default_rng(seed)
+    x = rng.random((samples,) + tuple(numpy_model.input_shape), dtype=np.float32)
+    expected = keras_model(x, training=False).numpy()
+    actual = numpy_model.predict(x)
+    return float(np.abs(expected - actual).max())
+
+
+def export_commodity(commodity, details, atol=PARITY_ATOL):
+    from tensorflow.keras.models import load_model
+
+    model_path = details["model_path"]
+    if not os.path.exists(model_path):
+        print(f"[SKIP] {commodity}: file model '{model_path}' tidak ditemukan.")
+        return None
+
+    keras_model = load_model(model_path)
+    numpy_model = keras_to_numpy_model(keras_model)
+    max_diff = check_parity(keras_model, numpy_model)
+    if max_diff > atol:
+        print(f"[GAGAL] {commodity}: selisih output {max_diff:.2e} melebihi toleransi {atol:.0e}, .npz tidak ditulis.")
+        return False
+
+    numpy_model.save_npz(details["npz_path"])
+    print(f"[OK] {commodity}: {details['npz_path']} (selisih maks {max_diff:.2e})")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commodity", action="append", choices=list(COMMODITY_CONFIG),
+                        help="Komoditas yang diekspor (default: semua).")
+    parser.add_argument("--atol", type=float, default=PARITY_ATOL, help="Toleransi paritas terhadap Keras.")
+    args = parser.parse_args(argv)
+
+    results = [
+        export_commodity(commodity, COMMODITY_CONFIG[commodity], atol=args.atol)
+        for commodity in (args.commodity or COMMODITY_CONFIG)
+    ]
+    return 1 if False in results else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,111 @@
 import pandas as pd
 import numpy as np
-from pandas.api.types import CategoricalDtype
+from numpy.lib.stride_tricks import sliding_window_view
 
 LAGS = [1, 2, 3, 7, 30]
 WINDOWS = [7, 30]
 SEQ_LENGTH = 30
 
-def create_date_features(start_date, end_date):
+# Urutan kolom fitur tanggal, sama dengan urutan saat scaler_X di-fit
+DATE_FEATURE_COLUMNS = (
+    ['is_weekend', 'trend']
+    + [f'day_of_week_{d}' for d in range(7)]
+    + [f'month_{m}' for m in range(1, 13)]
+)
+TREND_COLUMN = DATE_FEATURE_COLUMNS.index('trend')
+
+# Rentang kalender yang dihitung di awal; tanggal di luar rentang tetap didukung (dihitung langsung)
+CALENDAR_START = '2010-01-01'
+CALENDAR_END = '2040-12-31'
+
+def _calendar_rows(dates):
+    """Menghitung baris fitur tanggal (one-hot hari & bulan, akhir pekan, trend dari 0) untuk `dates`."""
+    dates = pd.DatetimeIndex(dates)
+    n_dates = len(dates)
+    day_of_week = dates.dayofweek.to_numpy()
+    month = dates.month.to_numpy()
+
+    rows = np.zeros((n_dates, len(DATE_FEATURE_COLUMNS)), dtype=np.float64)
+    rows[:, 0] = day_of_week >= 5
+    rows[:, TREND_COLUMN] = np.arange(n_dates)
+    rows[np.arange(n_dates), 2 + day_of_week] = 1.0
+    rows[np.arange(n_dates), 9 + month - 1] = 1.0
+    return rows
+
+class CalendarIndex:
     """
-    Membuat fitur berbasis tanggal (termasuk one-hot encoding).
+    Tabel fitur tanggal berbasis array yang dihitung sekali untuk rentang multi-tahun.
+
+    Baris fitur untuk rentang tanggal mana pun diperoleh dengan slicing tabel, tanpa
+    membangun ulang date range, dtype kategorikal, maupun `pd.get_dummies`. Kolom `trend`
+    dihitung relatif terhadap `trend_origin` (default: tanggal awal slice), sehingga slice
+    sub-rentang tetap melanjutkan trend dari histori aslinya.
     """
-    all_dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    df_date_features = pd.DataFrame(index=all_dates)
 
-    df_date_features['day_of_week'] = df_date_features.index.dayofweek
-    df_date_features['month'] = df_date_features.index.month
-    df_date_features['is_weekend'] = df_date_features['day_of_week'].isin([5, 6]).astype(int)
-    df_date_features['trend'] = np.arange(len(df_date_features))
+    def __init__(self, start=CALENDAR_START, end=CALENDAR_END):
+        self.start = pd.Timestamp(start).normalize()
+        self.dates = pd.date_range(start=self.start, end=end, freq='D')
+        self.table = _calendar_rows(self.dates)
+        self.table.setflags(write=False)
+        self._column_pos = {col: i for i, col in enumerate(DATE_FEATURE_COLUMNS)}
 
-    # 1. Definisikan semua kategori yang mungkin ada untuk hari dan bulan
-    day_of_week_type = CategoricalDtype(categories=range(7), ordered=True)
-    month_type = CategoricalDtype(categories=range(1, 13), ordered=True)
-    
-    # 2. Terapkan tipe data kategorikal tersebut ke kolom
-    df_date_features['day_of_week'] = df_date_features['day_of_week'].astype(day_of_week_type)
-    df_date_features['month'] = df_date_features['month'].astype(month_type)
-    
-    # 3. One-Hot Encoding
-    # get_dummies akan selalu membuat 7 kolom untuk hari dan 12 kolom untuk bulan, mengisi dengan 0 jika kategori tersebut tidak ada dalam data.
-    df_date_features = pd.get_dummies(df_date_features, columns=['day_of_week', 'month'], drop_first=False)
-    
-    return df_date_features
+    def _offset(self, date):
+        return (pd.Timestamp(date).normalize() - self.start).days
+
+    def column_positions(self, columns):
+        """Posisi kolom fitur tanggal di tabel, mengikuti urutan `columns` (misal: urutan fitur scaler)."""
+        return np.array([self._column_pos[col] for col in columns], dtype=int)
+
+    def slice(self, start_date, end_date, trend_origin=None, columns=None):
+        """
+        Mengembalikan array fitur tanggal (hari x kolom) untuk rentang [start_date, end_date].
+        `trend` bernilai 0 di `trend_origin` dan bertambah 1 setiap hari.
+        """
+        lo, hi = self._offset(start_date), self._offset(end_date) + 1
+        if lo >= 0 and hi <= len(self.table):
+            rows = self.table[lo:hi].copy()
+        else:
+            rows = _calendar_rows(pd.date_range(start=start_date, end=end_date, freq='D'))
+
+        origin = self._offset(trend_origin if trend_origin is not None else start_date)
+        rows[:, TREND_COLUMN] = np.arange(lo, lo + len(rows)) - origin
+
+        if columns is not None:
+            rows = rows[:, self.column_positions(columns)]
+        return rows
+
+    def rows(self, dates, trend_origins, columns=None):
+        """
+        Baris fitur tanggal untuk sekumpulan tanggal sekaligus (satu baris per tanggal),
+        dengan `trend` dihitung relatif terhadap `trend_origins` masing-masing.
+        """
+        dates = pd.DatetimeIndex(dates).normalize()
+        offsets = ((dates - self.start) // pd.Timedelta(days=1)).to_numpy()
+        if offsets.min() >= 0 and offsets.max() < len(self.table):
+            rows = self.table[offsets]
+        else:
+            rows = _calendar_rows(dates)
+        rows[:, TREND_COLUMN] = ((dates - pd.DatetimeIndex(trend_origins).normalize()) // pd.Timedelta(days=1)).to_numpy()
+
+        if columns is not None:
+            rows = rows[:, self.column_positions(columns)]
+        return rows
+
+    def frame(self, start_date, end_date, trend_origin=None, columns=None):
+        """Sama seperti `slice`, dalam bentuk DataFrame berindeks tanggal."""
+        return pd.DataFrame(
+            self.slice(start_date, end_date, trend_origin, columns),
+            index=pd.date_range(start=start_date, end=end_date, freq='D'),
+            columns=list(columns) if columns is not None else DATE_FEATURE_COLUMNS,
+        )
+
+CALENDAR = CalendarIndex()
+
+def create_date_features(start_date, end_date, trend_origin=None):
+    """
+    Membuat fitur berbasis tanggal (termasuk one-hot encoding) dengan slicing `CALENDAR`.
+    """
+    return CALENDAR.frame(start_date, end_date, trend_origin=trend_origin)
 
 
 def add_lag_and_rolling_features(df_pivot, target_cols):
@@ -48,15 +123,448 @@ def add_lag_and_rolling_features(df_pivot, target_cols):
             
     return pd.concat(feature_dfs, axis=1)
 
-def full_preparation_pipeline(df_long, commodity_details):
+def default_feature_cols(target_cols):
+    """Urutan kolom fitur yang dihasilkan jalur pandas: fitur tanggal, lalu lag & rolling per target."""
+    feature_cols = list(DATE_FEATURE_COLUMNS)
+    for col in target_cols:
+        feature_cols += [f'{col}_lag_{lag}' for lag in LAGS]
+        feature_cols += [f'{col}_rolling_mean_{window}' for window in WINDOWS]
+    return feature_cols
+
+def _feature_plan(feature_cols, target_cols):
+    """
+    Memetakan setiap nama kolom fitur ke sumber nilainya (kolom tanggal, lag, atau rolling mean)
+    dalam bentuk array indeks, agar baris fitur bisa diisi secara vektor sesuai urutan `feature_cols`.
+    """
+    col_pos = {col: i for i, col in enumerate(feature_cols)}
+    target_pos = {col: i for i, col in enumerate(target_cols)}
+    date_cols = [col for col in feature_cols if col in DATE_FEATURE_COLUMNS]
+
+    lag_feat, lag_target, lag_offset = [], [], []
+    roll_feat, roll_target, roll_window = [], [], []
+    for col in target_cols:
+        for lag in LAGS:
+            name = f'{col}_lag_{lag}'
+            if name in col_pos:
+                lag_feat.append(col_pos[name]); lag_target.append(target_pos[col]); lag_offset.append(lag)
+        for window in WINDOWS:
+            name = f'{col}_rolling_mean_{window}'
+            if name in col_pos:
+                roll_feat.append(col_pos[name]); roll_target.append(target_pos[col]); roll_window.append(window)
+
+    return {
+        'date_cols': date_cols,
+        'date_feat': np.array([col_pos[col] for col in date_cols], dtype=int),
+        'lag_feat': np.array(lag_feat, dtype=int),
+        'lag_target': np.array(lag_target, dtype=int),
+        'lag_offset': np.array(lag_offset, dtype=int),
+        'roll_feat': np.array(roll_feat, dtype=int),
+        'roll_target': np.array(roll_target, dtype=int),
+        'roll_window': np.array(roll_window, dtype=int),
+    }
+
+class SequenceBatch:
+    """
+    Sekumpulan sequence awal untuk `BatchedFeatureState` dalam bentuk array: harga (K x baris x target),
+    fitur mentah (K x baris x F), tanggal dan trend baris terakhir setiap sequence.
+    Dibuat dari daftar DataFrame (`from_frames`) atau langsung dari satu histori (`PreparedWindow.windows`).
+    """
+
+    def __init__(self, last_dates, last_trends, prices, features, target_cols, feature_cols):
+        self.last_dates = pd.DatetimeIndex(last_dates)
+        self.last_trends = np.asarray(last_trends, dtype=np.float64)
+        self.prices = prices
+        self.features = features
+        self.target_cols = list(target_cols)
+        self.feature_cols = list(feature_cols)
+
+    @classmethod
+    def from_frames(cls, sequences, feature_cols, target_cols):
+        lengths = {len(sequence) for sequence in sequences}
+        if len(lengths) != 1:
+            raise ValueError(f"Semua sequence awal harus memiliki panjang yang sama, ditemukan: {sorted(lengths)}.")
+        return cls(
+            [sequence.index[-1] for sequence in sequences],
+            # Trend baris baru melanjutkan trend baris terakhir jendela awal
+            [float(sequence['trend'].iloc[-1]) if 'trend' in sequence else 0.0 for sequence in sequences],
+            np.stack([sequence[target_cols].to_numpy(dtype=np.float64) for sequence in sequences]),
+            np.stack([sequence[feature_cols].to_numpy(dtype=np.float64) for sequence in sequences]),
+            target_cols,
+            feature_cols,
+        )
+
+    def __len__(self):
+        return len(self.last_dates)
+
+    @property
+    def seq_length(self):
+        return self.features.shape[1]
+
+    def feature_array(self, feature_cols):
+        """Fitur (K x baris x F) dengan urutan kolom `feature_cols`."""
+        if list(feature_cols) == self.feature_cols:
+            return self.features
+        positions = [self.feature_cols.index(col) for col in feature_cols]
+        return self.features[:, :, positions]
+
+class BatchedFeatureState:
+    """
+    State fitur berbasis ring-buffer NumPy untuk forecasting iteratif beberapa skenario sekaligus.
+
+    Menyimpan jendela fitur (K x SEQ_LENGTH x F) dan histori harga secara preallocated,
+    sehingga setiap langkah prediksi hanya menghitung satu baris fitur baru per skenario:
+    lag dibaca langsung dari buffer harga dan rolling mean diperbarui lewat
+    running sum dalam O(1), tanpa DataFrame, concat, maupun get_dummies.
+    Nilainya sama dengan jalur pandas `create_date_features` + `add_lag_and_rolling_features`,
+    dengan trend yang dilanjutkan dari jendela awal.
+    `initial_sequences` berupa daftar DataFrame (target + fitur) atau `SequenceBatch`.
+    """
+
+    def __init__(self, initial_sequences, feature_cols, target_cols, row_transform=None):
+        self.feature_cols = list(feature_cols)
+        self.target_cols = list(target_cols)
+        self.row_transform = row_transform
+
+        batch = initial_sequences
+        if not isinstance(batch, SequenceBatch):
+            batch = SequenceBatch.from_frames(initial_sequences, self.feature_cols, self.target_cols)
+        elif batch.target_cols != self.target_cols:
+            raise ValueError(f"Target SequenceBatch {batch.target_cols} tidak sama dengan {self.target_cols}.")
+        self.seq_length = batch.seq_length
+        self.batch_size = len(batch)
+        self.last_dates = batch.last_dates
+
+        n_targets = len(self.target_cols)
+        n_features = len(self.feature_cols)
+
+        # 1. Petakan setiap nama kolom fitur ke sumber nilainya
+        plan = _feature_plan(self.feature_cols, self.target_cols)
+        self._date_cols = plan['date_cols']
+        self._date_feat = plan['date_feat']
+        self._lag_feat, self._lag_target, self._lag_offset = plan['lag_feat'], plan['lag_target'], plan['lag_offset']
+        self._roll_feat, self._roll_target, self._roll_window = plan['roll_feat'], plan['roll_target'], plan['roll_window']
+        # Trend baris baru melanjutkan trend baris terakhir jendela awal
+        self._trend_origins = self.last_dates - pd.to_timedelta(batch.last_trends, unit='D')
+
+        # 2. Buffer harga melingkar sepanjang lag/window terbesar
+        self.history_length = max(LAGS + WINDOWS)
+        self._prices = np.full((self.batch_size, self.history_length, n_targets), np.nan)
+        prices = batch.prices[:, -self.history_length:]
+        self._prices[:, self.history_length - prices.shape[1]:] = prices
+        self._price_head = 0  # posisi slot harga tertua (= slot yang akan ditimpa berikutnya)
+
+        # Running sum untuk setiap kombinasi (target, window) rolling
+        self._roll_sums = np.stack([
+            self._prices[:, self.history_length - w:, t].sum(axis=1)
+            for t, w in zip(self._roll_target, self._roll_window)
+        ], axis=1) if len(self._roll_target) else np.zeros((self.batch_size, 0))
+
+        # 3. Jendela fitur disimpan dua kali berturut-turut agar selalu tersedia
+        #    sebagai view kronologis tanpa menyalin ulang seluruh jendela.
+        features = batch.feature_array(self.feature_cols).reshape(-1, n_features)
+        if self.row_transform is not None:
+            features = np.asarray(self.row_transform(features), dtype=np.float64)
+        features = features.reshape(self.batch_size, self.seq_length, n_features)
+        self._window = np.concatenate([features, features], axis=1)
+        self._window_head = 0
+
+    def window(self):
+        """Mengembalikan jendela fitur (K x SEQ_LENGTH x F) terbaru secara kronologis."""
+        return self._window[:, self._window_head:self._window_head + self.seq_length]
+
+    def _price_at_lag(self, lags, targets):
+        """Mengambil harga `lag` hari sebelum baris baru dari buffer melingkar, untuk semua skenario."""
+        positions = (self._price_head - lags) % self.history_length
+        return self._prices[:, positions, targets]
+
+    def push(self, prices):
+        """
+        Menambahkan harga hasil prediksi (K x target) sebagai hari berikutnya dan menghitung baris fitur barunya.
+        """
+        prices = np.asarray(prices, dtype=np.float64).reshape(self.batch_size, len(self.target_cols))
+        next_dates = self.last_dates + pd.Timedelta(days=1)
+        rows = np.zeros((self.batch_size, len(self.feature_cols)), dtype=np.float64)
+
+        # Fitur tanggal: baris dari tabel kalender, trend dilanjutkan dari jendela awal
+        rows[:, self._date_feat] = CALENDAR.rows(next_dates, self._trend_origins, columns=self._date_cols)
+
+        # Lag: dibaca dari histori sebelum harga baru dimasukkan
+        rows[:, self._lag_feat] = self._price_at_lag(self._lag_offset, self._lag_target)
+
+        # Rolling mean: harga baru masuk, harga `window` hari sebelumnya keluar
+        dropped = self._price_at_lag(self._roll_window, self._roll_target)
+        self._roll_sums += prices[:, self._roll_target] - dropped
+        rows[:, self._roll_feat] = self._roll_sums / self._roll_window
+
+        self._prices[:, self._price_head] = prices
+        self._price_head = (self._price_head + 1) % self.history_length
+        self.last_dates = next_dates
+
+        if self.row_transform is not None:
+            rows = np.asarray(self.row_transform(rows), dtype=np.float64)
+        self._window[:, self._window_head] = rows
+        self._window[:, self._window_head + self.seq_length] = rows
+        self._window_head = (self._window_head + 1) % self.seq_length
+        return rows
+
+class FeatureSchema:
+    """
+    Skema input model: daftar target dan urutan kolom fitur.
+    `from_scaler` mengambil urutan fitur persis seperti saat `scaler_X` di-fit.
+    """
+
+    def __init__(self, target_cols, feature_cols):
+        self.target_cols = list(target_cols)
+        self.feature_cols = list(feature_cols)
+
+    @classmethod
+    def from_scaler(cls, scaler_X, target_cols):
+        if hasattr(scaler_X, 'feature_names_in_'):
+            return cls(target_cols, [str(col) for col in scaler_X.feature_names_in_])
+        return cls(target_cols, default_feature_cols(target_cols))
+
+    @property
+    def n_features(self):
+        return len(self.feature_cols)
+
+    def validate(self, scaler_X):
+        """Memastikan jumlah dan urutan fitur sama dengan yang dipakai saat `scaler_X` di-fit."""
+        if scaler_X.n_features_in_ != self.n_features:
+            raise ValueError(
+                f"Jumlah fitur ({self.n_features}) tidak sama dengan scaler ({scaler_X.n_features_in_})."
+            )
+        if hasattr(scaler_X, 'feature_names_in_') and list(scaler_X.feature_names_in_) != self.feature_cols:
+            mismatch = next(
+                i for i, (a, b) in enumerate(zip(self.feature_cols, scaler_X.feature_names_in_)) if a != b
+            )
+            raise ValueError(
+                f"Urutan fitur berbeda dengan scaler mulai kolom ke-{mismatch}: "
+                f"'{self.feature_cols[mismatch]}' vs '{scaler_X.feature_names_in_[mismatch]}'."
+            )
+        return self
+
+    def transform(self, scaler_X, rows):
+        """
+        `scaler_X.transform` untuk array fitur (... x F) berurutan sesuai skema. MinMaxScaler diterapkan
+        langsung sebagai `rows * scale_ + min_` (rumus yang sama dengan sklearn), sehingga tidak perlu
+        membungkus setiap baris dalam DataFrame demi nama kolom; scaler lain tetap menerima DataFrame.
+        """
+        if hasattr(scaler_X, 'scale_') and hasattr(scaler_X, 'min_'):
+            scaled = rows * scaler_X.scale_ + scaler_X.min_
+            if getattr(scaler_X, 'clip', False):
+                np.clip(scaled, scaler_X.feature_range[0], scaler_X.feature_range[1], out=scaled)
+            return scaled
+        shape = np.shape(rows)
+        frame = pd.DataFrame(np.reshape(rows, (-1, shape[-1])), columns=self.feature_cols)
+        return scaler_X.transform(frame).reshape(shape)
+
+    def align(self, feature_cols):
+        """
+        Mengembalikan urutan kolom skema jika `feature_cols` berisi kolom yang sama (urutan boleh berbeda).
+        """
+        if set(feature_cols) != set(self.feature_cols):
+            missing = sorted(set(self.feature_cols) - set(feature_cols))
+            extra = sorted(set(feature_cols) - set(self.feature_cols))
+            raise ValueError(f"Kolom fitur tidak sesuai skema. Hilang: {missing}, tidak dikenal: {extra}.")
+        return list(self.feature_cols)
+
+class PreparedWindow:
+    """
+    Baris hasil `prepare_dense_window` (SEQ_LENGTH baris terakhir) atau `prepare_dense_history`:
+    harga target dan fitur mentah (baris x F) berurutan sesuai skema.
+    Untuk histori, `cutoff_state` menyimpan blok harga (termasuk baris warm-up) beserta observasi
+    terakhir di setiap tanggal, agar `windows` bisa menyusun ulang jendela tanpa data sesudah origin.
+    """
+
+    def __init__(self, dates, prices, features, schema, cutoff_state=None):
+        self.dates = dates
+        self.prices = prices
+        self.features = features
+        self.schema = schema
+        self.cutoff_state = cutoff_state
+
+    def model_input(self, scaler_X):
+        """Input model (1, SEQ_LENGTH, F) float32 kontigu, setelah skema divalidasi terhadap scaler."""
+        self.schema.validate(scaler_X)
+        scaled = self.schema.transform(scaler_X, self.features[-SEQ_LENGTH:])
+        return np.ascontiguousarray(scaled, dtype=np.float32)[np.newaxis, :, :]
+
+    def observed_by(self, end_positions):
+        """True untuk posisi yang setiap targetnya sudah memiliki minimal satu harga teramati sampai tanggal itu."""
+        lookback = max(LAGS + WINDOWS)
+        return np.isfinite(self.cutoff_state['last_value'][np.asarray(end_positions) + lookback]).all(axis=1)
+
+    def windows(self, end_positions, length=SEQ_LENGTH):
+        """
+        `SequenceBatch` berisi jendela `length` baris yang berakhir di setiap posisi `end_positions`.
+
+        Setiap jendela disusun seolah-olah data berhenti di tanggal akhirnya: hari sesudah observasi
+        terakhir diisi harga teramati terakhir (seperti `prepare_dense_window` pada data yang dipotong
+        di tanggal itu), bukan hasil interpolasi ke harga sesudahnya. Lag dan rolling mean dihitung
+        ulang dari blok harga per jendela (`sliding_window_view`), fitur tanggal diambil dari histori.
+        """
+        if self.cutoff_state is None:
+            raise ValueError("Jendela per origin hanya tersedia untuk hasil `prepare_dense_history`.")
+        end_positions = np.asarray(end_positions)
+        starts = end_positions - length + 1
+        if len(starts) and starts.min() < 0:
+            raise ValueError(f"Posisi akhir jendela minimal {length - 1}.")
+
+        lookback = max(LAGS + WINDOWS)
+        block, last_index, last_value = (self.cutoff_state[key] for key in ('block', 'last_index', 'last_value'))
+        ends = end_positions + lookback  # posisi tanggal akhir di blok (blok diawali baris warm-up)
+        span = length + lookback
+        prices = sliding_window_view(block, span, axis=0).transpose(0, 2, 1)[ends - span + 1]
+        days = ends[:, None] - span + 1 + np.arange(span)[None, :]
+        stale = days[:, :, None] > last_index[ends][:, None, :]
+        prices = np.where(stale, last_value[ends][:, None, :], prices)
+
+        plan = _feature_plan(self.schema.feature_cols, self.schema.target_cols)
+        features = np.empty((len(ends), length, self.schema.n_features), dtype=np.float64)
+        _fill_price_features(features, prices, np.arange(lookback, span), plan)
+        history_features = sliding_window_view(self.features, length, axis=0).transpose(0, 2, 1)[starts]
+        features[:, :, plan['date_feat']] = history_features[:, :, plan['date_feat']]
+
+        if 'trend' in self.schema.feature_cols:
+            last_trends = features[:, -1, self.schema.feature_cols.index('trend')]
+        else:
+            last_trends = np.zeros(len(starts))
+        return SequenceBatch(self.dates[end_positions], last_trends, prices[:, lookback:], features,
+                             self.schema.target_cols, self.schema.feature_cols)
+
+    def to_frame(self):
+        """Sequence dalam format yang sama dengan keluaran `full_preparation_pipeline` (target + fitur)."""
+        return pd.DataFrame(
+            np.hstack([self.prices, self.features]),
+            index=self.dates,
+            columns=self.schema.target_cols + self.schema.feature_cols,
+        )
+
+def _insufficient_history_message(available):
+    return f"Data historis tidak cukup untuk prediksi. Dibutuhkan {SEQ_LENGTH} hari data valid setelah feature engineering, hanya tersedia {available} hari."
+
+def _dense_price_matrix(df_long, target_cols):
+    """
+    Matriks harga padat float32 (tanggal x target) dari data long, rata-rata jika ada duplikat
+    seperti pivot_table. Mengembalikan (tanggal pertama, matriks); tanggal tanpa data berisi NaN.
+    """
+    dates = df_long['date'].to_numpy(dtype='datetime64[D]')
+    target_codes = pd.Categorical(df_long['komoditas_sub'], categories=target_cols).codes
+    first_day = dates.min()
+    n_days = int((dates.max() - first_day).astype(int)) + 1
+    day_codes = (dates - first_day).astype(int)
+
+    valid = target_codes >= 0
+    flat_index = day_codes[valid] * len(target_cols) + target_codes[valid]
+    sums = np.bincount(flat_index, weights=df_long['harga'].to_numpy(dtype=np.float64)[valid], minlength=n_days * len(target_cols))
+    counts = np.bincount(flat_index, minlength=n_days * len(target_cols))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dense = (sums / counts).astype(np.float32).reshape(n_days, len(target_cols))
+    return pd.Timestamp(first_day), dense
+
+def _fill_price_features(features, block, rows, plan):
+    """
+    Mengisi kolom lag dan rolling mean `features` (... x baris x F) dari blok harga (... x tanggal x target)
+    untuk posisi `rows` di blok; baris warm-up sebelum `rows` harus sudah tercakup di blok.
+    """
+    features[..., plan['lag_feat']] = block[..., rows[:, None] - plan['lag_offset'][None, :], plan['lag_target'][None, :]]
+
+    cumulative = np.cumsum(block, axis=-2)
+    cumulative = np.concatenate([np.zeros_like(cumulative[..., :1, :]), cumulative], axis=-2)
+    windows = plan['roll_window'][None, :]
+    roll_targets = plan['roll_target'][None, :]
+    features[..., plan['roll_feat']] = (
+        cumulative[..., rows[:, None] + 1, roll_targets] - cumulative[..., rows[:, None] + 1 - windows, roll_targets]
+    ) / windows
+
+def _prepare_dense_rows(df_long, commodity_details, schema, n_rows=None, with_cutoff_state=False):
+    """
+    Inti `prepare_dense_window`/`prepare_dense_history`: fitur untuk `n_rows` baris valid terakhir
+    (None = seluruh baris valid) beserta baris warm-up untuk lag/rolling. `with_cutoff_state`
+    menyimpan data yang dibutuhkan `PreparedWindow.windows` untuk jendela tanpa look-ahead.
+    """
+    target_cols = commodity_details['targets']
+    schema = schema or FeatureSchema(target_cols, default_feature_cols(target_cols))
+    lookback = max(LAGS + WINDOWS)
+
+    # 1. Matriks padat tanggal x target
+    first_day, dense = _dense_price_matrix(df_long, target_cols)
+    n_days = len(dense)
+
+    # Target tanpa satu pun harga tidak bisa diinterpolasi, sehingga tidak ada baris valid
+    available = 0 if np.isnan(dense).all(axis=0).any() else max(n_days - lookback, 0)
+    if available < SEQ_LENGTH:
+        return None, _insufficient_history_message(available)
+    n_rows = available if n_rows is None else n_rows
+
+    # 2. Interpolasi linear (dengan pengisian di kedua ujung) hanya untuk blok yang dibutuhkan
+    block_start = n_days - n_rows - lookback
+    block_index = np.arange(block_start, n_days)
+    block = np.empty((len(block_index), len(target_cols)), dtype=np.float64)
+    for t in range(len(target_cols)):
+        column = dense[:, t]
+        observed = np.flatnonzero(~np.isnan(column))
+        block[:, t] = np.interp(block_index, observed, column[observed])
+
+    # 3. Fitur lag, rolling mean, dan tanggal untuk n_rows baris terakhir
+    plan = _feature_plan(schema.feature_cols, target_cols)
+    rows = np.arange(lookback, lookback + n_rows)
+    features = np.empty((n_rows, schema.n_features), dtype=np.float64)
+    _fill_price_features(features, block, rows, plan)
+
+    row_dates = pd.date_range(start=first_day + pd.Timedelta(days=block_start + lookback), periods=n_rows, freq='D')
+    features[:, plan['date_feat']] = CALENDAR.slice(
+        row_dates[0], row_dates[-1], trend_origin=first_day, columns=plan['date_cols']
+    )
+
+    cutoff_state = None
+    if with_cutoff_state:
+        # Observasi terakhir sampai setiap tanggal blok (posisi relatif terhadap awal blok dan harganya)
+        positions = np.where(np.isnan(dense), -1, np.arange(n_days)[:, None])
+        last_day = np.maximum.accumulate(positions, axis=0)[block_start:]
+        last_value = np.where(last_day >= 0, dense[np.maximum(last_day, 0), np.arange(len(target_cols))], np.nan)
+        cutoff_state = {
+            'block': block,
+            'last_index': np.where(last_day >= 0, last_day - block_start, np.iinfo(np.int64).min),
+            'last_value': last_value.astype(np.float64),
+        }
+
+    return PreparedWindow(row_dates, block[rows], features, schema, cutoff_state), None
+
+def prepare_dense_window(df_long, commodity_details, schema=None):
+    """
+    Versi NumPy dari `full_preparation_pipeline`: harga disusun menjadi matriks padat float32
+    (tanggal x target), lalu fitur hanya dihitung untuk SEQ_LENGTH baris terakhir beserta
+    baris warm-up untuk lag/rolling, sehingga biaya tidak bergantung pada panjang histori.
+    Mengembalikan (PreparedWindow, None) atau (None, pesan error).
+    """
+    return _prepare_dense_rows(df_long, commodity_details, schema, n_rows=SEQ_LENGTH)
+
+def prepare_dense_history(df_long, commodity_details, schema=None):
+    """
+    Seperti `prepare_dense_window`, tetapi untuk seluruh baris valid histori (dipakai backtesting).
+    Harga dan fitur histori diinterpolasi dengan seluruh data; jendela per origin untuk backtest
+    diambil lewat `PreparedWindow.windows`, yang hanya memakai data sampai origin tersebut.
+    Mengembalikan (PreparedWindow, None) atau (None, pesan error).
+    """
+    return _prepare_dense_rows(df_long, commodity_details, schema, with_cutoff_state=True)
+
+def full_preparation_pipeline(df_long, commodity_details, mode='pandas', schema=None):
     """
     Menjalankan seluruh pipeline persiapan data: pivot, feature engineering, dan pembersihan.
     Mengembalikan sequence terakhir yang siap untuk prediksi.
+    `mode='numpy'` memakai `prepare_dense_window` (urutan fitur mengikuti `schema` jika diberikan).
     """
+    if mode == 'numpy':
+        prepared, error_message = prepare_dense_window(df_long, commodity_details, schema)
+        if error_message:
+            return None, None, error_message
+        return prepared.to_frame(), prepared.schema.feature_cols, None
+
     target_cols = commodity_details['targets']
     
     # 1. Pivot data
-    df_pivot = df_long.pivot_table(index='date', columns='komoditas_sub', values='harga')
+    df_pivot = df_long.pivot_table(index='date', columns='komoditas_sub', values='harga', observed=True)
     
     # Pastikan semua kolom target ada, isi dengan NaN jika tidak ada lalu interpolasi
     for col in target_cols:
@@ -80,8 +588,7 @@ def full_preparation_pipeline(df_long, commodity_details):
     
     if len(df_processed) < SEQ_LENGTH:
         # returns 3 values: (None untuk sequence, None untuk feature_cols, dan pesan error)
-        error_message = f"Data historis tidak cukup untuk prediksi. Dibutuhkan {SEQ_LENGTH} hari data valid setelah feature engineering, hanya tersedia {len(df_processed)} hari."
-        return None, None, error_message
+        return None, None, _insufficient_history_message(len(df_processed))
  
     # 6. Ambil sekuens terakhir dan daftar kolom fitur
     prediction_sequence = df_processed.tail(SEQ_LENGTH)
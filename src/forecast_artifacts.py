@@ -0,0 +1,118 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+FORECAST_ARTIFACT_DIR = os.environ.get("FORECAST_ARTIFACT_DIR", "data/forecasts")
+# Versi 2: menyimpan `price_history` (histori harga harian untuk grafik tren)
+ARTIFACT_FORMAT_VERSION = 2
+RESIDUALS_FILE = 'residuals.json'
+
+
+def _commodity_dir(commodity, artifact_dir=None):
+    return os.path.join(artifact_dir or FORECAST_ARTIFACT_DIR, commodity)
+
+
+def write_artifact(commodity, df_forecast, sequence_history, metadata, price_history, artifact_dir=None):
+    """
+    Menyimpan hasil forecast sebagai artifact JSON berversi (`<versi>.json`)
+    dan memperbarui penunjuk `latest.json` untuk komoditas tersebut.
+    `price_history` adalah harga harian seluruh rentang input (tanggal x sub-komoditas) untuk grafik tren.
+    """
+    directory = _commodity_dir(commodity, artifact_dir)
+    os.makedirs(directory, exist_ok=True)
+
+    generated_at = datetime.now()
+    version = generated_at.strftime('%Y%m%dT%H%M%S')
+    artifact = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'commodity': commodity,
+        'version': version,
+        'generated_at': generated_at.isoformat(timespec='seconds'),
+        **metadata,
+        'forecast': json.loads(df_forecast.to_json(orient='split', date_format='iso')),
+        'sequence_history': json.loads(sequence_history.to_json(orient='split', date_format='iso')),
+        'price_history': json.loads(price_history.to_json(orient='split', date_format='iso')),
+    }
+
+    path = os.path.join(directory, f"{version}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False)
+
+    # Perbarui penunjuk secara atomik agar app tidak membaca file setengah jadi
+    tmp_latest = os.path.join(directory, 'latest.json.tmp')
+    with open(tmp_latest, 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'path': os.path.basename(path)}, f)
+    os.replace(tmp_latest, os.path.join(directory, 'latest.json'))
+    return path
+
+
+def write_residuals(commodity, residuals, metadata, artifact_dir=None):
+    """
+    Menyimpan pool residual out-of-sample hasil `python -m src.backtest` (baris x sub-komoditas)
+    sebagai `residuals.json` di folder artifact komoditas, untuk interval prediksi di app.
+    """
+    directory = _commodity_dir(commodity, artifact_dir)
+    os.makedirs(directory, exist_ok=True)
+    generated_at = datetime.now()
+    payload = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'commodity': commodity,
+        'version': generated_at.strftime('%Y%m%dT%H%M%S'),
+        'generated_at': generated_at.isoformat(timespec='seconds'),
+        **metadata,
+        'residuals': np.asarray(residuals, dtype=np.float64).tolist(),
+    }
+    path = os.path.join(directory, RESIDUALS_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def load_residuals(commodity, model_hash, target_cols, artifact_dir=None):
+    """
+    Membaca pool residual backtest jika dibuat dari file model dan sub-komoditas yang sama.
+    Mengembalikan dict dengan `residuals` (array baris x sub-komoditas), atau None jika tidak berlaku.
+    """
+    try:
+        with open(os.path.join(_commodity_dir(commodity, artifact_dir), RESIDUALS_FILE), encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (payload.get('format_version') != ARTIFACT_FORMAT_VERSION or payload.get('model_hash') != model_hash
+            or payload.get('targets') != list(target_cols) or not payload.get('residuals')):
+        return None
+    payload['residuals'] = np.asarray(payload['residuals'], dtype=np.float64)
+    return payload
+
+
+def _frame_from_split(data, index_name=None):
+    df = pd.DataFrame(data['data'], index=pd.to_datetime(data['index']), columns=data['columns'])
+    df.index.name = index_name
+    return df
+
+
+def load_latest_artifact(commodity, artifact_dir=None):
+    """
+    Membaca artifact terbaru untuk komoditas. Mengembalikan None jika belum ada.
+    `forecast`, `sequence_history`, dan `price_history` dikembalikan sebagai DataFrame.
+    """
+    directory = _commodity_dir(commodity, artifact_dir)
+    try:
+        with open(os.path.join(directory, 'latest.json'), encoding='utf-8') as f:
+            pointer = json.load(f)
+        with open(os.path.join(directory, pointer['path']), encoding='utf-8') as f:
+            artifact = json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if artifact.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        return None
+    artifact['forecast'] = _frame_from_split(artifact['forecast'], index_name='Tanggal')
+    artifact['sequence_history'] = _frame_from_split(artifact['sequence_history'])
+    artifact['price_history'] = _frame_from_split(artifact['price_history'])
+    return artifact
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 6 * 3600
+
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 dari file model, di-memo berdasarkan (path, mtime, ukuran)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _file_hashes_lock:
+        if memo_key in _file_hashes:
+            return _file_hashes[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+    with _file_hashes_lock:
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+
+def window_fingerprint(sequence, columns):
+    """Fingerprint dari jendela input terakhir: nilai, urutan kolom, dan tanggal terakhirnya."""
+    digest = hashlib.sha256()
+    digest.update('\x1f'.join(columns).encode('utf-8'))
+    digest.update(str(sequence.index[-1]).encode('utf-8'))
+    digest.update(np.ascontiguousarray(sequence[columns].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+class ForecastCache:
+    """
+    Cache hasil forecasting yang dibagi antar sesi Streamlit.
+
+    Key terdiri dari komoditas, hash file model, dan fingerprint jendela input terakhir,
+    sehingga sesi lain dengan data terbaru yang sama langsung memakai hasil yang sudah ada.
+    Eviction memakai LRU (jumlah entri maksimum) dan TTL, dengan persistensi opsional ke disk.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, persist_dir=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_dir = persist_dir
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    @staticmethod
+    def make_key(commodity, model_path, sequence, feature_cols, target_cols, future_steps, variant=None):
+        parts = [
+            commodity,
+            file_hash(model_path),
+            window_fingerprint(sequence, list(target_cols) + list(feature_cols)),
+            str(future_steps),
+        ]
+        if variant is not None:
+            # Hasil turunan (misal: interval prediksi) disimpan terpisah dari forecast titiknya
+            parts.append(str(variant))
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.persist_dir, f"{key}.npy")
+
+    def _is_expired(self, created_at):
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._is_expired(created_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        value, created_at = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+        self._store_memory(key, value, created_at)
+        return value
+
+    def _read_disk(self, key):
+        if not self.persist_dir:
+            return None, None
+        path = self._disk_path(key)
+        try:
+            created_at = os.path.getmtime(path)
+            if self._is_expired(created_at):
+                os.remove(path)
+                return None, None
+            return np.load(path, allow_pickle=False), created_at
+        except (OSError, ValueError):
+            return None, None
+
+    def _store_memory(self, key, value, created_at):
+        with self._lock:
+            self._entries[key] = (created_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key, value):
+        value = np.asarray(value)
+        value.setflags(write=False)
+        self._store_memory(key, value, time.time())
+        if self.persist_dir:
+            # Tulis ke file sementara lalu rename agar pembaca lain tidak melihat file setengah jadi
+            tmp_path = self._disk_path(key) + f".{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, value, allow_pickle=False)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def get_or_compute(self, key, compute_fn):
+        value = self.get(key)
+        if value is None:
+            value = compute_fn()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'hit_rate': self.hits / total if total else None,
+            }
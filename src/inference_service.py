@@ -0,0 +1,378 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import resource
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import streamlit as st
+
+from .instrumentation import NULL_TRACE
+from .predictions import ModelRegistry, forecast_intervals, iter_forecast_batch
+
+# Jumlah proses worker inferensi (0 = inferensi tetap di proses Streamlit seperti sebelumnya)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "1"))
+# Jumlah job maksimum yang boleh mengantre; job baru ditolak jika antrean penuh
+MAX_QUEUE_DEPTH = int(os.environ.get("INFERENCE_MAX_QUEUE", "32"))
+# Worker yang memorinya saat ini (RSS) melewati batas ini diganti dengan proses baru setelah batch selesai
+WORKER_MEMORY_LIMIT_MB = int(os.environ.get("INFERENCE_WORKER_MEMORY_MB", "1536"))
+BATCH_WINDOW_SECONDS = 0.02
+MAX_BATCH_SIZE = 64
+RESULT_TIMEOUT_SECONDS = 120
+# Interval pemeriksaan worker yang mati (detik), juga saat hasil dari worker lain terus berdatangan
+WORKER_CHECK_SECONDS = 1.0
+
+
+class InferenceQueueFull(RuntimeError):
+    """Antrean job inferensi penuh; permintaan sebaiknya dicoba lagi nanti."""
+
+
+class InferenceWorkerError(RuntimeError):
+    """Job gagal di worker (misal: file model tidak ditemukan) atau worker berhenti saat memprosesnya."""
+
+
+def _current_rss_mb():
+    """RSS proses saat ini (MB) dari /proc; jika tidak tersedia (non-Linux), puncak RSS `ru_maxrss`."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss dalam KB di Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _collect_batch(jobs, first_job, batch_window, max_batch):
+    """Mengumpulkan job lain yang datang dalam `batch_window` detik setelah job pertama."""
+    batch = [first_job]
+    deadline = time.monotonic() + batch_window
+    while len(batch) < max_batch:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            job = jobs.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if job is None:
+            return batch, True
+        batch.append(job)
+    return batch, False
+
+
+def _run_group(registry, config, kind, commodity, feature_cols, future_steps, group, results):
+    model, scalers = registry.get(commodity)
+    targets = config[commodity]['targets']
+    if kind == 'intervals':
+        return [forecast_intervals(model, scalers, job['sequence'], feature_cols, targets,
+                                   future_steps=future_steps, **job['options']) for job in group]
+
+    # Job yang meminta streaming menerima harga setiap langkah segera setelah dihitung
+    streaming = [(k, job['id']) for k, job in enumerate(group) if job['stream']]
+    outputs = np.empty((len(group), future_steps, len(targets)))
+    steps = iter_forecast_batch(model, scalers, [job['sequence'] for job in group], feature_cols, targets,
+                                future_steps=future_steps)
+    for i, predicted_prices in enumerate(steps):
+        outputs[:, i] = predicted_prices
+        for k, job_id in streaming:
+            results.put(('step', job_id, i, predicted_prices[k]))
+    return outputs
+
+
+def _worker_main(config, jobs, results, memory_limit_mb, batch_window, max_batch):
+    """
+    Loop proses worker: memuat model lewat `ModelRegistry` miliknya sendiri, lalu mengambil job dari antrean.
+    Job forecast untuk komoditas dan susunan fitur yang sama digabung menjadi satu `forecast_batch`.
+    """
+    registry = ModelRegistry(config)
+    registry.prewarm()
+    pid = os.getpid()
+    stop = False
+
+    while not stop:
+        job = jobs.get()
+        if job is None:
+            break
+        batch, stop = _collect_batch(jobs, job, batch_window, max_batch)
+        results.put(('started', pid, [job['id'] for job in batch]))
+
+        groups = {}
+        for job in batch:
+            key = (job['kind'], job['commodity'], tuple(job['feature_cols']), job['future_steps'])
+            groups.setdefault(key, []).append(job)
+
+        for (kind, commodity, feature_cols, future_steps), group in groups.items():
+            start = time.perf_counter()
+            try:
+                outputs = _run_group(registry, config, kind, commodity, list(feature_cols), future_steps, group, results)
+            except Exception as e:
+                for job in group:
+                    results.put(('error', job['id'], f"{type(e).__name__}: {e}"))
+                continue
+            stats = {'worker_pid': pid, 'batch_size': len(group), 'compute_ms': (time.perf_counter() - start) * 1000}
+            for job, output in zip(group, outputs):
+                results.put(('done', job['id'], output, stats))
+
+        rss_mb = _current_rss_mb()
+        if rss_mb > memory_limit_mb:
+            results.put(('recycle', pid, rss_mb))
+            break
+
+
+class InferenceService:
+    """
+    Pool proses worker untuk inferensi, dibagi oleh semua sesi Streamlit.
+
+    Forecast dijalankan di luar proses Streamlit sehingga tidak berebut GIL dan thread pool
+    dengan rendering. Job masuk lewat antrean terbatas (`max_queue`); job untuk komoditas yang
+    sama yang datang hampir bersamaan digabung menjadi satu batch model. Worker yang melewati
+    batas memori (RSS saat ini) diganti otomatis, dan job yang sedang diproses atau sudah diambil
+    worker yang mati langsung dianggap gagal.
+    """
+
+    def __init__(self, config, n_workers=INFERENCE_WORKERS, max_queue=MAX_QUEUE_DEPTH,
+                 memory_limit_mb=WORKER_MEMORY_LIMIT_MB, batch_window=BATCH_WINDOW_SECONDS, max_batch=MAX_BATCH_SIZE):
+        self.config = config
+        self.n_workers = n_workers
+        self.memory_limit_mb = memory_limit_mb
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        # 'spawn' agar worker tidak mewarisi state thread Streamlit/TensorFlow dari proses induk
+        self._ctx = mp.get_context('spawn')
+        self._jobs = self._ctx.Queue(maxsize=max_queue)
+        self._results = self._ctx.Queue()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._in_flight = {}
+        self._step_callbacks = {}
+        self._workers = {}
+        self._last_worker_death = None
+        self._closed = False
+        self._stats = {'completed': 0, 'failed': 0, 'rejected': 0, 'cancelled': 0, 'recycled': 0, 'batches': 0, 'max_batch_size': 0}
+
+        for _ in range(n_workers):
+            self._spawn_worker()
+        self._collector = threading.Thread(target=self._collect_results, name="inference-results", daemon=True)
+        self._collector.start()
+
+    def _spawn_worker(self):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.config, self._jobs, self._results, self.memory_limit_mb, self.batch_window, self.max_batch),
+            name="inference-worker",
+            daemon=True,
+        )
+        process.start()
+        self._workers[process.pid] = process
+
+    def submit(self, commodity, sequence, feature_cols, future_steps=30, kind='forecast', options=None,
+               trace=NULL_TRACE, on_step=None):
+        """
+        Mengirim job ke antrean dan mengembalikan `Future`; `InferenceQueueFull` jika antrean penuh.
+        `on_step(step, prices)` (opsional, hanya job forecast) dipanggil dari thread pengumpul hasil
+        untuk setiap langkah yang selesai.
+        """
+        if self._closed:
+            raise RuntimeError("InferenceService sudah ditutup.")
+        job_id = next(self._ids)
+        future = Future()
+        future.job_id = job_id
+        with self._lock:
+            self._futures[job_id] = (future, trace, time.perf_counter())
+            if on_step is not None:
+                self._step_callbacks[job_id] = on_step
+
+        job = {
+            'id': job_id, 'kind': kind, 'commodity': commodity, 'sequence': sequence,
+            'feature_cols': list(feature_cols), 'future_steps': future_steps, 'options': options or {},
+            'stream': on_step is not None,
+        }
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._futures[job_id]
+                self._step_callbacks.pop(job_id, None)
+                self._stats['rejected'] += 1
+            raise InferenceQueueFull("Antrean inferensi penuh, server sedang sibuk.")
+        return future
+
+    def forecast(self, commodity, sequence, feature_cols, future_steps=30, trace=NULL_TRACE, timeout=RESULT_TIMEOUT_SECONDS):
+        """Seperti `forecast_iteratively`, tetapi dijalankan di worker (memblokir sampai hasil tersedia)."""
+        return self.submit(commodity, sequence, feature_cols, future_steps, trace=trace).result(timeout=timeout)
+
+    def iter_forecast(self, commodity, sequence, feature_cols, future_steps=30, trace=NULL_TRACE, timeout=RESULT_TIMEOUT_SECONDS):
+        """
+        Seperti `iter_forecast`, tetapi dijalankan di worker: menghasilkan harga (target,) setiap langkah.
+        Menghentikan iterasi membatalkan job; hasilnya tidak lagi dikirim ke pemanggil.
+        """
+        steps = queue.Queue()
+        future = self.submit(commodity, sequence, feature_cols, future_steps, trace=trace,
+                             on_step=lambda step, prices: steps.put(prices))
+        future.add_done_callback(lambda _: steps.put(None))
+        try:
+            for _ in range(future_steps):
+                try:
+                    prices = steps.get(timeout=timeout)
+                except queue.Empty:
+                    raise InferenceWorkerError(f"Tidak ada hasil dari worker inferensi dalam {timeout} detik.")
+                if prices is None:
+                    # Job selesai tanpa langkah tersisa (gagal atau dibatalkan)
+                    future.result(timeout=0)
+                    return
+                yield prices
+            future.result(timeout=timeout)
+        finally:
+            if not future.done():
+                self.cancel(future)
+
+    def cancel(self, future):
+        """Membatalkan job: hasil dan langkahnya tidak lagi diteruskan (komputasi batch di worker tetap berjalan)."""
+        with self._lock:
+            self._futures.pop(future.job_id, None)
+            self._step_callbacks.pop(future.job_id, None)
+            self._stats['cancelled'] += 1
+        future.cancel()
+
+    def forecast_intervals(self, commodity, sequence, feature_cols, future_steps=30, trace=NULL_TRACE,
+                           timeout=RESULT_TIMEOUT_SECONDS, **options):
+        """Seperti `forecast_intervals`, tetapi dijalankan di worker."""
+        return self.submit(commodity, sequence, feature_cols, future_steps, kind='intervals',
+                           options=options, trace=trace).result(timeout=timeout)
+
+    def _resolve(self, job_id, result=None, error=None, stats=None):
+        with self._lock:
+            entry = self._futures.pop(job_id, None)
+            self._in_flight.pop(job_id, None)
+            self._step_callbacks.pop(job_id, None)
+        if entry is None:
+            return
+        with self._lock:
+            self._stats['failed' if error else 'completed'] += 1
+        future, trace, submitted_at = entry
+        if error:
+            future.set_exception(InferenceWorkerError(error))
+            return
+        if stats:
+            trace.record_step(
+                'inference',
+                batch_size=stats['batch_size'],
+                worker_pid=stats['worker_pid'],
+                wait_ms=(time.perf_counter() - submitted_at) * 1000 - stats['compute_ms'],
+                compute_ms=stats['compute_ms'],
+            )
+        future.set_result(result)
+
+    def _collect_results(self):
+        last_check = time.monotonic()
+        while not self._closed:
+            try:
+                message = self._results.get(timeout=WORKER_CHECK_SECONDS)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            if message is not None:
+                self._handle_message(message)
+            # Diperiksa juga saat antrean hasil tidak pernah kosong, agar worker yang mati cepat terdeteksi
+            if message is None or time.monotonic() - last_check >= WORKER_CHECK_SECONDS:
+                self._check_workers()
+                last_check = time.monotonic()
+
+    def _handle_message(self, message):
+        kind = message[0]
+        if kind == 'started':
+            _, pid, job_ids = message
+            with self._lock:
+                self._in_flight.update({job_id: pid for job_id in job_ids})
+                self._stats['batches'] += 1
+                self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(job_ids))
+        elif kind == 'step':
+            _, job_id, step, prices = message
+            with self._lock:
+                on_step = self._step_callbacks.get(job_id)
+            if on_step is not None:
+                on_step(step, prices)
+        elif kind == 'done':
+            _, job_id, result, stats = message
+            self._resolve(job_id, result=result, stats=stats)
+        elif kind == 'error':
+            _, job_id, error = message
+            self._resolve(job_id, error=error)
+        elif kind == 'recycle':
+            _, pid, _ = message
+            with self._lock:
+                self._stats['recycled'] += 1
+            process = self._workers.get(pid)
+            if process is not None:
+                process.join(timeout=5)
+            self._check_workers()
+
+    def _check_workers(self):
+        """Mengganti worker yang sudah berhenti dan menggagalkan job yang sedang atau sempat diambilnya."""
+        for pid, process in list(self._workers.items()):
+            if process.is_alive():
+                continue
+            del self._workers[pid]
+            self._last_worker_death = time.perf_counter()
+            with self._lock:
+                lost = [job_id for job_id, worker_pid in self._in_flight.items() if worker_pid == pid]
+            for job_id in lost:
+                self._resolve(job_id, error=f"Worker inferensi (pid {pid}) berhenti saat memproses job.")
+            if not self._closed:
+                self._spawn_worker()
+        self._fail_unclaimed_jobs()
+
+    def _fail_unclaimed_jobs(self):
+        """
+        Job yang sudah diambil worker dari antrean, tetapi workernya mati sebelum mengirim 'started',
+        tidak tercatat di `_in_flight`. Jika antrean sudah kosong, job yang dikirim sebelum worker terakhir
+        mati, belum dimulai worker mana pun, dan sudah menunggu lebih dari `WORKER_CHECK_SECONDS`
+        (worker yang hidup mengirim 'started' dalam `batch_window`) dianggap hilang dan langsung digagalkan.
+        """
+        if self._last_worker_death is None or not self._jobs.empty():
+            return
+        now = time.perf_counter()
+        with self._lock:
+            lost = [
+                job_id for job_id, (_, _, submitted_at) in self._futures.items()
+                if job_id not in self._in_flight and submitted_at < self._last_worker_death
+                and now - submitted_at > WORKER_CHECK_SECONDS
+            ]
+        for job_id in lost:
+            self._resolve(job_id, error="Worker inferensi berhenti sebelum sempat memproses job.")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'pending': len(self._futures),
+                'in_flight': len(self._in_flight),
+                **self._stats,
+            }
+
+    def close(self, timeout=5):
+        self._closed = True
+        for _ in self._workers:
+            try:
+                self._jobs.put_nowait(None)
+            except queue.Full:
+                break
+        for process in self._workers.values():
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+@st.cache_resource(show_spinner=False)
+def get_inference_service(config):
+    """Service inferensi bersama untuk semua sesi; None jika `INFERENCE_WORKERS=0`."""
+    # Worker 'spawn' mengimpor ulang script app (sebagai `__mp_main__`); jangan buat pool di dalamnya
+    if INFERENCE_WORKERS <= 0 or mp.current_process().name != 'MainProcess':
+        return None
+    return InferenceService(config)
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger("pangan.instrumentation")
+
+# Aktifkan default lewat environment (misal: PANGAN_INSTRUMENTATION=1); di UI bisa diaktifkan per sesi
+INSTRUMENTATION_DEFAULT = os.environ.get("PANGAN_INSTRUMENTATION", "0") == "1"
+# tracemalloc memperlambat semua alokasi di proses; bisa dimatikan (misal: saat load test) dengan nilai 0
+TRACK_MEMORY_DEFAULT = os.environ.get("PANGAN_INSTRUMENTATION_MEMORY", "1") == "1"
+
+
+class MemoryTracker:
+    """
+    Pengelola `tracemalloc` bersama untuk semua sesi dalam satu proses.
+
+    `tracemalloc` bersifat global per proses: tracing dimulai saat tahap pertama aktif dan baru
+    dihentikan setelah tidak ada tahap yang aktif, sehingga sesi lain tidak pernah menghentikan
+    tracing yang masih dipakai. Puncak memori hanya di-reset dan dilaporkan untuk tahap yang berjalan
+    sendirian; tahap yang tumpang tindih dengan tahap lain (misal dari sesi lain) dilaporkan None.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+        self._overlaps = 0
+        self._owns_tracing = False
+
+    def begin(self):
+        with self._lock:
+            alone = self._active == 0
+            if alone:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._owns_tracing = True
+                tracemalloc.reset_peak()
+            else:
+                self._overlaps += 1
+            self._active += 1
+            return {'alone': alone, 'overlaps': self._overlaps, 'current': tracemalloc.get_traced_memory()[0]}
+
+    def end(self, token):
+        """Mengembalikan {'peak_memory_mb', 'memory_delta_mb'} relatif terhadap awal tahap (None jika tumpang tindih)."""
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            exclusive = token['alone'] and self._overlaps == token['overlaps']
+            self._active -= 1
+            if self._active == 0 and self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+        if not exclusive:
+            return {'peak_memory_mb': None, 'memory_delta_mb': None}
+        return {
+            'peak_memory_mb': (peak - token['current']) / 1024 ** 2,
+            'memory_delta_mb': (current - token['current']) / 1024 ** 2,
+        }
+
+
+MEMORY_TRACKER = MemoryTracker()
+
+
+class Trace:
+    """
+    Pencatat waktu dan sumber daya per tahap pipeline prediksi.
+
+    Setiap `stage` mencatat wall time, jumlah baris yang diproses, dan (opsional) puncak serta selisih
+    memori Python lewat `MEMORY_TRACKER`. `record_step` dipakai untuk rincian per langkah forecasting.
+    Setiap tahap juga dikirim sebagai log terstruktur (JSON) ke logger `pangan.instrumentation`.
+    """
+
+    enabled = True
+
+    def __init__(self, name, track_memory=True):
+        self.name = name
+        self.track_memory = track_memory
+        self.created_at = datetime.now().isoformat(timespec='seconds')
+        self.stages = []
+        self.steps = []
+        self.resources = {}
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        info = {'stage': name, 'rows': rows}
+        memory_token = MEMORY_TRACKER.begin() if self.track_memory else None
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            info['wall_ms'] = (time.perf_counter() - start) * 1000
+            if memory_token is not None:
+                info.update(MEMORY_TRACKER.end(memory_token))
+            self.stages.append(info)
+            logger.info(json.dumps({'trace': self.name, **info}, default=str))
+
+    def record_step(self, stage, **fields):
+        self.steps.append({'stage': stage, **fields})
+
+    def record_resource(self, name, values):
+        """Mencatat cuplikan statistik sumber daya bersama (misal registry model) dan mengirimnya ke log."""
+        self.resources[name] = values
+        logger.info(json.dumps({'trace': self.name, 'resource': name, 'values': values}, default=str))
+
+    def step_summary(self):
+        """Total dan rata-rata setiap metrik `*_ms` per tahap dari `record_step`."""
+        summary = {}
+        for step in self.steps:
+            stage_summary = summary.setdefault(step['stage'], {'steps': 0})
+            stage_summary['steps'] += 1
+            for key, value in step.items():
+                if key.endswith('_ms'):
+                    stage_summary[f'total_{key}'] = stage_summary.get(f'total_{key}', 0.0) + value
+        for stage_summary in summary.values():
+            for key in [k for k in stage_summary if k.startswith('total_')]:
+                stage_summary[key.replace('total_', 'mean_')] = stage_summary[key] / stage_summary['steps']
+        return summary
+
+    def to_dict(self):
+        return {
+            'trace': self.name,
+            'created_at': self.created_at,
+            'stages': self.stages,
+            'step_summary': self.step_summary(),
+            'steps': self.steps,
+            'resources': self.resources,
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), default=str, **kwargs)
+
+
+class NullTrace:
+    """Pengganti `Trace` saat instrumentasi nonaktif: semua method tidak melakukan apa-apa."""
+
+    enabled = False
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        yield {}
+
+    def record_step(self, stage, **fields):
+        pass
+
+    def record_resource(self, name, values):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+def create_trace(name, enabled=INSTRUMENTATION_DEFAULT, track_memory=TRACK_MEMORY_DEFAULT):
+    return Trace(name, track_memory=track_memory) if enabled else NULL_TRACE
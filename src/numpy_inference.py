@@ -0,0 +1,155 @@
+import json
+import numpy as np
+
+# Layer yang didukung oleh engine NumPy (cukup untuk arsitektur stacked, bidirectional, dan baseline)
+SUPPORTED_LAYERS = {"LSTM", "Bidirectional", "Dense", "Dropout"}
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "hard_sigmoid": lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0),
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+def lstm_forward(x, kernel, recurrent_kernel, bias, activation="tanh",
+                 recurrent_activation="sigmoid", return_sequences=False, go_backwards=False):
+    """
+    Forward pass LSTM (urutan gate Keras: i, f, c, o) untuk input berbentuk (batch, time, fitur).
+    Proyeksi input untuk semua timestep dihitung dalam satu perkalian matriks.
+    """
+    act = ACTIVATIONS[activation]
+    rec_act = ACTIVATIONS[recurrent_activation]
+    batch, steps, _ = x.shape
+    units = recurrent_kernel.shape[0]
+
+    if go_backwards:
+        x = x[:, ::-1, :]
+
+    x_proj = x @ kernel + bias
+    h = np.zeros((batch, units), dtype=x.dtype)
+    c = np.zeros((batch, units), dtype=x.dtype)
+    outputs = np.empty((batch, steps, units), dtype=x.dtype) if return_sequences else None
+
+    for t in range(steps):
+        z = x_proj[:, t, :] + h @ recurrent_kernel
+        i = rec_act(z[:, :units])
+        f = rec_act(z[:, units:2 * units])
+        c = f * c + i * act(z[:, 2 * units:3 * units])
+        o = rec_act(z[:, 3 * units:])
+        h = o * act(c)
+        if return_sequences:
+            outputs[:, t, :] = h
+
+    return outputs if return_sequences else h
+
+
+def dense_forward(x, kernel, bias, activation="linear"):
+    return ACTIVATIONS[activation](x @ kernel + bias)
+
+
+# Akhiran bobot int8: skala dekuantisasi per kolom output (`{nama}__scale`)
+QUANT_SCALE_SUFFIX = "__scale"
+
+
+class NumpyLSTMModel:
+    """
+    Engine inferensi LSTM berbasis NumPy murni, dimuat dari file `.npz` hasil `src.export_numpy_models`
+    atau `src.package_models`. Memiliki method `predict` yang kompatibel dengan model Keras sehingga
+    bisa dipakai tanpa TensorFlow.
+
+    Jika `scalers_folded`, transformasi scaler_X dan inverse scaler_y sudah dilipat ke bobot layer
+    pertama dan terakhir: input berupa fitur mentah dan output langsung berupa harga.
+    Bobot float16/int8 hanya format penyimpanan (`weights`); saat model dibuat bobot didekuantisasi
+    sekali ke float32 (`compute_weights`), sehingga `predict` tidak mengulang konversi di setiap langkah.
+    Dengan `keep_storage=False` (default `from_npz`) bobot simpanan dilepas setelah didekuantisasi, sehingga
+    memori varian sama dengan varian float32: float16/int8 hanya menghemat ukuran file di disk.
+    """
+
+    def __init__(self, layers, weights, input_shape, dtype=np.float32, scalers_folded=False, precision="float32",
+                 keep_storage=True):
+        self.layers = layers
+        self.input_shape = tuple(input_shape)
+        self.dtype = dtype
+        self.scalers_folded = scalers_folded
+        self.precision = precision
+        self.compute_weights = {
+            name: self._dequantize(weights, name) for name in weights if not name.endswith(QUANT_SCALE_SUFFIX)
+        }
+        # Bobot float32 dipakai langsung sebagai bobot komputasi (array yang sama), jadi tidak perlu dilepas
+        self.weights = weights if keep_storage or precision == "float32" else None
+
+    @classmethod
+    def from_npz(cls, path, keep_storage=False):
+        with np.load(path, allow_pickle=False) as data:
+            spec = json.loads(str(data["__spec__"]))
+            weights = {key: data[key] for key in data.files if key != "__spec__"}
+        return cls(spec["layers"], weights, spec["input_shape"], scalers_folded=spec.get("scalers_folded", False),
+                   precision=spec.get("precision", "float32"), keep_storage=keep_storage)
+
+    @property
+    def nbytes(self):
+        """Memori bobot yang dipegang model (byte); array yang dipakai bersama hanya dihitung sekali."""
+        arrays = {id(value): value for value in self.compute_weights.values()}
+        arrays.update((id(value), value) for value in (self.weights or {}).values())
+        return int(sum(value.nbytes for value in arrays.values()))
+
+    @property
+    def storage_nbytes(self):
+        """Ukuran bobot dalam format penyimpanan (byte, sebelum kompresi `.npz`)."""
+        if self.weights is None:
+            raise ValueError("Bobot simpanan sudah dilepas (keep_storage=False).")
+        return int(sum(value.nbytes for value in self.weights.values()))
+
+    def save_npz(self, path):
+        if self.weights is None:
+            raise ValueError("Bobot simpanan sudah dilepas (keep_storage=False); muat dengan keep_storage=True untuk menyimpan ulang.")
+        spec = {"layers": self.layers, "input_shape": list(self.input_shape),
+                "scalers_folded": self.scalers_folded, "precision": self.precision}
+        np.savez_compressed(path, __spec__=np.array(json.dumps(spec)), **self.weights)
+
+    def _dequantize(self, weights, name):
+        """Bobot `name` dalam dtype komputasi (dekuantisasi int8 / konversi float16 jika perlu)."""
+        value = weights[name]
+        scale = weights.get(name + QUANT_SCALE_SUFFIX)
+        if scale is not None:
+            return value.astype(self.dtype) * scale
+        return value.astype(self.dtype, copy=False)
+
+    def weight(self, name):
+        """Bobot `name` float32 yang sudah didekuantisasi saat model dibuat."""
+        return self.compute_weights[name]
+
+    def _lstm(self, x, layer, prefix, go_backwards=False):
+        return lstm_forward(
+            x,
+            self.weight(f"{prefix}_kernel"),
+            self.weight(f"{prefix}_recurrent_kernel"),
+            self.weight(f"{prefix}_bias"),
+            activation=layer["activation"],
+            recurrent_activation=layer["recurrent_activation"],
+            return_sequences=layer["return_sequences"],
+            go_backwards=go_backwards,
+        )
+
+    def predict(self, x, verbose=0):
+        x = np.asarray(x, dtype=self.dtype)
+        for i, layer in enumerate(self.layers):
+            prefix = f"layer{i}"
+            kind = layer["class_name"]
+            if kind == "LSTM":
+                x = self._lstm(x, layer, prefix, go_backwards=layer.get("go_backwards", False))
+            elif kind == "Bidirectional":
+                forward = self._lstm(x, layer, f"{prefix}_forward")
+                backward = self._lstm(x, layer, f"{prefix}_backward", go_backwards=True)
+                if layer["return_sequences"]:
+                    # Output layer mundur dikembalikan ke urutan waktu normal
+                    backward = backward[:, ::-1, :]
+                x = np.concatenate([forward, backward], axis=-1)
+            elif kind == "Dense":
+                x = dense_forward(x, self.weight(f"{prefix}_kernel"), self.weight(f"{prefix}_bias"), layer["activation"])
+            # Dropout tidak aktif saat inferensi
+        return x
+
+    __call__ = predict
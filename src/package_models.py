@@ -0,0 +1,218 @@
+"""
+Membuat varian serving dari model `.npz`: scaler dilipat ke bobot model, dengan bobot float32, float16, atau int8.
+
+Dengan scaler terlipat, setiap langkah forecast tidak lagi memanggil `scaler_X.transform` dan
+`scaler_y.inverse_transform` milik sklearn. Setiap varian dibandingkan dengan model asli + scaler
+(selisih harga dan latensi per langkah), dan hanya ditulis jika selisihnya di bawah toleransi.
+Jalankan dari root repository (setelah `python -m src.export_numpy_models`):
+
+    python -m src.package_models [--commodity Beras] [--max-error-pct 1.0] [--report laporan.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from .config import COMMODITY_CONFIG
+from .feature_engineering import FeatureSchema
+from .numpy_inference import QUANT_SCALE_SUFFIX, NumpyLSTMModel
+from .predictions import MODEL_VARIANTS, load_scalers, variant_path
+
+# Varian float32 terlipat harus identik secara numerik dengan model asli + scaler
+FOLD_MAX_ERROR_PCT = 1e-3
+DEFAULT_MAX_ERROR_PCT = 1.0
+EVAL_SAMPLES = 256
+TIMING_REPEAT = 50
+
+
+def _weighted_layers(model):
+    return [(i, layer) for i, layer in enumerate(model.layers) if layer["class_name"] != "Dropout"]
+
+
+def _kernel_prefixes(model, index, layer):
+    if layer["class_name"] == "Bidirectional":
+        return [f"layer{index}_forward", f"layer{index}_backward"]
+    return [f"layer{index}"]
+
+
+def fold_scalers(model, scaler_X, scaler_y):
+    """
+    Melipat MinMaxScaler ke bobot model: x_scaled = x * s + m pada input layer pertama,
+    dan y = (y_scaled - m_y) / s_y pada Dense linear terakhir. Mengembalikan `NumpyLSTMModel` baru.
+    """
+    if model.scalers_folded:
+        raise ValueError("Scaler sudah dilipat ke model ini.")
+    for name, scaler in (("scaler_X", scaler_X), ("scaler_y", scaler_y)):
+        if not hasattr(scaler, "scale_") or not hasattr(scaler, "min_") or getattr(scaler, "clip", False):
+            raise ValueError(f"{name} bukan MinMaxScaler tanpa clip, tidak bisa dilipat ke model.")
+
+    layers = _weighted_layers(model)
+    (first_index, first), (last_index, last) = layers[0], layers[-1]
+    if first["class_name"] not in ("LSTM", "Bidirectional", "Dense"):
+        raise ValueError(f"Layer pertama '{first['class_name']}' belum didukung untuk pelipatan scaler.")
+    if last["class_name"] != "Dense" or last["activation"] != "linear":
+        raise ValueError("Layer terakhir harus Dense dengan aktivasi linear agar inverse scaler_y bisa dilipat.")
+
+    weights = {key: value.astype(np.float64) for key, value in model.weights.items()}
+    scale_x, min_x = np.asarray(scaler_X.scale_, dtype=np.float64), np.asarray(scaler_X.min_, dtype=np.float64)
+    for prefix in _kernel_prefixes(model, first_index, first):
+        kernel = weights[f"{prefix}_kernel"]
+        weights[f"{prefix}_bias"] = weights[f"{prefix}_bias"] + min_x @ kernel
+        weights[f"{prefix}_kernel"] = scale_x[:, None] * kernel
+
+    scale_y, min_y = np.asarray(scaler_y.scale_, dtype=np.float64), np.asarray(scaler_y.min_, dtype=np.float64)
+    prefix = f"layer{last_index}"
+    weights[f"{prefix}_kernel"] = weights[f"{prefix}_kernel"] / scale_y
+    weights[f"{prefix}_bias"] = (weights[f"{prefix}_bias"] - min_y) / scale_y
+
+    return NumpyLSTMModel(model.layers, {key: value.astype(np.float32) for key, value in weights.items()},
+                          model.input_shape, scalers_folded=True)
+
+
+def _scaler_kernels(model):
+    """Kernel input layer pertama dan kernel Dense terakhir (yang memuat transformasi scaler jika dilipat)."""
+    layers = _weighted_layers(model)
+    (first_index, first), (last_index, _) = layers[0], layers[-1]
+    return {f"{prefix}_kernel" for prefix in _kernel_prefixes(model, first_index, first)} | {f"layer{last_index}_kernel"}
+
+
+def reduce_precision(model, precision):
+    """
+    Mengonversi kernel ke float16 atau int8 simetris, masing-masing dengan satu skala per kolom output.
+    Skala juga dipakai untuk float16 agar bobot kecil tidak jatuh ke rentang subnormal, yang
+    konversinya ke float32 jauh lebih lambat.
+    Bias dan kernel yang memuat scaler tetap float32: setelah dilipat, baris input berskala sangat
+    berbeda dan offset scaler saling meniadakan di bias, sehingga pembulatan di sana membesar di output.
+    """
+    if precision == "float32":
+        return model
+    if precision not in ("float16", "int8"):
+        raise ValueError(f"Presisi '{precision}' tidak dikenal.")
+    keep = _scaler_kernels(model)
+    weights = {}
+    for key, value in model.weights.items():
+        if not key.endswith("_kernel") or key in keep:
+            weights[key] = value
+            continue
+        scale = np.abs(value).max(axis=0)
+        scale[scale == 0] = 1.0
+        if precision == "float16":
+            weights[key] = (value / scale).astype(np.float16)
+        else:
+            scale = scale / 127.0
+            weights[key] = np.clip(np.round(value / scale), -127, 127).astype(np.int8)
+        weights[key + QUANT_SCALE_SUFFIX] = scale.astype(np.float32)
+    return NumpyLSTMModel(model.layers, weights, model.input_shape,
+                          scalers_folded=model.scalers_folded, precision=precision)
+
+
+def build_variants(model, scalers):
+    """{nama varian: model}; nama mengikuti `MODEL_VARIANTS` di `src.predictions`."""
+    folded = fold_scalers(model, scalers['X'], scalers['y'])
+    return {"folded": folded, "float16": reduce_precision(folded, "float16"), "int8": reduce_precision(folded, "int8")}
+
+
+def serving_nbytes(variant):
+    """Memori bobot varian saat dimuat untuk serving (`from_npz`: bobot simpanan dilepas setelah dekuantisasi)."""
+    return NumpyLSTMModel(variant.layers, variant.weights, variant.input_shape, scalers_folded=variant.scalers_folded,
+                          precision=variant.precision, keep_storage=False).nbytes
+
+
+def _median_ms(fn, repeat):
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def evaluate_variant(reference, scalers, variant, samples=EVAL_SAMPLES, repeat=TIMING_REPEAT, seed=0):
+    """
+    Membandingkan varian dengan model asli + scaler pada jendela acak di rentang [0, 1] skala scaler.
+    Latensi diukur per langkah forecast untuk satu skenario: untuk model asli termasuk
+    `FeatureSchema.transform` satu baris baru dan `scaler_y.inverse_transform` hasilnya.
+    """
+    scaler_X, scaler_y = scalers['X'], scalers['y']
+    rng = np.random.default_rng(seed)
+    x_scaled = rng.random((samples,) + tuple(reference.input_shape), dtype=np.float32)
+    x_raw = scaler_X.inverse_transform(x_scaled.reshape(-1, x_scaled.shape[-1])).reshape(x_scaled.shape)
+
+    expected = scaler_y.inverse_transform(reference.predict(x_scaled))
+    actual = variant.predict(x_raw) if variant.scalers_folded else scaler_y.inverse_transform(variant.predict(x_scaled))
+    abs_error = np.abs(actual - expected)
+
+    one_scaled, one_raw = x_scaled[:1], x_raw[:1]
+    new_row = x_raw[0, -1:]
+    schema = FeatureSchema.from_scaler(scaler_X, [])
+
+    def reference_step():
+        scaler_y.inverse_transform(reference.predict(one_scaled))
+        schema.transform(scaler_X, new_row)
+
+    return {
+        'max_abs_error': float(abs_error.max()),
+        'max_error_pct': float((abs_error / np.abs(expected)).max() * 100),
+        'reference_step_ms': _median_ms(reference_step, repeat),
+        'step_ms': _median_ms(lambda: variant.predict(one_raw if variant.scalers_folded else one_scaled), repeat),
+        'reference_storage_kb': reference.storage_nbytes / 1024,
+        'storage_kb': variant.storage_nbytes / 1024,
+        'reference_memory_kb': reference.nbytes / 1024,
+        'memory_kb': serving_nbytes(variant) / 1024,
+    }
+
+
+def package_commodity(commodity, details, max_error_pct=DEFAULT_MAX_ERROR_PCT):
+    """Membuat dan mengevaluasi semua varian satu komoditas. Mengembalikan {varian: laporan} atau None."""
+    npz_path = details.get('npz_path')
+    if not npz_path or not os.path.exists(npz_path):
+        print(f"[SKIP] {commodity}: '{npz_path}' tidak ditemukan, jalankan `python -m src.export_numpy_models` dulu.")
+        return None
+
+    reference = NumpyLSTMModel.from_npz(npz_path)
+    scalers = load_scalers(details)
+    report = {}
+    for name, variant in build_variants(reference, scalers).items():
+        result = evaluate_variant(reference, scalers, variant)
+        tolerance = FOLD_MAX_ERROR_PCT if name == "folded" else max_error_pct
+        result['written'] = result['max_error_pct'] <= tolerance
+        if result['written']:
+            variant.save_npz(variant_path(details, name))
+        status = "OK" if result['written'] else "GAGAL"
+        print(f"[{status}] {commodity} {name:<8} selisih maks {result['max_abs_error']:9.3f} ({result['max_error_pct']:.4f}%)"
+              f"  langkah {result['reference_step_ms']:.2f}ms -> {result['step_ms']:.2f}ms"
+              f"  disk {result['reference_storage_kb']:.0f}KB -> {result['storage_kb']:.0f}KB"
+              f"  memori {result['reference_memory_kb']:.0f}KB -> {result['memory_kb']:.0f}KB"
+              + ("" if result['written'] else f"  (melebihi toleransi {tolerance}%, tidak ditulis)"))
+        report[name] = result
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commodity", action="append", choices=list(COMMODITY_CONFIG),
+                        help="Komoditas yang diproses (default: semua).")
+    parser.add_argument("--max-error-pct", type=float, default=DEFAULT_MAX_ERROR_PCT,
+                        help="Selisih harga maksimum (%%) varian float16/int8 terhadap model asli.")
+    parser.add_argument("--report", default=None, help="Simpan laporan akurasi vs kecepatan sebagai JSON.")
+    args = parser.parse_args(argv)
+
+    reports = {
+        commodity: package_commodity(commodity, COMMODITY_CONFIG[commodity], max_error_pct=args.max_error_pct)
+        for commodity in (args.commodity or COMMODITY_CONFIG)
+    }
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'variants': list(MODEL_VARIANTS), 'results': reports}, f, indent=2)
+        print(f"Laporan disimpan di {args.report}")
+    failed = any(not result['written'] for report in reports.values() if report for result in report.values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
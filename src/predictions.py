@@ -1,67 +1,414 @@
 import streamlit as st
 import joblib
-from tensorflow.keras.models import load_model
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
 import numpy as np
 import pandas as pd
 
-from .feature_engineering import create_date_features, add_lag_and_rolling_features
+from .feature_engineering import FeatureSchema, BatchedFeatureState
+from .forecast_cache import ForecastCache
+from .instrumentation import NULL_TRACE
+from .numpy_inference import NumpyLSTMModel
 
-@st.cache_resource(show_spinner=False)
-def load_all_models_and_scalers(config):
-    models = {}
-    scalers = {}
-    for commodity, details in config.items():
+# Jumlah lintasan dan kuantil (batas bawah, median, batas atas) untuk interval prediksi Monte Carlo
+MC_SAMPLES = 200
+INTERVAL_QUANTILES = (0.05, 0.5, 0.95)
+# Varian hasil `python -m src.package_models` yang dipakai jika file-nya ada ("" = tidak memakai varian)
+MODEL_VARIANTS = ("folded", "float16", "int8")
+MODEL_VARIANT = os.environ.get("MODEL_VARIANT", "folded")
+
+
+class TimedPredictor(ABC):
+    """
+    Dasar pembungkus inferensi: menyediakan `predict` yang kompatibel dengan Keras
+    dan mencatat latensi setiap panggilan.
+    """
+
+    # True jika input/output model sudah dalam skala asli (scaler dilipat ke bobot)
+    scalers_folded = False
+
+    def __init__(self, input_shape, latency_history=256):
+        self.input_shape = tuple(input_shape)
+        self.latencies = deque(maxlen=latency_history)
+
+    @abstractmethod
+    def _run(self, model_input):
+        """Menjalankan model pada `model_input` (batch x jendela x fitur) dan mengembalikan output NumPy."""
+
+    @property
+    @abstractmethod
+    def nbytes(self):
+        """Perkiraan memori bobot model (byte)."""
+
+    def warmup(self):
+        """Menjalankan satu prediksi dummy agar model siap sebelum dipakai user."""
+        self._run(np.zeros((1,) + self.input_shape, dtype=np.float32))
+        return self
+
+    def predict(self, model_input, verbose=0):
+        start = time.perf_counter()
+        output = self._run(model_input)
+        self.latencies.append(time.perf_counter() - start)
+        return output
+
+    def latency_summary(self):
+        """Ringkasan latensi per langkah prediksi (dalam milidetik)."""
+        if not self.latencies:
+            return {'calls': 0, 'mean_ms': None, 'p50_ms': None, 'max_ms': None}
+        latencies_ms = np.array(self.latencies) * 1000
+        return {
+            'calls': len(latencies_ms),
+            'mean_ms': float(latencies_ms.mean()),
+            'p50_ms': float(np.median(latencies_ms)),
+            'max_ms': float(latencies_ms.max()),
+        }
+
+class CompiledPredictor(TimedPredictor):
+    """
+    Pembungkus inferensi untuk model Keras yang di-trace sekali dengan input signature tetap.
+
+    `model.predict` menyiapkan data adapter dan callback di setiap panggilan, yang jauh lebih
+    mahal daripada komputasi LSTM untuk batch berukuran 1. Pembungkus ini memanggil
+    `model(x, training=False)` lewat `tf.function` yang sudah di-warm-up saat load.
+    """
+
+    def __init__(self, model, latency_history=256):
+        import tensorflow as tf
+
+        super().__init__(model.input_shape[1:], latency_history)
+        self.model = model
+        self._tf = tf
+        self._forward = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec(shape=(None,) + self.input_shape, dtype=tf.float32)],
+        )
+
+    def _run(self, model_input):
+        return self._forward(self._tf.convert_to_tensor(model_input, dtype=self._tf.float32)).numpy()
+
+    @property
+    def nbytes(self):
+        return int(sum(np.prod(w.shape) * w.dtype.itemsize for w in self.model.get_weights()))
+
+class NumpyPredictor(TimedPredictor):
+    """Pembungkus untuk `NumpyLSTMModel`, sehingga forecasting bisa berjalan tanpa TensorFlow."""
+
+    def __init__(self, model, latency_history=256):
+        super().__init__(model.input_shape, latency_history)
+        self.model = model
+
+    def _run(self, model_input):
+        return self.model.predict(model_input)
+
+    @property
+    def scalers_folded(self):
+        return self.model.scalers_folded
+
+    @property
+    def nbytes(self):
+        return self.model.nbytes
+
+def variant_path(details, variant):
+    """Path file varian model hasil `src.package_models`, misal `models/Beras_stacked_model.int8.npz`."""
+    root, _ = os.path.splitext(details['npz_path'])
+    return f"{root}.{variant}.npz"
+
+def resolve_model_path(details, variant=None):
+    """
+    Path file model yang dipakai untuk serving: varian `MODEL_VARIANT` jika sudah dibuat,
+    lalu `.npz` jika sudah diekspor, jika tidak `.h5`.
+    """
+    variant = MODEL_VARIANT if variant is None else variant
+    npz_path = details.get('npz_path')
+    if variant and npz_path and os.path.exists(variant_path(details, variant)):
+        return variant_path(details, variant)
+    if npz_path and os.path.exists(npz_path):
+        return npz_path
+    return details['model_path']
+
+def load_predictor(details, variant=None):
+    """
+    Memuat model untuk serving: engine NumPy (.npz, atau varian hasil packaging) jika sudah diekspor,
+    jika tidak, model Keras (.h5) yang di-compile dengan `CompiledPredictor`.
+    """
+    model_path = resolve_model_path(details, variant)
+    if model_path.endswith('.npz'):
+        return NumpyPredictor(NumpyLSTMModel.from_npz(model_path)).warmup()
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(model_path)
+    from tensorflow.keras.models import load_model
+    return CompiledPredictor(load_model(model_path)).warmup()
+
+def load_scalers(details):
+    return {
+        'X': joblib.load(details['scaler_x_path']),
+        'y': joblib.load(details['scaler_y_path'])
+    }
+
+class ModelRegistry:
+    """
+    Registry model dan scaler yang dimuat secara lazy per komoditas.
+
+    Model sebuah komoditas baru dimuat saat pertama kali dipakai, dan sisanya dapat
+    di-warm-up di background thread setelah UI siap. Waktu muat, memori bobot, dan latensi
+    `predict` setiap model dicatat di `stats()`.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._entries = {}
+        self._stats = {}
+        self._locks = {commodity: threading.Lock() for commodity in config}
+        self._prewarm_thread = None
+
+    def is_loaded(self, commodity):
+        return commodity in self._entries
+
+    def get(self, commodity):
+        """Mengembalikan (model, scalers) untuk komoditas, memuatnya terlebih dahulu jika perlu."""
+        with self._locks[commodity]:
+            if commodity not in self._entries:
+                self._entries[commodity] = self._load(commodity)
+        return self._entries[commodity]
+
+    def _load(self, commodity):
+        details = self.config[commodity]
+        start = time.perf_counter()
         try:
-            models[commodity] = load_model(details['model_path'])
-            scalers[commodity] = {
-                'X': joblib.load(details['scaler_x_path']),
-                'y': joblib.load(details['scaler_y_path'])
-            }
-        except FileNotFoundError as e:
-            st.error(f"Gagal memuat file untuk {commodity}: {e}.")
-            return None, None
-    return models, scalers
-
-def forecast_iteratively(model, scalers, initial_sequence, feature_cols, target_cols, future_steps=30):
+            model = load_predictor(details)
+            scalers = load_scalers(details)
+        except Exception as e:
+            self._stats[commodity] = {'loaded': False, 'error': str(e)}
+            raise
+        self._stats[commodity] = {
+            'loaded': True,
+            'backend': type(model).__name__,
+            'load_seconds': time.perf_counter() - start,
+            'memory_mb': model.nbytes / 1024 ** 2,
+        }
+        return model, scalers
+
+    def prewarm(self, commodities=None):
+        """Memuat komoditas yang belum dimuat di background thread (daemon)."""
+        if self._prewarm_thread is not None and self._prewarm_thread.is_alive():
+            return self._prewarm_thread
+
+        pending = [c for c in (commodities or self.config) if not self.is_loaded(c)]
+
+        def _warm():
+            for commodity in pending:
+                try:
+                    self.get(commodity)
+                except Exception:
+                    # Error sudah dicatat di stats; akan dilaporkan ke user saat komoditas dipakai
+                    pass
+
+        self._prewarm_thread = threading.Thread(target=_warm, name="model-prewarm", daemon=True)
+        self._prewarm_thread.start()
+        return self._prewarm_thread
+
+    def stats(self):
+        """Statistik muat per komoditas, ditambah ringkasan latensi `predict` model yang sudah dimuat."""
+        stats = {commodity: dict(stat) for commodity, stat in self._stats.items()}
+        for commodity, (model, _) in list(self._entries.items()):
+            if hasattr(model, 'latency_summary'):
+                stats[commodity].update({f'predict_{key}': value for key, value in model.latency_summary().items()})
+        return stats
+
+@st.cache_resource(show_spinner=False)
+def get_model_registry(config):
+    return ModelRegistry(config)
+
+@st.cache_resource(show_spinner=False)
+def load_feature_schema(details):
+    """Skema fitur (urutan kolom) sesuai `scaler_X` komoditas, tanpa perlu memuat modelnya."""
+    return FeatureSchema.from_scaler(joblib.load(details['scaler_x_path']), details['targets'])
+
+@st.cache_resource(show_spinner=False)
+def get_forecast_cache():
+    return ForecastCache(persist_dir=os.environ.get('FORECAST_CACHE_DIR') or None)
+
+def iter_forecast_batch(model, scalers, initial_sequences, feature_cols, target_cols, future_steps=30, trace=NULL_TRACE, perturb=None):
     """
-    Melakukan forecasting iteratif untuk beberapa hari ke depan (misal: 30 hari).
+    Generator forecasting iteratif untuk beberapa sequence awal (skenario) sekaligus dengan model yang sama.
+    Setiap langkah hanya memanggil model satu kali untuk seluruh batch dan memperbarui fitur
+    semua skenario lewat `BatchedFeatureState`, lalu langsung menghasilkan harga langkah tersebut
+    (skenario x target). Berhenti mengiterasi (atau `close()`) membatalkan langkah sisanya.
+    `perturb(step, prices)` opsional mengubah harga hasil prediksi sebelum dimasukkan ke langkah berikutnya.
+    Jika `trace` aktif, waktu scaler, model, dan update fitur di setiap langkah ikut dicatat.
     """
     scaler_X = scalers['X']
     scaler_y = scalers['y']
-    
-    current_sequence_df = initial_sequence.copy()
-    all_predictions = []
+
+    # Susun fitur persis seperti urutan saat scaler_X di-fit
+    schema = FeatureSchema.from_scaler(scaler_X, target_cols)
+    feature_cols = schema.align(feature_cols)
+
+    # Model dengan scaler terlipat menerima fitur mentah dan langsung mengeluarkan harga
+    folded = getattr(model, 'scalers_folded', False)
+    row_transform = None if folded else (lambda rows: schema.transform(scaler_X, rows))
+    scaler_x_seconds = [0.0]
+    if trace.enabled and not folded:
+        def row_transform(rows):
+            start = time.perf_counter()
+            scaled = schema.transform(scaler_X, rows)
+            scaler_x_seconds[0] += time.perf_counter() - start
+            return scaled
+
+    # MinMaxScaler bekerja per baris, jadi cukup men-scale satu baris baru per skenario di setiap langkah
+    state = BatchedFeatureState(initial_sequences, feature_cols, target_cols, row_transform=row_transform)
 
     for i in range(future_steps):
-        # 1. Siapkan input untuk prediksi saat ini
-        features_to_scale = current_sequence_df[feature_cols].values
-        scaled_features = scaler_X.transform(features_to_scale)
-        model_input = scaled_features.reshape(1, len(current_sequence_df), len(feature_cols))
+        step_start = time.perf_counter()
+
+        # 1. Siapkan input untuk prediksi saat ini (semua skenario dalam satu batch)
+        model_input = state.window()
 
         # 2. Prediksi 1 langkah ke depan
         predicted_scaled = model.predict(model_input)
-        predicted_prices = scaler_y.inverse_transform(predicted_scaled)
-        all_predictions.append(predicted_prices[0])
-
-        # --- 3. Siapkan sekuens untuk iterasi berikutnya ---
-        # Tentukan tanggal untuk prediksi ini
-        next_date = current_sequence_df.index[-1] + pd.Timedelta(days=1)
-        
-        # Buat baris baru dengan harga yang baru saja diprediksi
-        new_row_prices = pd.DataFrame(predicted_prices, index=[next_date], columns=target_cols)
-        
-        # Gabungkan dengan histori harga untuk re-kalkulasi fitur
-        price_history_updated = pd.concat([current_sequence_df[target_cols], new_row_prices])
-        
-        # Buat ulang fitur tanggal dan lag/rolling untuk baris baru ini
-        date_features = create_date_features(next_date, next_date)
-        lag_roll_features = add_lag_and_rolling_features(price_history_updated, target_cols).tail(1)
-        
-        # Gabungkan semua menjadi baris fitur yang lengkap
-        new_full_row = pd.concat([new_row_prices, date_features, lag_roll_features], axis=1)
-        
-        # Tambahkan baris baru ke sekuens dan hapus baris terlama
-        current_sequence_df = pd.concat([current_sequence_df, new_full_row])
-        current_sequence_df = current_sequence_df.iloc[1:]
-
-    return np.array(all_predictions)
\ No newline at end of file
+        model_done = time.perf_counter()
+        if folded:
+            predicted_prices = np.asarray(predicted_scaled, dtype=np.float64)
+        else:
+            predicted_prices = scaler_y.inverse_transform(predicted_scaled)
+        if perturb is not None:
+            predicted_prices = perturb(i, predicted_prices)
+        inverse_done = time.perf_counter()
+
+        # 3. Geser jendela: hitung baris fitur untuk hari berikutnya
+        if trace.enabled:
+            scaler_x_seconds[0] = 0.0
+        state.push(predicted_prices)
+
+        if trace.enabled:
+            push_seconds = time.perf_counter() - inverse_done
+            trace.record_step(
+                'forecast',
+                step=i + 1,
+                batch_size=state.batch_size,
+                model_ms=(model_done - step_start) * 1000,
+                scaler_ms=(inverse_done - model_done + scaler_x_seconds[0]) * 1000,
+                features_ms=(push_seconds - scaler_x_seconds[0]) * 1000,
+            )
+
+        yield predicted_prices
+
+
+def forecast_batch(model, scalers, initial_sequences, feature_cols, target_cols, future_steps=30, trace=NULL_TRACE, perturb=None):
+    """
+    Menjalankan `iter_forecast_batch` sampai selesai. Hasil berbentuk (skenario x langkah x target).
+    """
+    steps = iter_forecast_batch(model, scalers, initial_sequences, feature_cols, target_cols,
+                                future_steps=future_steps, trace=trace, perturb=perturb)
+    all_predictions = np.empty((len(initial_sequences), future_steps, len(target_cols)))
+    for i, predicted_prices in enumerate(steps):
+        all_predictions[:, i] = predicted_prices
+    return all_predictions
+
+
+def iter_forecast(model, scalers, initial_sequence, feature_cols, target_cols, future_steps=30, trace=NULL_TRACE):
+    """Generator `forecast_iteratively`: menghasilkan harga (target,) setiap hari segera setelah dihitung."""
+    for predicted_prices in iter_forecast_batch(model, scalers, [initial_sequence], feature_cols, target_cols,
+                                                future_steps=future_steps, trace=trace):
+        yield predicted_prices[0]
+
+
+def forecast_iteratively(model, scalers, initial_sequence, feature_cols, target_cols, future_steps=30, trace=NULL_TRACE):
+    """
+    Melakukan forecasting iteratif untuk beberapa hari ke depan (misal: 30 hari).
+    Merupakan `forecast_batch` dengan satu skenario; hasil berbentuk (langkah x target).
+    """
+    return forecast_batch(model, scalers, [initial_sequence], feature_cols, target_cols,
+                          future_steps=future_steps, trace=trace)[0]
+
+
+def price_change_pool(sequence, target_cols):
+    """
+    Pool cadangan untuk interval prediksi jika belum ada residual backtest: perubahan harga harian relatif
+    pada jendela input, dipusatkan ke nol agar tidak menambah drift. Pool ini mengukur volatilitas harga,
+    bukan error model. Setiap baris berisi perubahan semua target di hari yang sama.
+    """
+    changes = sequence[target_cols].pct_change().dropna().to_numpy(dtype=np.float64)
+    return changes - changes.mean(axis=0)
+
+
+def forecast_intervals(model, scalers, initial_sequence, feature_cols, target_cols, future_steps=30,
+                       n_samples=MC_SAMPLES, quantiles=INTERVAL_QUANTILES, residuals=None, seed=None, trace=NULL_TRACE):
+    """
+    Interval prediksi Monte Carlo lewat residual bootstrap.
+
+    `n_samples` lintasan dijalankan sebagai satu batch di `forecast_batch`; di setiap langkah harga
+    prediksi setiap lintasan dikalikan (1 + residual) yang diambil acak dari `residuals`, lalu dipakai
+    sebagai input langkah berikutnya. `residuals` sebaiknya berupa residual out-of-sample 1 hari dari
+    `python -m src.backtest` (lihat `load_residuals`); tanpa itu dipakai `price_change_pool` dari jendela input.
+    Hasil berbentuk (kuantil x langkah x target).
+    """
+    pool = price_change_pool(initial_sequence, target_cols) if residuals is None else np.asarray(residuals, dtype=np.float64)
+    pool = pool.reshape(-1, len(target_cols))
+    if len(pool) == 0:
+        raise ValueError("Pool residual kosong, interval prediksi tidak dapat dihitung.")
+    rng = np.random.default_rng(seed)
+
+    def perturb(step, prices):
+        # Satu baris residual per lintasan agar korelasi antar sub-komoditas tetap terjaga
+        return prices * (1.0 + pool[rng.integers(len(pool), size=len(prices))])
+
+    paths = forecast_batch(model, scalers, [initial_sequence] * n_samples, feature_cols, target_cols,
+                           future_steps=future_steps, trace=trace, perturb=perturb)
+    return np.quantile(paths, quantiles, axis=0)
+
+
+def forecast_scenarios(model, scalers, scenarios, feature_cols, target_cols, future_steps=30, trace=NULL_TRACE):
+    """
+    Menjalankan beberapa skenario what-if ({nama: sequence awal}) dalam satu batch
+    dan mengembalikan DataFrame tidy: scenario, date, step, komoditas_sub, harga.
+    """
+    names = list(scenarios)
+    sequences = [scenarios[name] for name in names]
+    predictions = forecast_batch(model, scalers, sequences, feature_cols, target_cols,
+                                 future_steps=future_steps, trace=trace)
+
+    frames = []
+    for name, sequence, values in zip(names, sequences, predictions):
+        dates = pd.date_range(start=sequence.index[-1] + pd.Timedelta(days=1), periods=future_steps)
+        frame = pd.DataFrame(values, index=dates, columns=target_cols).rename_axis('date')
+        frame = frame.reset_index().melt(id_vars='date', var_name='komoditas_sub', value_name='harga')
+        frame.insert(0, 'scenario', name)
+        frame.insert(2, 'step', (frame['date'] - dates[0]).dt.days + 1)
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=['scenario', 'date', 'step', 'komoditas_sub', 'harga'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def forecast_commodities(registry, config, jobs, future_steps=30, trace=NULL_TRACE):
+    """
+    Forecast banyak komoditas dan skenario sekaligus.
+    `jobs` berupa {komoditas: {nama skenario: (sequence awal, feature_cols)}}; setiap komoditas
+    diproses sebagai satu batch pada modelnya. Hasilnya DataFrame tidy dengan kolom `komoditas`.
+    """
+    frames = []
+    for commodity, scenarios in jobs.items():
+        model, scalers = registry.get(commodity)
+        targets = config[commodity]['targets']
+
+        # Skenario dalam satu batch harus memakai susunan fitur yang sama
+        by_columns = {}
+        for name, (sequence, feature_cols) in scenarios.items():
+            by_columns.setdefault(tuple(feature_cols), {})[name] = sequence
+
+        for feature_cols, grouped in by_columns.items():
+            with trace.stage(f"forecast:{commodity}", rows=len(grouped)):
+                frame = forecast_scenarios(model, scalers, grouped, list(feature_cols), targets,
+                                           future_steps=future_steps, trace=trace)
+            frame.insert(0, 'komoditas', commodity)
+            frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=['komoditas', 'scenario', 'date', 'step', 'komoditas_sub', 'harga'])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+API_DATE_FORMAT = '%d/%m/%Y'
+# Data beberapa hari terakhir masih bisa diperbarui oleh BI, jadi tidak dianggap final
+REFRESH_RECENT_DAYS = 2
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def refresh_window_start(today=None):
+    """Tanggal pertama jendela refresh: tanggal sejak ini tidak pernah ditandai tersimpan dan selalu diambil ulang."""
+    return (today or date.today()) - timedelta(days=REFRESH_RECENT_DAYS - 1)
+
+
+class PriceStore:
+    """
+    Penyimpanan lokal (SQLite) untuk data harga dari API Bank Indonesia.
+
+    Harga disimpan per (sub-komoditas, tanggal), dan tanggal yang sudah diambil dan final
+    dicatat di tabel `coverage`, sehingga permintaan rentang tanggal baru hanya perlu
+    mengambil celah tanggal yang belum ada di store.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS prices (
+                    name TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    harga TEXT,
+                    PRIMARY KEY (name, date)
+                );
+                CREATE TABLE IF NOT EXISTS commodities (
+                    name TEXT PRIMARY KEY,
+                    row_order INTEGER NOT NULL,
+                    attributes TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS coverage (
+                    date TEXT PRIMARY KEY
+                );
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def missing_ranges(self, start_date, end_date):
+        """Mengembalikan daftar (start, end) tanggal yang belum tersedia di store."""
+        start, end = _to_date(start_date), _to_date(end_date)
+        with self._connect() as conn:
+            covered = {row[0] for row in conn.execute(
+                "SELECT date FROM coverage WHERE date BETWEEN ? AND ?", (start.isoformat(), end.isoformat())
+            )}
+
+        ranges = []
+        current = start
+        while current <= end:
+            if current.isoformat() not in covered:
+                gap_start = current
+                while current + timedelta(days=1) <= end and (current + timedelta(days=1)).isoformat() not in covered:
+                    current += timedelta(days=1)
+                ranges.append((gap_start, current))
+            current += timedelta(days=1)
+        return ranges
+
+    def has_prices(self, start_date, end_date):
+        """True jika store berisi minimal satu harga di rentang tanggal."""
+        start, end = _to_date(start_date), _to_date(end_date)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM prices WHERE date BETWEEN ? AND ? LIMIT 1", (start.isoformat(), end.isoformat())
+            ).fetchone()
+        return row is not None
+
+    def write_records(self, records, start_date, end_date, today=None):
+        """
+        Menyimpan baris data mentah API (format lebar: satu kolom per tanggal dd/mm/yyyy)
+        dan menandai tanggal yang sudah final sebagai tersimpan.
+
+        Tanggal dianggap final jika berisi minimal satu harga, atau jika kosong tetapi sudah ada harga
+        untuk tanggal sesudahnya, di respons ini atau di store (hari libur/tanpa laporan). Tanggal kosong
+        tanpa data sesudahnya (respons kosong atau belum dipublikasikan) tetap diambil ulang nanti.
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        today = today or date.today()
+
+        price_rows, commodity_rows = [], []
+        observed = set()
+        for order, record in enumerate(records):
+            name = record.get('name')
+            if name is None:
+                continue
+            attributes = {}
+            for key, value in record.items():
+                if isinstance(key, str) and '/' in key:
+                    iso_date = datetime.strptime(key, API_DATE_FORMAT).date().isoformat()
+                    price_rows.append((name, iso_date, None if value is None else str(value)))
+                    if value is not None and str(value).strip() not in ('', '-'):
+                        observed.add(iso_date)
+                else:
+                    attributes[key] = value
+            commodity_rows.append((name, order, json.dumps(attributes)))
+
+        final_until = today - timedelta(days=REFRESH_RECENT_DAYS)
+        with self._connect() as conn:
+            # Harga sesudah rentang ini yang sudah tersimpan (misal dari potongan bulan berikutnya) juga menandakan final
+            stored_latest = conn.execute(
+                "SELECT MAX(date) FROM prices WHERE harga IS NOT NULL AND TRIM(harga) NOT IN ('', '-')"
+            ).fetchone()[0]
+            last_observed = max(observed | ({stored_latest} if stored_latest else set()), default=None)
+            covered_dates = []
+            current = start
+            while current <= min(end, final_until):
+                iso_date = current.isoformat()
+                if iso_date in observed or (last_observed is not None and iso_date < last_observed):
+                    covered_dates.append((iso_date,))
+                current += timedelta(days=1)
+
+            conn.executemany("INSERT OR REPLACE INTO prices (name, date, harga) VALUES (?, ?, ?)", price_rows)
+            conn.executemany(
+                "INSERT INTO commodities (name, row_order, attributes) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET attributes = excluded.attributes",
+                commodity_rows,
+            )
+            conn.executemany("INSERT OR IGNORE INTO coverage (date) VALUES (?)", covered_dates)
+
+    def read_wide(self, start_date, end_date):
+        """
+        Membaca data di rentang tanggal dalam format lebar yang sama dengan respons API,
+        sehingga bisa langsung diproses oleh `reshape_and_clean_data`.
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        with self._connect() as conn:
+            df_prices = pd.read_sql_query(
+                "SELECT name, date, harga FROM prices WHERE date BETWEEN ? AND ? ORDER BY date",
+                conn, params=(start.isoformat(), end.isoformat()),
+            )
+            df_commodities = pd.read_sql_query(
+                "SELECT name, row_order, attributes FROM commodities ORDER BY row_order", conn
+            )
+
+        if df_prices.empty:
+            return pd.DataFrame()
+
+        df_prices['date'] = pd.to_datetime(df_prices['date']).dt.strftime(API_DATE_FORMAT)
+        df_wide = df_prices.pivot(index='name', columns='date', values='harga')
+        # Kembalikan urutan kolom tanggal secara kronologis (pivot mengurutkan secara leksikal)
+        date_order = df_prices['date'].drop_duplicates().tolist()
+        df_wide = df_wide[date_order]
+
+        df_commodities = df_commodities[df_commodities['name'].isin(df_wide.index)]
+        df_attributes = pd.DataFrame(
+            [json.loads(attrs) for attrs in df_commodities['attributes']],
+            index=df_commodities['name'].values,
+        )
+        df_wide = df_attributes.join(df_wide, how='left')
+        return df_wide.reset_index(drop=True)
@@ -0,0 +1,145 @@
+"""
+Menghitung forecast semua komoditas untuk banyak wilayah (REGION_CONFIG) sekaligus secara headless.
+
+Data setiap wilayah diambil paralel ke store per wilayah, lalu wilayah dibagi ke beberapa proses
+(satu per core CPU secara default). Di setiap proses, preparation dijalankan per wilayah dan forecast
+satu komoditas dijalankan sebagai satu batch model untuk semua wilayahnya.
+Jalankan dari root repository:
+
+    python -m src.regional_forecast [--region "Jawa Barat"] [--end-date YYYY-MM-DD] [--days 120] [--workers 4] [--output hasil.csv]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import COMMODITY_CONFIG, REGION_CONFIG
+from .data_handler import fetch_regions_data, format_failures, reshape_and_clean_data
+from .feature_engineering import prepare_dense_window
+from .predictions import ModelRegistry, forecast_commodities, load_feature_schema
+
+DEFAULT_HISTORY_DAYS = 120
+FUTURE_STEPS = 30
+
+_registry = None
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _init_worker():
+    """Setiap proses memuat model sendiri (lazy) dan tidak perlu mengirim bobot antar proses."""
+    global _registry
+    _registry = ModelRegistry(COMMODITY_CONFIG)
+
+
+def prepare_regions(raw_by_region, commodities):
+    """
+    Menyiapkan jendela input setiap (komoditas, wilayah).
+    Mengembalikan (jobs untuk `forecast_commodities`, {(komoditas, wilayah): pesan error}).
+    """
+    jobs, errors = {}, {}
+    for commodity in commodities:
+        details = COMMODITY_CONFIG[commodity]
+        schema = load_feature_schema(details)
+        for region, df_raw in raw_by_region.items():
+            df_long = reshape_and_clean_data(df_raw, details)
+            if df_long.empty:
+                errors[(commodity, region)] = "Data sub-komoditas target tidak tersedia."
+                continue
+            window, error_msg = prepare_dense_window(df_long, details, schema=schema)
+            if error_msg:
+                errors[(commodity, region)] = error_msg
+                continue
+            jobs.setdefault(commodity, {})[region] = (window.to_frame(), window.schema.feature_cols)
+    return jobs, errors
+
+
+def forecast_region_chunk(raw_by_region, commodities, future_steps=FUTURE_STEPS, registry=None):
+    """Preparation + forecast untuk sekelompok wilayah; wilayah menjadi skenario dalam satu batch per komoditas."""
+    registry = registry or _registry
+    jobs, errors = prepare_regions(raw_by_region, commodities)
+    forecasts = []
+    for commodity, regions in jobs.items():
+        try:
+            frame = forecast_commodities(registry, COMMODITY_CONFIG, {commodity: regions}, future_steps=future_steps)
+        except Exception as e:
+            errors.update({(commodity, region): str(e) for region in regions})
+            continue
+        forecasts.append(frame.rename(columns={'scenario': 'wilayah'}))
+    return forecasts, errors
+
+
+def forecast_regions(raw_by_region, commodities, future_steps=FUTURE_STEPS, workers=None):
+    """
+    Membagi wilayah ke `workers` proses dan menggabungkan hasilnya menjadi DataFrame tidy:
+    komoditas, wilayah, date, step, komoditas_sub, harga. Dengan satu worker semuanya berjalan di proses ini.
+    """
+    regions = list(raw_by_region)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(regions)))
+    chunks = [
+        {region: raw_by_region[region] for region in part}
+        for part in np.array_split(np.array(regions, dtype=object), workers) if len(part)
+    ]
+
+    if workers == 1:
+        results = [forecast_region_chunk(chunks[0], commodities, future_steps, registry=ModelRegistry(COMMODITY_CONFIG))]
+    else:
+        # 'spawn' agar worker tidak mewarisi state thread/TensorFlow dari proses induk
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn'), initializer=_init_worker) as executor:
+            results = list(executor.map(forecast_region_chunk, chunks, [commodities] * len(chunks), [future_steps] * len(chunks)))
+
+    forecasts = [frame for frames, _ in results for frame in frames]
+    errors = {key: message for _, chunk_errors in results for key, message in chunk_errors.items()}
+    if not forecasts:
+        return pd.DataFrame(columns=['komoditas', 'wilayah', 'date', 'step', 'komoditas_sub', 'harga']), errors
+    return pd.concat(forecasts, ignore_index=True), errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--region", action="append", choices=list(REGION_CONFIG), help="Wilayah yang diproses (default: semua).")
+    parser.add_argument("--commodity", action="append", choices=list(COMMODITY_CONFIG), help="Komoditas yang diproses (default: semua).")
+    parser.add_argument("--end-date", type=_parse_date, default=date.today(), help="Tanggal akhir data historis (default: hari ini).")
+    parser.add_argument("--days", type=int, default=DEFAULT_HISTORY_DAYS, help="Panjang data historis yang dipakai (hari).")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses forecast (default: jumlah core CPU).")
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai CSV.")
+    args = parser.parse_args(argv)
+
+    regions = args.region or list(REGION_CONFIG)
+    start_date = args.end_date - timedelta(days=args.days)
+    raw_by_region, fetch_failures = fetch_regions_data(regions, start_date.strftime('%Y-%m-%d'), args.end_date.strftime('%Y-%m-%d'))
+
+    # Wilayah dengan potongan data yang gagal diambil tidak diforecast dari data parsial
+    available = {}
+    for region in regions:
+        failures = fetch_failures[region]
+        if failures:
+            print(f"[GAGAL] {region}: data {format_failures(failures)} gagal diambil ({failures[0][2]}).", file=sys.stderr)
+        elif raw_by_region[region].empty:
+            print(f"[GAGAL] {region}: tidak ada data dari API Bank Indonesia.", file=sys.stderr)
+        else:
+            available[region] = raw_by_region[region]
+    if not available:
+        return 1
+
+    df_forecast, errors = forecast_regions(available, args.commodity or list(COMMODITY_CONFIG), FUTURE_STEPS, args.workers)
+    for (commodity, region), message in sorted(errors.items()):
+        print(f"[GAGAL] {commodity} / {region}: {message}", file=sys.stderr)
+    for (commodity, region), group in df_forecast.groupby(['komoditas', 'wilayah'], sort=False):
+        print(f"[OK] {commodity} / {region}: {group['komoditas_sub'].nunique()} sub-komoditas x {group['step'].max()} hari")
+
+    if args.output and not df_forecast.empty:
+        df_forecast.to_csv(args.output, index=False)
+        print(f"Hasil disimpan di {args.output}")
+    return 1 if errors or len(available) < len(regions) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+import numpy as np
+import requests
+
+from benchmarks.synthetic import synthetic_records, synthetic_wide_frame
+from src import backtest, data_handler
+from src.backtest import error_report, one_step_residuals, walk_forward_backtest, walk_forward_forecasts
+from src.config import COMMODITY_CONFIG, DEFAULT_REGION
+from src.data_handler import reshape_and_clean_data
+from src.forecast_artifacts import load_residuals, write_residuals
+from src.predictions import load_feature_schema
+
+
+def test_one_step_residuals_use_only_fully_observed_origins():
+    predictions = np.array([[[100.0, 200.0]], [[100.0, 200.0]], [[100.0, 200.0]]])
+    targets = np.array([[[110.0, 190.0]], [[np.nan, 210.0]], [[90.0, 230.0]]])
+
+    residuals = one_step_residuals(predictions, targets)
+
+    np.testing.assert_allclose(residuals, [[0.1, -0.1], [-0.1, 0.1]])
+
+
+def test_residuals_round_trip_requires_same_model_and_targets(tmp_path):
+    targets = ['Beras Kualitas Medium I', 'Beras Kualitas Super I']
+    residuals = np.array([[0.01, -0.02], [-0.01, 0.02]])
+    write_residuals('Beras', residuals, {'model_hash': 'abc', 'targets': targets}, artifact_dir=str(tmp_path))
+
+    loaded = load_residuals('Beras', 'abc', targets, artifact_dir=str(tmp_path))
+    np.testing.assert_array_equal(loaded['residuals'], residuals)
+    assert load_residuals('Beras', 'model-lain', targets, artifact_dir=str(tmp_path)) is None
+    assert load_residuals('Beras', 'abc', targets[:1], artifact_dir=str(tmp_path)) is None
+
+
+def test_walk_forward_residuals_are_forecast_errors(monkeypatch):
+    details = COMMODITY_CONFIG['Beras']
+    targets_cols = details['targets']
+    df_long = reshape_and_clean_data(synthetic_wide_frame(days=160, missing_rate=0.0, seed=4), details)
+    # Harga dasar per target; aktual bergantian 10% di atas dan di bawahnya, berlawanan arah antar target tetangga
+    base = {name: 10000 * (k + 1) for k, name in enumerate(targets_cols)}
+    day = (df_long['date'] - df_long['date'].min()).dt.days
+    parity = {name: k % 2 for k, name in enumerate(targets_cols)}
+    sign = np.where((day + df_long['komoditas_sub'].map(parity).astype(int)) % 2 == 0, 1, -1)
+    df_long['harga'] = (df_long['komoditas_sub'].map(base).astype(int) * (1 + 0.1 * sign)).round().astype(int)
+
+    def forecast_batch(model, scalers, sequences, feature_cols, target_cols, future_steps=30, trace=None):
+        # Model palsu: selalu memprediksi harga dasar
+        return np.broadcast_to([base[name] for name in target_cols], (len(sequences), future_steps, len(target_cols))).copy()
+
+    monkeypatch.setattr(backtest, "forecast_batch", forecast_batch)
+    schema = load_feature_schema(details)
+    predictions, targets = walk_forward_forecasts(None, None, df_long, details, schema=schema, horizon=3)
+
+    # Aktual 1 hari untuk origin ke-i adalah tanggal origin + 1: tanda residual mengikuti paritas tanggal dan target
+    dates = np.sort(df_long['date'].unique())
+    first_target_day = len(dates) - len(predictions)
+    k = np.arange(len(targets_cols))
+    raw_signs = np.where((np.arange(first_target_day, len(dates))[:, None] + k % 2) % 2 == 0, 1, -1)
+    np.testing.assert_allclose(targets[:, 0], np.array(list(base.values())) * (1 + 0.1 * raw_signs))
+
+    residuals = one_step_residuals(predictions, targets)
+    raw = 0.1 * raw_signs
+    np.testing.assert_allclose(residuals, raw - raw.mean(axis=0), atol=1e-12)
+    # Aktual di atas prediksi (prediksi terlalu rendah) memberi residual positif, dan sebaliknya
+    np.testing.assert_array_equal(np.sign(residuals), raw_signs)
+    np.testing.assert_allclose(residuals[:, ::2], -residuals[:, 1::2], atol=1e-12)
+
+    report = error_report(predictions, targets, targets_cols)
+    assert report.equals(walk_forward_backtest(None, None, df_long, details, schema=schema, horizon=3))
+
+
+def test_main_fails_on_partial_fetch(tmp_path, monkeypatch, capsys):
+    end_date = date.today() - timedelta(days=5)
+    failed_month = (end_date.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+    def request_bi_grid(chunk_start, chunk_end, region=DEFAULT_REGION, retries=True):
+        if chunk_start.startswith(failed_month.strftime('%Y-%m')):
+            raise requests.exceptions.ConnectionError("koneksi terputus")
+        return synthetic_records(chunk_start, chunk_end)
+
+    monkeypatch.setattr(data_handler, "PRICE_STORE_PATH", str(tmp_path / "price_store.sqlite"))
+    monkeypatch.setattr(data_handler, "request_bi_grid", request_bi_grid)
+    output = tmp_path / "hasil.csv"
+
+    exit_code = backtest.main(["--commodity", "Beras", "--end-date", end_date.isoformat(), "--horizon", "3",
+                               "--no-residuals", "--output", str(output)])
+
+    assert exit_code == 1
+    assert f"{failed_month:%Y-%m-%d} s/d" in capsys.readouterr().err
+    assert not output.exists()
@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+import pytest
+import requests
+
+from benchmarks.synthetic import synthetic_records
+from src import batch_forecast, data_handler, forecast_artifacts
+from src.config import DEFAULT_REGION
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_handler, "PRICE_STORE_PATH", str(tmp_path / "price_store.sqlite"))
+    monkeypatch.setattr(forecast_artifacts, "FORECAST_ARTIFACT_DIR", str(tmp_path / "forecasts"))
+    return tmp_path
+
+
+def fake_api(monkeypatch, failed_month=None):
+    def request_bi_grid(chunk_start, chunk_end, region=DEFAULT_REGION, retries=True):
+        if failed_month and chunk_start.startswith(failed_month.strftime('%Y-%m')):
+            raise requests.exceptions.ConnectionError("koneksi terputus")
+        return synthetic_records(chunk_start, chunk_end)
+
+    monkeypatch.setattr(data_handler, "request_bi_grid", request_bi_grid)
+
+
+def test_main_writes_artifact_when_all_chunks_arrive(dirs, monkeypatch):
+    fake_api(monkeypatch)
+    end_date = date.today() - timedelta(days=5)
+
+    assert batch_forecast.main(["--commodity", "Beras", "--end-date", end_date.isoformat()]) == 0
+    assert forecast_artifacts.load_latest_artifact('Beras')['end_date'] == end_date.isoformat()
+
+
+def test_main_fails_without_forecasting_partial_data(dirs, monkeypatch, capsys):
+    end_date = date.today() - timedelta(days=5)
+    failed_month = (end_date.replace(day=1) - timedelta(days=1)).replace(day=1)
+    fake_api(monkeypatch, failed_month)
+
+    exit_code = batch_forecast.main(["--commodity", "Beras", "--end-date", end_date.isoformat()])
+
+    stderr = capsys.readouterr().err
+    assert exit_code == 1
+    assert f"[GAGAL] Gagal mengambil data {DEFAULT_REGION}" in stderr
+    assert f"{failed_month:%Y-%m-%d} s/d" in stderr
+    assert forecast_artifacts.load_latest_artifact('Beras') is None
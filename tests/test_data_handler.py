@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import pytest
+import requests
+
+from benchmarks.synthetic import synthetic_records
+from src import data_handler
+from src.config import DEFAULT_REGION
+
+
+@pytest.fixture
+def ui(tmp_path, monkeypatch):
+    """Store kosong per test dan pesan Streamlit yang ditampilkan fetch_bi_data."""
+    monkeypatch.setattr(data_handler, "PRICE_STORE_PATH", str(tmp_path / "price_store.sqlite"))
+    messages = {'error': [], 'warning': [], 'info': []}
+    for kind in messages:
+        monkeypatch.setattr(data_handler.st, kind, lambda body, *args, kind=kind, **kwargs: messages[kind].append(body))
+    data_handler.fetch_bi_data.clear()
+    yield messages
+    data_handler.fetch_bi_data.clear()
+
+
+@pytest.fixture
+def offline_api(monkeypatch):
+    calls = []
+
+    def request_bi_grid(start_date, end_date, region=DEFAULT_REGION, retries=True):
+        calls.append((start_date, end_date, retries))
+        raise requests.exceptions.ConnectionError("API tidak dapat dihubungi")
+
+    monkeypatch.setattr(data_handler, "request_bi_grid", request_bi_grid)
+    return calls
+
+
+def test_offline_refresh_window_is_single_attempt_warning(ui, offline_api):
+    today = date.today()
+    start_date = today - timedelta(days=60)
+    data_handler.get_price_store().write_records(synthetic_records(start_date, today), start_date, today)
+
+    df_raw = data_handler.fetch_bi_data(start_date.isoformat(), today.isoformat())
+
+    assert not df_raw.empty
+    assert offline_api and all(not retries for _, _, retries in offline_api)
+    assert min(chunk_start for chunk_start, _, _ in offline_api) >= (today - timedelta(days=1)).isoformat()
+    assert ui['error'] == []
+    assert len(ui['warning']) == 1
+
+
+def test_offline_missing_history_still_retries_and_reports_error(ui, offline_api):
+    today = date.today()
+    df_raw = data_handler.fetch_bi_data((today - timedelta(days=60)).isoformat(), today.isoformat())
+
+    assert df_raw.empty
+    assert offline_api and all(retries for _, _, retries in offline_api)
+    assert len(ui['error']) == 1
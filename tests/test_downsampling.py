@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from src.downsampling import downsample_frame, points_for_range
+
+
+def _daily_prices(days, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2015-01-01", periods=days, freq="D")
+    return pd.DataFrame({
+        'Beras Kualitas Medium I': 12000 + rng.normal(0, 50, days).cumsum(),
+        'Beras Kualitas Super I': 14000 + rng.normal(0, 50, days).cumsum(),
+    }, index=index)
+
+
+def _points_per_day(downsampled):
+    series = next(iter(downsampled.values()))
+    return len(series) / ((series.index[-1] - series.index[0]).days + 1)
+
+
+def test_zooming_in_gives_more_points_per_day():
+    df = _daily_prices(3650)
+    zoomed = df.loc["2020-01-01":"2022-12-31"]
+
+    full = downsample_frame(df, chart_width_px=400, extra_days=30)
+    zoom = downsample_frame(zoomed, chart_width_px=400, extra_days=30)
+
+    assert len(full['Beras Kualitas Medium I']) == points_for_range(df.index[0], df.index[-1], 400, extra_days=30)
+    assert _points_per_day(zoom) > 3 * _points_per_day(full)
+
+
+def test_budget_follows_chart_width_and_keeps_short_ranges_at_full_resolution():
+    df = _daily_prices(3650)
+    assert points_for_range(df.index[0], df.index[-1], 1200) == 3 * points_for_range(df.index[0], df.index[-1], 400)
+
+    short = df.iloc[-90:]
+    downsampled = downsample_frame(short, chart_width_px=400, extra_days=30)
+    assert all(len(series) == len(short) for series in downsampled.values())
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_wide_frame
+from src.config import COMMODITY_CONFIG
+from src.data_handler import reshape_and_clean_data
+from src.feature_engineering import (
+    SEQ_LENGTH, BatchedFeatureState, FeatureSchema, SequenceBatch, full_preparation_pipeline, prepare_dense_history, prepare_dense_window,
+)
+from src.predictions import load_scalers
+
+FUTURE_DAYS = 10
+
+
+def long_frame(details, days=120, missing_rate=0.0, seed=0):
+    return reshape_and_clean_data(synthetic_wide_frame(days=days, missing_rate=missing_rate, seed=seed), details)
+
+
+@pytest.mark.parametrize("commodity", list(COMMODITY_CONFIG))
+@pytest.mark.parametrize("missing_rate", [0.0, 0.1])
+def test_prepare_dense_window_matches_pandas_pipeline(commodity, missing_rate):
+    details = COMMODITY_CONFIG[commodity]
+    df_long = long_frame(details, missing_rate=missing_rate, seed=3)
+
+    expected, feature_cols, error = full_preparation_pipeline(df_long, details)
+    window, dense_error = prepare_dense_window(df_long, details)
+
+    assert error is None and dense_error is None
+    actual = window.to_frame()
+    assert list(actual.columns) == list(expected.columns)
+    assert actual.index.equals(expected.index)
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-6)
+
+
+def test_prepare_dense_window_reports_short_history():
+    details = COMMODITY_CONFIG['Beras']
+    window, error = prepare_dense_window(long_frame(details, days=45), details)
+    assert window is None
+    assert "tidak cukup" in error
+
+
+@pytest.mark.parametrize("commodity", list(COMMODITY_CONFIG))
+def test_batched_feature_state_matches_pandas_features(commodity):
+    """Setiap `push` menghasilkan baris fitur yang sama dengan jalur pandas pada histori yang diperpanjang."""
+    details = COMMODITY_CONFIG[commodity]
+    targets = details['targets']
+    df_long = long_frame(details, days=120 + FUTURE_DAYS, seed=5)
+    cutoff = df_long['date'].max() - np.timedelta64(FUTURE_DAYS, 'D')
+
+    initial, feature_cols, _ = full_preparation_pipeline(df_long[df_long['date'] <= cutoff], details)
+    full, _, _ = full_preparation_pipeline(df_long, details)
+    future = full.tail(FUTURE_DAYS)
+
+    state = BatchedFeatureState([initial, initial], feature_cols, targets)
+    for date, row in future.iterrows():
+        prices = row[targets].to_numpy(dtype=np.float64)
+        rows = state.push(np.stack([prices, prices]))
+        np.testing.assert_allclose(rows[0], row[feature_cols].to_numpy(dtype=np.float64), rtol=1e-9, atol=1e-6)
+        np.testing.assert_array_equal(rows[0], rows[1])
+
+    np.testing.assert_allclose(state.window()[0], full[feature_cols].tail(len(initial)).to_numpy(), rtol=1e-9, atol=1e-6)
+
+
+def test_prepared_window_windows_only_use_data_up_to_each_origin():
+    """Setiap jendela backtest sama dengan `prepare_dense_window` pada data yang dipotong di tanggal origin."""
+    details = COMMODITY_CONFIG['Beras']
+    df_long = long_frame(details, days=150, missing_rate=0.3, seed=9)
+    history, _ = prepare_dense_history(df_long, details)
+    end_positions = np.arange(SEQ_LENGTH - 1, len(history.dates))
+    end_positions = end_positions[history.observed_by(end_positions)]
+
+    batch = history.windows(end_positions)
+    expected_windows = [prepare_dense_window(df_long[df_long['date'] <= history.dates[end]], details)[0]
+                        for end in end_positions]
+    expected = SequenceBatch.from_frames([window.to_frame() for window in expected_windows],
+                                         history.schema.feature_cols, history.schema.target_cols)
+    assert batch.last_dates.equals(expected.last_dates)
+    np.testing.assert_allclose(batch.last_trends, expected.last_trends)
+    np.testing.assert_allclose(batch.prices, expected.prices, rtol=1e-12)
+    np.testing.assert_allclose(batch.features, expected.features, rtol=1e-9, atol=1e-6)
+
+    # Dengan celah data, jendela tanpa look-ahead memang berbeda dari potongan histori yang diinterpolasi penuh
+    frame = history.to_frame()
+    sliced = np.stack([frame[history.schema.target_cols].iloc[end - SEQ_LENGTH + 1:end + 1].to_numpy() for end in end_positions])
+    assert not np.allclose(batch.prices, sliced)
+
+    state = BatchedFeatureState(batch, history.schema.feature_cols, history.schema.target_cols)
+    expected_state = BatchedFeatureState([window.to_frame() for window in expected_windows],
+                                         history.schema.feature_cols, history.schema.target_cols)
+    prices = batch.prices[:, -1] * 1.01
+    np.testing.assert_allclose(state.push(prices), expected_state.push(prices), rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(state.window(), expected_state.window(), rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("commodity", list(COMMODITY_CONFIG))
+def test_feature_schema_transform_matches_scaler(commodity):
+    details = COMMODITY_CONFIG[commodity]
+    scaler_X = load_scalers(details)['X']
+    schema = FeatureSchema.from_scaler(scaler_X, details['targets'])
+    rows = np.random.default_rng(1).random((2, SEQ_LENGTH, schema.n_features)) * scaler_X.data_max_
+
+    expected = scaler_X.transform(pd.DataFrame(rows.reshape(-1, schema.n_features), columns=schema.feature_cols))
+    np.testing.assert_array_equal(schema.transform(scaler_X, rows), expected.reshape(rows.shape))
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from src.forecast_artifacts import load_latest_artifact, write_artifact
+
+
+def test_artifact_round_trip_keeps_price_history(tmp_path):
+    dates = pd.date_range('2024-01-01', periods=90)
+    price_history = pd.DataFrame({'Beras Kualitas Medium I': np.linspace(14000, 14500, 90)}, index=dates)
+    price_history.iloc[10, 0] = np.nan
+    df_forecast = pd.DataFrame({'Beras Kualitas Medium I': np.full(30, 14600.0)},
+                               index=pd.date_range('2024-03-31', periods=30))
+    metadata = {'start_date': '2024-01-01', 'end_date': '2024-03-30'}
+
+    write_artifact('Beras', df_forecast, price_history.tail(30), metadata, price_history, artifact_dir=str(tmp_path))
+    artifact = load_latest_artifact('Beras', artifact_dir=str(tmp_path))
+
+    assert (artifact['start_date'], artifact['end_date']) == ('2024-01-01', '2024-03-30')
+    pd.testing.assert_frame_equal(artifact['price_history'], price_history, check_freq=False)
+    assert len(artifact['forecast']) == 30
+
+
+def test_artifact_from_older_format_is_ignored(tmp_path):
+    directory = tmp_path / 'Beras'
+    directory.mkdir()
+    (directory / 'old.json').write_text('{"format_version": 1, "forecast": {}, "sequence_history": {}}')
+    (directory / 'latest.json').write_text('{"version": "old", "path": "old.json"}')
+    assert load_latest_artifact('Beras', artifact_dir=str(tmp_path)) is None
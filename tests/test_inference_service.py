@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+import pytest
+
+from src import inference_service
+from src.config import COMMODITY_CONFIG
+from src.inference_service import InferenceService, InferenceWorkerError
+
+
+class DeadWorker:
+    """Pengganti proses worker yang sudah mati (misal: dibunuh OOM killer)."""
+
+    pid = 999999
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+def test_job_taken_by_worker_that_died_before_started_fails_fast(monkeypatch):
+    service = InferenceService(COMMODITY_CONFIG, n_workers=0)
+    monkeypatch.setattr(service, '_spawn_worker', lambda: None)
+    try:
+        start = time.monotonic()
+        future = service.submit('Beras', np.zeros((1, 1)), ['x'], future_steps=1)
+        # Worker mengambil job dari antrean lalu mati sebelum mengirim 'started'
+        assert service._jobs.get(timeout=5)['id'] == future.job_id
+        service._workers[DeadWorker.pid] = DeadWorker()
+
+        with pytest.raises(InferenceWorkerError, match="berhenti sebelum"):
+            future.result(timeout=10)
+        assert time.monotonic() - start < 10
+        assert service.stats()['failed'] == 1
+    finally:
+        service.close()
+
+
+def test_job_submitted_after_worker_died_is_not_failed(monkeypatch):
+    service = InferenceService(COMMODITY_CONFIG, n_workers=0)
+    monkeypatch.setattr(service, '_spawn_worker', lambda: None)
+    try:
+        service._workers[DeadWorker.pid] = DeadWorker()
+        time.sleep(2 * inference_service.WORKER_CHECK_SECONDS)
+        # Job baru tetap mengantre untuk worker pengganti
+        future = service.submit('Beras', np.zeros((1, 1)), ['x'], future_steps=1)
+        time.sleep(3 * inference_service.WORKER_CHECK_SECONDS)
+        assert not future.done()
+        assert service.stats()['pending'] == 1
+    finally:
+        service.close()
+
+
+def test_memory_check_uses_current_rss_not_peak():
+    data = np.ones(200 * 1024 ** 2 // 8)
+    with_data = inference_service._current_rss_mb()
+    del data
+    assert inference_service._current_rss_mb() < with_data - 100
@@ -0,0 +1,49 @@
+import threading
+import tracemalloc
+
+from src.instrumentation import Trace
+
+
+def test_stage_reports_memory_and_stops_tracing():
+    trace = Trace("uji")
+    with trace.stage("alokasi"):
+        data = bytearray(4 * 1024 ** 2)
+
+    stage = trace.stages[0]
+    assert stage['peak_memory_mb'] >= 4
+    assert stage['memory_delta_mb'] >= 4
+    assert not tracemalloc.is_tracing()
+    del data
+
+
+def test_overlapping_sessions_do_not_stop_or_reset_each_other():
+    first, second = Trace("sesi 1"), Trace("sesi 2")
+    first_started, second_done = threading.Event(), threading.Event()
+
+    def other_session():
+        first_started.wait()
+        with second.stage("sesi lain"):
+            pass
+        second_done.set()
+
+    thread = threading.Thread(target=other_session)
+    thread.start()
+    with first.stage("panjang"):
+        first_started.set()
+        second_done.wait()
+        # Sesi lain sudah selesai, tetapi tracing untuk tahap ini tetap berjalan
+        assert tracemalloc.is_tracing()
+    thread.join()
+
+    assert first.stages[0]['peak_memory_mb'] is None
+    assert second.stages[0]['peak_memory_mb'] is None
+    assert not tracemalloc.is_tracing()
+
+
+def test_resources_are_included_and_logged(caplog):
+    trace = Trace("uji", track_memory=False)
+    with caplog.at_level("INFO", logger="pangan.instrumentation"):
+        trace.record_resource("forecast_cache", {'hits': 1, 'misses': 2})
+
+    assert trace.to_dict()['resources'] == {'forecast_cache': {'hits': 1, 'misses': 2}}
+    assert '"resource": "forecast_cache"' in caplog.text
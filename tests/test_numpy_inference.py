@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_wide_frame
+from src.config import COMMODITY_CONFIG
+from src.data_handler import reshape_and_clean_data
+from src.export_numpy_models import PARITY_ATOL, keras_to_numpy_model
+from src.feature_engineering import prepare_dense_window
+from src.numpy_inference import NumpyLSTMModel
+from src.predictions import ModelRegistry, NumpyPredictor, TimedPredictor, forecast_batch, load_scalers, variant_path
+
+# Selisih harga relatif maksimum terhadap model float32 (.npz) + scaler
+VARIANT_MAX_RELATIVE_ERROR = {"folded": 1e-6, "float16": 2e-4, "int8": 5e-3}
+FUTURE_STEPS = 30
+SAMPLES = 64
+
+EXPORTED = [commodity for commodity, details in COMMODITY_CONFIG.items() if os.path.exists(details['npz_path'])]
+
+
+def random_inputs(model, seed=0):
+    """Jendela acak di rentang [0, 1], yaitu rentang fitur setelah MinMaxScaler."""
+    rng = np.random.default_rng(seed)
+    return rng.random((SAMPLES,) + model.input_shape, dtype=np.float32)
+
+
+@pytest.fixture(scope="module")
+def keras_models():
+    tf = pytest.importorskip("tensorflow")
+    return {
+        commodity: tf.keras.models.load_model(COMMODITY_CONFIG[commodity]['model_path'])
+        for commodity in EXPORTED if os.path.exists(COMMODITY_CONFIG[commodity]['model_path'])
+    }
+
+
+@pytest.mark.parametrize("commodity", EXPORTED)
+def test_npz_matches_keras(commodity, keras_models):
+    if commodity not in keras_models:
+        pytest.skip("file .h5 tidak tersedia")
+    keras_model = keras_models[commodity]
+    shipped = NumpyLSTMModel.from_npz(COMMODITY_CONFIG[commodity]['npz_path'])
+    x = random_inputs(shipped)
+
+    expected = keras_model(x, training=False).numpy()
+    np.testing.assert_allclose(shipped.predict(x), expected, atol=PARITY_ATOL)
+    np.testing.assert_allclose(keras_to_numpy_model(keras_model).predict(x), expected, atol=PARITY_ATOL)
+
+
+@pytest.mark.parametrize("commodity", EXPORTED)
+def test_compiled_predictor_matches_keras(commodity, keras_models):
+    if commodity not in keras_models:
+        pytest.skip("file .h5 tidak tersedia")
+    from src.predictions import CompiledPredictor
+
+    keras_model = keras_models[commodity]
+    predictor = CompiledPredictor(keras_model).warmup()
+    x = random_inputs(NumpyLSTMModel.from_npz(COMMODITY_CONFIG[commodity]['npz_path']), seed=1)
+
+    np.testing.assert_allclose(predictor.predict(x), keras_model.predict(x, verbose=0), atol=PARITY_ATOL)
+    assert predictor.latency_summary()['calls'] == 1
+
+
+@pytest.mark.parametrize("commodity", EXPORTED)
+@pytest.mark.parametrize("variant", list(VARIANT_MAX_RELATIVE_ERROR))
+def test_variant_single_step_drift(commodity, variant):
+    details = COMMODITY_CONFIG[commodity]
+    if not os.path.exists(variant_path(details, variant)):
+        pytest.skip("varian belum dibuat (python -m src.package_models)")
+    reference = NumpyLSTMModel.from_npz(details['npz_path'])
+    model = NumpyLSTMModel.from_npz(variant_path(details, variant))
+    scalers = load_scalers(details)
+    x_scaled = random_inputs(reference, seed=2)
+    x_raw = scalers['X'].inverse_transform(x_scaled.reshape(-1, x_scaled.shape[-1])).reshape(x_scaled.shape)
+
+    assert model.scalers_folded
+    expected = scalers['y'].inverse_transform(reference.predict(x_scaled))
+    relative = np.abs(model.predict(x_raw) - expected) / np.abs(expected)
+    assert relative.max() <= VARIANT_MAX_RELATIVE_ERROR[variant]
+
+
+@pytest.mark.parametrize("commodity", EXPORTED)
+@pytest.mark.parametrize("variant", list(VARIANT_MAX_RELATIVE_ERROR))
+def test_variant_forecast_drift(commodity, variant):
+    """Selisih tetap dalam batas setelah 30 langkah forecast iteratif (error ikut terbawa ke langkah berikutnya)."""
+    details = COMMODITY_CONFIG[commodity]
+    if not os.path.exists(variant_path(details, variant)):
+        pytest.skip("varian belum dibuat (python -m src.package_models)")
+    scalers = load_scalers(details)
+    df_long = reshape_and_clean_data(synthetic_wide_frame(days=120, seed=7), details)
+    window, _ = prepare_dense_window(df_long, details)
+    sequence, feature_cols, targets = window.to_frame(), window.schema.feature_cols, details['targets']
+
+    reference = NumpyPredictor(NumpyLSTMModel.from_npz(details['npz_path']))
+    model = NumpyPredictor(NumpyLSTMModel.from_npz(variant_path(details, variant)))
+    expected = forecast_batch(reference, scalers, [sequence], feature_cols, targets, future_steps=FUTURE_STEPS)
+    actual = forecast_batch(model, scalers, [sequence], feature_cols, targets, future_steps=FUTURE_STEPS)
+
+    relative = np.abs(actual - expected) / np.abs(expected)
+    assert relative.max() <= VARIANT_MAX_RELATIVE_ERROR[variant]
+
+
+@pytest.mark.parametrize("commodity", EXPORTED)
+@pytest.mark.parametrize("variant", ["float16", "int8"])
+def test_quantized_weights_dequantized_once(commodity, variant):
+    details = COMMODITY_CONFIG[commodity]
+    if not os.path.exists(variant_path(details, variant)):
+        pytest.skip("varian belum dibuat (python -m src.package_models)")
+    model = NumpyLSTMModel.from_npz(variant_path(details, variant))
+
+    assert model.weights is None
+    assert all(value.dtype == np.float32 for value in model.compute_weights.values())
+    weights_before = {name: model.weight(name) for name in model.compute_weights}
+    model.predict(random_inputs(model))
+    assert all(model.weight(name) is value for name, value in weights_before.items())
+
+
+@pytest.mark.parametrize("commodity", EXPORTED)
+@pytest.mark.parametrize("variant", ["float16", "int8"])
+def test_quantized_variant_memory_matches_folded(commodity, variant):
+    """Setelah dimuat, varian float16/int8 tidak memegang memori lebih besar dari varian float32 terlipat."""
+    details = COMMODITY_CONFIG[commodity]
+    paths = [variant_path(details, name) for name in ("folded", variant)]
+    if not all(os.path.exists(path) for path in paths):
+        pytest.skip("varian belum dibuat (python -m src.package_models)")
+    folded, quantized = (NumpyLSTMModel.from_npz(path) for path in paths)
+
+    assert quantized.nbytes == folded.nbytes
+    assert NumpyPredictor(quantized).nbytes == quantized.nbytes
+    stored = NumpyLSTMModel.from_npz(paths[1], keep_storage=True)
+    assert stored.storage_nbytes < folded.storage_nbytes
+    assert stored.nbytes > folded.nbytes
+
+
+def test_timed_predictor_requires_run_and_nbytes():
+    class PartialPredictor(TimedPredictor):
+        def _run(self, model_input):
+            return model_input
+
+    with pytest.raises(TypeError):
+        PartialPredictor((7, 3))
+
+
+def test_registry_stats_include_predict_latency():
+    registry = ModelRegistry({commodity: COMMODITY_CONFIG[commodity] for commodity in EXPORTED})
+    commodity = EXPORTED[0]
+    model, _ = registry.get(commodity)
+    model.predict(random_inputs(model))
+
+    stats = registry.stats()[commodity]
+    assert stats['loaded'] and stats['predict_calls'] >= 1
+    assert stats['predict_max_ms'] >= stats['predict_p50_ms'] > 0
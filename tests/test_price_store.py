@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from benchmarks.synthetic import synthetic_records
+from src.price_store import PriceStore
+
+TODAY = date(2025, 3, 31)
+START, END = date(2025, 1, 1), date(2025, 1, 31)
+
+
+def blank(records, days):
+    """Mengosongkan harga semua sub-komoditas pada tanggal `days` (seperti hari tanpa laporan)."""
+    columns = {day.strftime('%d/%m/%Y') for day in days}
+    return [{key: ('-' if key in columns else value) for key, value in record.items()} for record in records]
+
+
+def test_empty_response_is_not_marked_covered(tmp_path):
+    store = PriceStore(str(tmp_path / "store.sqlite"))
+    store.write_records([], START, END, today=TODAY)
+    assert store.missing_ranges(START, END) == [(START, END)]
+
+
+def test_trailing_empty_days_are_fetched_again(tmp_path):
+    store = PriceStore(str(tmp_path / "store.sqlite"))
+    trailing = [END - timedelta(days=i) for i in range(3)]
+    store.write_records(blank(synthetic_records(START, END), trailing), START, END, today=TODAY)
+
+    assert store.missing_ranges(START, END) == [(END - timedelta(days=2), END)]
+
+
+def test_empty_days_before_later_data_are_final(tmp_path):
+    store = PriceStore(str(tmp_path / "store.sqlite"))
+    holiday = date(2025, 1, 10)
+    store.write_records(blank(synthetic_records(START, END), [holiday]), START, END, today=TODAY)
+
+    assert store.missing_ranges(START, END) == []
+    assert store.has_prices(START, END)
+
+
+def test_refresh_window_is_never_covered(tmp_path):
+    store = PriceStore(str(tmp_path / "store.sqlite"))
+    today = END
+    store.write_records(synthetic_records(START, END), START, END, today=today)
+    assert store.missing_ranges(START, END) == [(END - timedelta(days=1), END)]
+
+
+def test_trailing_empty_days_are_final_once_later_data_is_stored(tmp_path):
+    store = PriceStore(str(tmp_path / "store.sqlite"))
+    february = (date(2025, 2, 1), date(2025, 2, 28))
+    store.write_records(synthetic_records(*february), *february, today=TODAY)
+    store.write_records(blank(synthetic_records(START, END), [END]), START, END, today=TODAY)
+
+    assert store.missing_ranges(START, date(2025, 2, 28)) == []
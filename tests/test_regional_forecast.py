@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+import requests
+
+from benchmarks.synthetic import synthetic_records
+from src import data_handler, regional_forecast
+from src.config import DEFAULT_REGION, REGION_CONFIG
+
+OTHER_REGION = next(region for region in REGION_CONFIG if region != DEFAULT_REGION)
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_handler, "PRICE_STORE_PATH", str(tmp_path / "price_store.sqlite"))
+
+
+def fake_api(monkeypatch, failed_region=None, failed_month=None):
+    def request_bi_grid(chunk_start, chunk_end, region=DEFAULT_REGION, retries=True):
+        if region == failed_region and chunk_start.startswith(failed_month.strftime('%Y-%m')):
+            raise requests.exceptions.ConnectionError("koneksi terputus")
+        return synthetic_records(chunk_start, chunk_end, seed=list(REGION_CONFIG).index(region))
+
+    monkeypatch.setattr(data_handler, "request_bi_grid", request_bi_grid)
+
+
+def run_main(tmp_path, workers):
+    output = tmp_path / "hasil.csv"
+    exit_code = regional_forecast.main([
+        "--region", DEFAULT_REGION, "--region", OTHER_REGION, "--commodity", "Beras",
+        "--end-date", (date.today() - timedelta(days=5)).isoformat(),
+        "--workers", str(workers), "--output", str(output),
+    ])
+    return exit_code, pd.read_csv(output) if output.exists() else None
+
+
+def test_main_forecasts_regions_in_worker_processes(store_path, monkeypatch, tmp_path):
+    fake_api(monkeypatch)
+    exit_code, df_forecast = run_main(tmp_path, workers=2)
+
+    assert exit_code == 0
+    assert set(df_forecast['wilayah']) == {DEFAULT_REGION, OTHER_REGION}
+    per_region = df_forecast.pivot_table(index=['step', 'komoditas_sub'], columns='wilayah', values='harga')
+    assert not per_region[DEFAULT_REGION].equals(per_region[OTHER_REGION])
+
+
+def test_main_reports_region_with_failed_chunk(store_path, monkeypatch, tmp_path, capsys):
+    end_date = date.today() - timedelta(days=5)
+    failed_month = (end_date.replace(day=1) - timedelta(days=1)).replace(day=1)
+    fake_api(monkeypatch, failed_region=OTHER_REGION, failed_month=failed_month)
+
+    exit_code, df_forecast = run_main(tmp_path, workers=2)
+
+    stderr = capsys.readouterr().err
+    assert exit_code == 1
+    assert f"[GAGAL] {OTHER_REGION}: data {failed_month:%Y-%m-%d} s/d" in stderr
+    assert "gagal diambil (koneksi terputus)" in stderr
+    assert set(df_forecast['wilayah']) == {DEFAULT_REGION}